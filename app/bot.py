@@ -1,10 +1,71 @@
+import os
+from pathlib import Path
+from typing import Any
+
 from aiogram import Bot, Dispatcher
-from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, SimpleFilesPathWrapper, TelegramAPIServer
+from aiogram.enums import ParseMode
+from aiogram.types import FSInputFile
+
+
+class TunedSession(AiohttpSession):
+    """
+    aiohttp session with an explicit connection pool (limits, keep-alive,
+    DNS cache). With a local-mode Bot API server, FSInputFile is sent as a
+    file:// path the server reads itself — no multipart upload of bytes.
+    """
+
+    def __init__(
+        self,
+        api: TelegramAPIServer = PRODUCTION,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive: float = 30.0,
+        dns_ttl: int = 3600,
+        timeout: float = 60.0,
+    ) -> None:
+        super().__init__(api=api, limit=limit, timeout=timeout)
+        self._connector_init.update(
+            limit_per_host=limit_per_host,
+            keepalive_timeout=keepalive,
+            use_dns_cache=dns_ttl > 0,
+            ttl_dns_cache=dns_ttl or None,
+        )
+
+    def prepare_value(self, value: Any, bot: Bot, files: dict[str, Any], _dumps_json: bool = True) -> Any:
+        if self.api.is_local and isinstance(value, FSInputFile):
+            try:
+                path = self.api.wrap_local_file.to_server(os.path.abspath(value.path))
+            except ValueError:
+                # файл вне смонтированного каталога — сервер его не увидит, загружаем байтами
+                pass
+            else:
+                return f"file://{path}"
+        return super().prepare_value(value, bot=bot, files=files, _dumps_json=_dumps_json)
+
 
-def build_bot(token: str) -> Bot:
+def build_api_server(
+    url: str | None,
+    local_mode: bool = False,
+    local_root: str | None = None,
+    server_root: str | None = None,
+) -> TelegramAPIServer:
+    if not url:
+        return PRODUCTION
+    kw: dict[str, Any] = {"is_local": local_mode}
+    if local_root and server_root:
+        kw["wrap_local_file"] = SimpleFilesPathWrapper(
+            server_path=Path(server_root), local_path=Path(local_root).resolve(),
+        )
+    return TelegramAPIServer.from_base(url, **kw)
+
+
+def build_bot(token: str, session: AiohttpSession | None = None) -> Bot:
     return Bot(
         token=token,
+        session=session,
         default=DefaultBotProperties(
             parse_mode=ParseMode.HTML,
             # disable_web_page_preview=True,
@@ -12,5 +73,23 @@ def build_bot(token: str) -> Bot:
         ),
     )
 
+
+def build_session(settings) -> TunedSession:
+    """TunedSession from config.Settings (API_* / HTTP_* fields)."""
+    return TunedSession(
+        api=build_api_server(
+            settings.API_SERVER_URL,
+            local_mode=settings.API_LOCAL_MODE,
+            local_root=settings.API_FILES_LOCAL_ROOT,
+            server_root=settings.API_FILES_SERVER_ROOT,
+        ),
+        limit=settings.HTTP_POOL_LIMIT,
+        limit_per_host=settings.HTTP_POOL_PER_HOST,
+        keepalive=settings.HTTP_KEEPALIVE,
+        dns_ttl=settings.HTTP_DNS_TTL,
+        timeout=settings.HTTP_TIMEOUT,
+    )
+
+
 def build_dispatcher() -> Dispatcher:
     return Dispatcher()
@@ -1,7 +1,91 @@
+from pydantic import BaseModel, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+class BotProfile(BaseModel):
+    """One bot token served by this process; everything except the fields below is shared."""
+    name: str                               # stable key for offsets, file_ids, subscriptions ("" = BOT_TOKEN)
+    token: str
+    commands: list[str] | None = None       # commands this bot offers (None = all)
+    descriptions: dict[str, str] = {}       # command → menu description override
+    media_cache_chat_id: int | None = None  # its own prefetch chat: file_ids are per bot
+    reminders: bool = True                  # send event reminders to chats subscribed through this bot
+
 class Settings(BaseSettings):
     BOT_TOKEN: str
+    # More kingdoms in the same process, JSON list of BotProfile: [{"name": "k123", "token": "..."}]
+    BOTS: list[BotProfile] = []
+    # SQLite file for subscriptions and delivery log
+    DB_PATH: str = "data/bot.sqlite3"
+    # Reminders: how long before the start to notify
+    REMINDER_LEAD_MINUTES: int = 15
+    # Broadcast limits (Telegram allows ~30 msg/s per bot)
+    BROADCAST_RATE: float = 25.0
+    BROADCAST_CONCURRENCY: int = 16
+    BROADCAST_BATCH: int = 500
+    # Logging: JSON records via a background queue listener
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    LOG_FILE: str | None = None
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_BACKUPS: int = 5
+    # Share of callback-query updates whose INFO logs are kept (0..1)
+    LOG_CALLBACK_SAMPLE: float = 1.0
+    # Max handlers running at once (per-chat order is always preserved)
+    UPDATE_WORKERS: int = 64
+    # Telegram user ids allowed to use admin commands (/profile), JSON list: [1, 2]
+    ADMIN_IDS: list[int] = []
+    # Bot API server: None → api.telegram.org; e.g. http://localhost:8081 for a self-hosted telegram-bot-api
+    API_SERVER_URL: str | None = None
+    # Server runs with --local: local files are passed as file:// paths instead of being uploaded
+    API_LOCAL_MODE: bool = False
+    # Path mapping when the server sees our files elsewhere (e.g. a docker volume): local root → server root
+    API_FILES_LOCAL_ROOT: str | None = None
+    API_FILES_SERVER_ROOT: str | None = None
+    # HTTP connection pool to the Bot API (keep >= UPDATE_WORKERS + BROADCAST_CONCURRENCY)
+    HTTP_POOL_LIMIT: int = 100
+    HTTP_POOL_PER_HOST: int = 0          # 0 = no per-host limit
+    HTTP_KEEPALIVE: float = 30.0         # seconds an idle connection stays open
+    HTTP_DNS_TTL: int = 3600             # 0 = no DNS caching
+    HTTP_TIMEOUT: float = 60.0           # per request, seconds
+    POLLING_TIMEOUT: int = 30            # getUpdates long-poll wait, seconds
+    # Private chat/channel the bot may post to: neighbour images are pre-uploaded there for their file_id
+    MEDIA_CACHE_CHAT_ID: int | None = None
+    MEDIA_PREFETCH_CONCURRENCY: int = 2
+    # Known file_ids of local images (shared by all users, survives restarts)
+    FILE_ID_CACHE: str = "data/file_ids.json"
+    # Worker processes for large /team searches (0 = always search in a thread)
+    TEAM_WORKERS: int = 2
+    # Update traces as OTLP/JSON lines (None = tracing off); slow/failed updates are always kept
+    TRACE_FILE: str | None = None
+    TRACE_SAMPLE: float = 0.01           # share of ordinary updates exported (0..1)
+    TRACE_SLOW_MS: float = 500.0
+    # Card views / searches are buffered in memory and written to DB_PATH every N seconds
+    ANALYTICS_FLUSH_S: float = 30.0
+    # How many of the most viewed items per kind get their cards/images warmed at startup and /reload
+    WARM_POPULAR: int = 30
+    # Shutdown: how long in-flight handlers may finish after SIGTERM before they are cancelled
+    SHUTDOWN_DRAIN_S: float = 20.0
+    # Last handled update (so a restart does not get the last batch again) and the warm-cache snapshot
+    OFFSET_FILE: str = "data/polling_offset.json"
+    WARM_SNAPSHOT: str = "data/warm_snapshot.pickle"
+    # Grid images of whole lists (mount skill slots, hero pages), named by a hash of their inputs
+    CONTACT_SHEETS_DIR: str = "data/sheets"
+    # python -m app.prefork: catalogs loaded once, then this many processes share the bots (round-robin)
+    PREFORK_WORKERS: int = 2
+    PREFORK_REPORT_S: float = 300.0      # log per-worker unique/shared memory every N seconds (0 = only on SIGUSR1)
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
+    @field_validator("BOTS")
+    @classmethod
+    def _unique_names(cls, v: list[BotProfile]):
+        names = [b.name for b in v]
+        if "" in names or len(set(names)) != len(names):
+            raise ValueError("every extra bot needs its own non-empty name")
+        return v
+
+    def profiles(self) -> list[BotProfile]:
+        """The BOT_TOKEN bot first, then BOTS."""
+        main = BotProfile(name="", token=self.BOT_TOKEN, media_cache_chat_id=self.MEDIA_CACHE_CHAT_ID)
+        return [main, *self.BOTS]
+
 settings = Settings()
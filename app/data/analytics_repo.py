@@ -0,0 +1,111 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+# Счётчики просмотров карточек и поисковых запросов, агрегированные по дням:
+# строка на (вид, ключ, день), а не на каждое нажатие — таблица не пухнет.
+DB_PATH = "data/bot.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS views (
+    kind TEXT    NOT NULL,
+    key  TEXT    NOT NULL,
+    day  INTEGER NOT NULL,
+    n    INTEGER NOT NULL,
+    PRIMARY KEY (kind, key, day)
+);
+CREATE INDEX IF NOT EXISTS views_day ON views (day);
+CREATE TABLE IF NOT EXISTS searches (
+    kind  TEXT    NOT NULL,
+    query TEXT    NOT NULL,
+    day   INTEGER NOT NULL,
+    n     INTEGER NOT NULL,
+    empty INTEGER NOT NULL,
+    PRIMARY KEY (kind, query, day)
+);
+"""
+
+_conn: sqlite3.Connection | None = None
+# Пишет только поток сброса буфера, читают /stats и загрузка популярности — все через to_thread
+_lock = threading.Lock()
+
+
+def init(path: str | None = None) -> None:
+    global _conn, DB_PATH
+    with _lock:
+        if path:
+            DB_PATH = path
+        if _conn is not None:
+            _conn.close()
+        Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.executescript(_SCHEMA)
+
+
+def _db() -> sqlite3.Connection:
+    if _conn is None:
+        init()
+    return _conn
+
+
+def add_views(rows: Iterable[Tuple[str, str, int, int]]) -> None:
+    """rows: (kind, key, day, n) — added to the existing counters in one transaction."""
+    with _lock:
+        db = _db()
+        with db:
+            db.execute("BEGIN")
+            db.executemany(
+                "INSERT INTO views (kind, key, day, n) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (kind, key, day) DO UPDATE SET n = n + excluded.n",
+                rows,
+            )
+
+
+def add_searches(rows: Iterable[Tuple[str, str, int, int, int]]) -> None:
+    """rows: (kind, query, day, n, n_without_results)."""
+    with _lock:
+        db = _db()
+        with db:
+            db.execute("BEGIN")
+            db.executemany(
+                "INSERT INTO searches (kind, query, day, n, empty) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (kind, query, day) DO UPDATE SET n = n + excluded.n, empty = empty + excluded.empty",
+                rows,
+            )
+
+
+def popularity(since_day: int) -> Dict[str, Dict[str, int]]:
+    """{kind: {key: views}} since the given day (days since epoch, UTC)."""
+    out: Dict[str, Dict[str, int]] = {}
+    with _lock:
+        rows = _db().execute(
+            "SELECT kind, key, SUM(n) FROM views WHERE day >= ? GROUP BY kind, key", (since_day,)
+        ).fetchall()
+    for kind, key, n in rows:
+        out.setdefault(kind, {})[key] = n
+    return out
+
+
+def top_views(kind: str, since_day: int, limit: int = 10) -> List[Tuple[str, int]]:
+    with _lock:
+        return _db().execute(
+            "SELECT key, SUM(n) AS total FROM views WHERE kind = ? AND day >= ? "
+            "GROUP BY key ORDER BY total DESC, key LIMIT ?",
+            (kind, since_day, limit),
+        ).fetchall()
+
+
+def top_searches(since_day: int, limit: int = 10, empty_only: bool = False) -> List[Tuple[str, str, int, int]]:
+    """(kind, query, n, n_without_results), most frequent first."""
+    with _lock:
+        return _db().execute(
+            f"""
+            SELECT kind, query, SUM(n) AS total, SUM(empty) AS miss FROM searches
+            WHERE day >= ? GROUP BY kind, query {'HAVING miss > 0' if empty_only else ''}
+            ORDER BY {'miss' if empty_only else 'total'} DESC, query LIMIT ?
+            """,
+            (since_day, limit),
+        ).fetchall()
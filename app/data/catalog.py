@@ -0,0 +1,108 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+from app.utils.i18n import DEFAULT_LOCALE, has_locale_file, norm
+from app.utils.singleflight import ThreadSingleFlight
+from app.utils.tracing import span
+
+T = TypeVar("T")
+
+# каталог может одновременно запросить event loop и поток прогрева клавиатур —
+# файл читает только первый, второй ждёт его результат
+_loads = ThreadSingleFlight("catalog")
+
+
+@dataclass
+class Catalog(Generic[T]):
+    """
+    Загруженный каталог одной локали:
+    - items в порядке файла
+    - именованные индексы (name/id/slug → объект), заполняются при добавлении
+    - hay — заранее нормализованные строки для поиска (индекс поиска локали)
+    """
+    locale: str
+    items: List[T] = field(default_factory=list)
+    index: Dict[str, Dict[str, T]] = field(default_factory=dict)
+    hay: List[str] = field(default_factory=list)
+    _sorted: Optional[List[T]] = None
+
+    def add(self, item: T, hay_parts: Iterable[str | None], **keys: str | None) -> None:
+        self.items.append(item)
+        self.hay.append(norm(" ".join(p for p in hay_parts if p), self.locale))
+        for name, key in keys.items():
+            if key is not None:
+                # первая запись с таким ключом побеждает (как при линейном поиске)
+                self.index.setdefault(name, {}).setdefault(key, item)
+
+    def get(self, index: str, key: str | None) -> Optional[T]:
+        if key is None:
+            return None
+        return self.index.get(index, {}).get(key)
+
+    def norm(self, text: str | None) -> str:
+        return norm(text, self.locale)
+
+    def match(self, q: str) -> List[int]:
+        """Positions whose haystack contains the normalized query."""
+        nq = self.norm((q or "").strip())
+        with span("catalog.match", locale=self.locale, size=len(self.hay)) as s:
+            hits = [i for i, h in enumerate(self.hay) if nq in h]
+            if s is not None:
+                s.set(hits=len(hits))
+            return hits
+
+    def sorted_by(self, key: Callable[[T], str]) -> List[T]:
+        if self._sorted is None:
+            self._sorted = sorted(self.items, key=key)
+        return self._sorted
+
+
+class LocaleCatalogs(Generic[T]):
+    """
+    Lazily built catalogs per locale. A locale without its own
+    data/<locale>/<filename> shares the default catalog object, so unused
+    or untranslated locales cost no memory.
+    """
+
+    def __init__(self, filename: str, build: Callable[[str], Catalog[T]]):
+        self.filename = filename
+        self._build = build
+        self._by_locale: Dict[str, Catalog[T]] = {}
+        # растёт при каждом reload — входит в ключи кэшей (клавиатуры, карточки)
+        self.version = 0
+
+    def get(self, locale: str | None = None) -> Catalog[T]:
+        loc = locale or DEFAULT_LOCALE
+        cat = self._by_locale.get(loc)
+        if cat is None:
+            cat = _loads.do((id(self), self.version, loc), lambda: self._load(loc))
+        return cat
+
+    def _load(self, loc: str) -> Catalog[T]:
+        cat = self._by_locale.get(loc)
+        if cat is not None:   # пока ждали очереди, другой поток уже загрузил
+            return cat
+        # чтение файла с диска — отдельный спан, попадание в память трейс не засоряет
+        with span("catalog.load", file=self.filename, locale=loc):
+            if loc != DEFAULT_LOCALE and not has_locale_file(loc, self.filename):
+                cat = self.get(DEFAULT_LOCALE)
+            else:
+                cat = self._build(loc)
+        self._by_locale[loc] = cat
+        return cat
+
+    def loaded(self) -> List[str]:
+        return list(self._by_locale)
+
+    def state(self) -> Tuple[int, Dict[str, Catalog[T]]]:
+        """Loaded catalogs with their version — for the warm-start snapshot."""
+        return self.version, dict(self._by_locale)
+
+    def restore(self, state: Tuple[int, Dict[str, Catalog[T]]]) -> None:
+        self.version, by_locale = state
+        self._by_locale = dict(by_locale)
+
+    def clear(self) -> None:
+        """Drop every locale; the next access re-reads the files."""
+        self._by_locale.clear()
+        self.version += 1
@@ -0,0 +1,159 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, field_validator
+
+from app.utils.i18n import locale_paths
+from .catalog import Catalog, LocaleCatalogs
+from .storage import iter_json_with_fallback
+
+log = logging.getLogger(__name__)
+
+EQUIPMENT_FILE = "equipment.json"
+EQUIPMENT_PATHS = ("data/equipment.json", "./equipment.json")
+# equipment.json: { "equipment": [...], "sets": [...] } или просто список предметов
+EQUIPMENT_KEYS = ("equipment", "sets")
+
+# Слоты в порядке показа: в сборке по одному предмету на слот
+SLOTS = ("weapon", "helmet", "chest", "gloves", "legs", "boots")
+# Типизированные характеристики: "attack" — для всех войск, "cavalry_attack" — только для конницы
+STATS = ("attack", "defense", "health")
+TROOPS = ("infantry", "cavalry", "archer")
+
+_SLOT_ALIASES = {"armor": "chest", "armour": "chest", "body": "chest", "pants": "legs", "shoes": "boots"}
+_STAT_ALIASES = {"atk": "attack", "def": "defense", "defence": "defense", "hp": "health"}
+
+
+def stat_key(raw: str) -> Optional[str]:
+    """"Cavalry Attack" / "cavalry_attack" / "ATK" → canonical key, None if unknown."""
+    k = re.sub(r"[^a-z]+", "_", raw.strip().lower()).strip("_")
+    k = _STAT_ALIASES.get(k, k)
+    troop, _, stat = k.partition("_")
+    if troop in TROOPS:
+        stat = _STAT_ALIASES.get(stat, stat)
+        return f"{troop}_{stat}" if stat in STATS else None
+    return k if k in STATS else None
+
+
+def _stats(raw) -> Dict[str, float]:
+    """{"Cavalry Attack": "12.5%", "hp": 3} → {"cavalry_attack": 12.5, "health": 3.0}; unknown keys are dropped."""
+    out: Dict[str, float] = {}
+    for name, v in (raw or {}).items():
+        key = stat_key(str(name))
+        if key is None:
+            log.warning("unknown equipment stat %r ignored", name)
+            continue
+        out[key] = out.get(key, 0.0) + float(str(v).strip().rstrip("%").replace(",", ".") or 0)
+    return out
+
+
+class Equipment(BaseModel):
+    slug: str
+    name: str
+    slot: str
+    set: str | None = None       # slug комплекта
+    rarity: str | None = None
+    stats: Dict[str, float] = {}
+    image: str | None = None
+
+    @field_validator("slot", mode="before")
+    @classmethod
+    def _slot(cls, v):
+        v = str(v).strip().lower()
+        v = _SLOT_ALIASES.get(v, v)
+        if v not in SLOTS:
+            raise ValueError(f"unknown slot {v!r}, expected one of {SLOTS}")
+        return v
+
+    @field_validator("stats", mode="before")
+    @classmethod
+    def _typed_stats(cls, v):
+        return _stats(v)
+
+
+class SetBonus(BaseModel):
+    pieces: int
+    stats: Dict[str, float] = {}
+
+    @field_validator("stats", mode="before")
+    @classmethod
+    def _typed_stats(cls, v):
+        return _stats(v)
+
+
+class EquipmentSet(BaseModel):
+    slug: str
+    name: str
+    bonuses: List[SetBonus] = []
+
+
+@dataclass
+class EquipmentCatalog(Catalog[Equipment]):
+    # комплекты: slug → описание с бонусами за 2/4/6 предметов
+    sets: Dict[str, EquipmentSet] = field(default_factory=dict)
+
+
+def _build(locale: str) -> EquipmentCatalog:
+    cat = EquipmentCatalog(locale)
+    for key, x in iter_json_with_fallback(*locale_paths(locale, EQUIPMENT_FILE, EQUIPMENT_PATHS), keys=EQUIPMENT_KEYS):
+        if not isinstance(x, dict):
+            continue
+        try:
+            if key == "sets":
+                s = EquipmentSet(**x)
+                s.bonuses.sort(key=lambda b: b.pieces)
+                cat.sets.setdefault(s.slug, s)
+                continue
+            e = Equipment(**x)
+        except ValueError:
+            log.warning("bad equipment record %r skipped", x.get("slug") or x.get("name"), exc_info=True)
+            continue
+        cat.add(e, [e.name, e.slug, e.slot], slug=e.slug, name=cat.norm(e.name))
+    return cat
+
+
+# Каталоги по локалям: data/<locale>/equipment.json грузится при первом запросе
+_catalogs: LocaleCatalogs[Equipment] = LocaleCatalogs(EQUIPMENT_FILE, _build)
+
+
+def _catalog(locale: str | None = None) -> EquipmentCatalog:
+    try:
+        return _catalogs.get(locale)
+    except FileNotFoundError:
+        # раздела может не быть вовсе — это не ошибка, просто пустой каталог
+        return EquipmentCatalog(locale or "")
+
+
+def version() -> int:
+    return _catalogs.version
+
+
+def reload() -> None:
+    _catalogs.clear()
+
+
+def state():
+    """Loaded catalogs for the warm-start snapshot (see utils/snapshot.py)."""
+    return _catalogs.state()
+
+
+def restore(state) -> None:
+    _catalogs.restore(state)
+
+
+def list_equipment(locale: str | None = None) -> List[Equipment]:
+    """In slot order, then by name."""
+    return _catalog(locale).sorted_by(lambda e: (SLOTS.index(e.slot), e.name.lower()))
+
+
+def sets(locale: str | None = None) -> Dict[str, EquipmentSet]:
+    return _catalog(locale).sets
+
+
+def get_by_slug_or_name(key: str, locale: str | None = None) -> Optional[Equipment]:
+    if not key:
+        return None
+    cat = _catalog(locale)
+    return cat.get("slug", key) or cat.get("name", cat.norm(key.strip()))
@@ -1,29 +1,40 @@
-from typing import List, Optional, Any
-from .models import Event
-from .storage import load_json_with_fallback
+import logging
+from typing import List, Optional
+
+from pydantic import ValidationError
+
+from app.utils.i18n import locale_paths
+from .catalog import Catalog, LocaleCatalogs
+from .models import Event, TimeWindow
+from .storage import iter_json_with_fallback
 
 # Основной путь → data/events.json; запасной → ./events.json
+# Другие локали → data/<locale>/events.json (загружаются при первом обращении)
+EVENTS_FILE = "events.json"
 EVENTS_PATHS = ("data/events.json", "./events.json")
+# Поддерживаем формат с корневым ключом "events" (или список),
+# а также один объект под "event"
+EVENTS_KEYS = ("events", "event")
 
-_cache: List[Event] | None = None
+log = logging.getLogger(__name__)
 
 
-def _as_list(raw: Any) -> List[dict]:
-    # Поддерживаем твой формат с корневым ключом "events" (или список)
-    if isinstance(raw, dict) and isinstance(raw.get("events"), list):
-        return raw["events"]
-    if isinstance(raw, list):
-        return raw
-    # Ещё вариант — один объект под "event"
-    if isinstance(raw, dict) and isinstance(raw.get("event"), dict):
-        return [raw["event"]]
-    return []
+def _windows(raw: List[dict], ev_id) -> List[TimeWindow]:
+    """Valid windows only: a broken one costs the event its schedule, not the whole catalog."""
+    out = []
+    for w in raw:
+        try:
+            out.append(TimeWindow.model_validate(w))
+        except ValidationError as e:
+            log.warning("bad time.window of event %r dropped: %s", ev_id, e.errors()[0].get("msg"))
+    return out
 
 
 def _norm_event(d: dict) -> dict:
     """
     Нормализуем поля к Event:
     - time.duration → duration
+    - time.window(dict|list[dict]) → windows; time.window(str) → extra_time_text
     - rewards(dict|list[dict]|list[str]) → list[str] / rewards_text
     - bonus(dict) → строка
     - rules(list[str]) → rules_text + has_rules
@@ -31,14 +42,18 @@ def _norm_event(d: dict) -> dict:
     """
     out = dict(d)
 
-    # time → duration (+ при желании можно собрать окно)
+    # time → duration + окна (структурные идут в расписание, строка — в текст карточки)
     t = d.get("time")
     if isinstance(t, dict):
         if t.get("duration"):
             out["duration"] = t.get("duration")
-        # window = t.get("window")
-        # if window and not out.get("extra_time_text"):
-        #     out["extra_time_text"] = f"Window: {window}"
+        window = t.get("window")
+        if isinstance(window, dict):
+            out["windows"] = _windows([window], d.get("id"))
+        elif isinstance(window, list):
+            out["windows"] = _windows([w for w in window if isinstance(w, dict)], d.get("id"))
+        elif window and not out.get("extra_time_text"):
+            out["extra_time_text"] = f"Window: {window}"
 
     # rewards: dict → list[str]; list[dict] → list[str]
     rw = d.get("rewards")
@@ -74,56 +89,73 @@ def _norm_event(d: dict) -> dict:
     return out
 
 
-def _load() -> List[Event]:
-    global _cache
-    if _cache is None:
-        raw = load_json_with_fallback(*EVENTS_PATHS)
-        items = _as_list(raw)
-        normed = [_norm_event(x) for x in items]
-        _cache = [Event(**x) for x in normed]
-    return _cache
+def _build(locale: str) -> Catalog[Event]:
+    cat: Catalog[Event] = Catalog(locale)
+    # Потоково: каждая запись нормализуется и индексируется сразу после разбора
+    paths = locale_paths(locale, EVENTS_FILE, EVENTS_PATHS)
+    for _, d in iter_json_with_fallback(*paths, keys=EVENTS_KEYS):
+        if not isinstance(d, dict):
+            continue
+        ev = Event(**_norm_event(d))
+        cat.add(
+            ev,
+            [
+                ev.name, ev.description,
+                " ".join(ev.rewards or []), " ".join(ev.tips or []),
+                ev.rewards_text, ev.tips_text, ev.bonus, ev.duration,
+                ev.extra_time_text, ev.rules_text, ev.season,
+            ],
+            name=cat.norm(ev.name),
+            id=ev.id,
+        )
+    return cat
+
+
+_catalogs: LocaleCatalogs[Event] = LocaleCatalogs(EVENTS_FILE, _build)
+
+
+def _catalog(locale: str | None = None) -> Catalog[Event]:
+    return _catalogs.get(locale)
+
+
+def version() -> int:
+    return _catalogs.version
+
+
+def reload() -> None:
+    _catalogs.clear()
+
+
+def state():
+    """Loaded catalogs for the warm-start snapshot (see utils/snapshot.py)."""
+    return _catalogs.state()
+
+
+def restore(state) -> None:
+    _catalogs.restore(state)
+
+
+def _load(locale: str | None = None) -> List[Event]:
+    return _catalog(locale).items
 
 
-def list_events() -> List[Event]:
-    return sorted(_load(), key=lambda e: e.name.lower())
+def list_events(locale: str | None = None) -> List[Event]:
+    return _catalog(locale).sorted_by(lambda e: e.name.lower())
 
 
-def get_by_name(name: str) -> Optional[Event]:
+def get_by_name(name: str, locale: str | None = None) -> Optional[Event]:
     if not name:
         return None
-    q = name.strip().lower()
-    for ev in _load():
-        if ev.name.lower() == q:
-            return ev
-    return None
+    cat = _catalog(locale)
+    return cat.get("name", cat.norm(name.strip()))
 
 
-def get_by_id(ev_id: str) -> Optional[Event]:
-    for ev in _load():
-        if ev.id == ev_id:
-            return ev
-    return None
+def get_by_id(ev_id: str, locale: str | None = None) -> Optional[Event]:
+    return _catalog(locale).get("id", ev_id)
 
 
-def search(q: str) -> List[Event]:
-    ql = (q or "").strip().lower()
-    if not ql:
+def search(q: str, locale: str | None = None) -> List[Event]:
+    if not (q or "").strip():
         return []
-    res = []
-    for e in _load():
-        hay = " ".join([
-            e.name.lower(),
-            e.description.lower(),
-            " ".join(e.rewards or []),
-            " ".join(e.tips or []),
-            (e.rewards_text or "").lower(),
-            (e.tips_text or "").lower(),
-            (e.bonus or "").lower(),
-            (e.duration or "").lower(),
-            (e.extra_time_text or "").lower(),
-            (e.rules_text or "").lower(),
-            (e.season or "").lower(),
-        ])
-        if ql in hay:
-            res.append(e)
-    return res
+    cat = _catalog(locale)
+    return [cat.items[i] for i in cat.match(q)]
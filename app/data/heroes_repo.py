@@ -1,10 +1,14 @@
-from typing import List, Optional, Any
+from typing import List, Optional
 from pydantic import BaseModel
 from pathlib import Path
-from .storage import load_json_with_fallback
+from app.utils.i18n import locale_paths
+from .catalog import Catalog, LocaleCatalogs
+from .storage import iter_json_with_fallback
 import re
 
+HEROES_FILE = "heroes.json"
 HEROES_PATHS = ("data/heroes.json", "./heroes.json")
+HEROES_KEYS = ("heroes",)
 
 
 class Talent(BaseModel):
@@ -38,23 +42,12 @@ class Hero(BaseModel):
     image: str | None = None   # optional explicit image path or URL
 
 
-_cache: List[Hero] | None = None
-
-
 def _slugify(name: str) -> str:
     s = name.strip().lower()
     s = re.sub(r"[^a-z0-9]+", "-", s)
     return s.strip("-")
 
 
-def _as_list(raw: Any) -> List[dict]:
-    if isinstance(raw, list):
-        return raw
-    if isinstance(raw, dict) and isinstance(raw.get("heroes"), list):
-        return raw["heroes"]
-    return []
-
-
 def _with_image_guess(h: dict) -> dict:
     """If no image given, try data/images/<slug>.png|.jpg."""
     if h.get("image"):
@@ -68,53 +61,78 @@ def _with_image_guess(h: dict) -> dict:
     return h
 
 
-def _load() -> List[Hero]:
-    global _cache
-    if _cache is None:
-        raw = load_json_with_fallback(*HEROES_PATHS)
-        rows = _as_list(raw)
-        normed: List[Hero] = []
-        for d in rows:
-            d = dict(d)
-            d.setdefault("slug", _slugify(d.get("name", "")))
-            d = _with_image_guess(d)
-            # pydantic will coerce nested lists/dicts to Talent/HeroSkill models
-            normed.append(Hero(**d))
-        _cache = normed
-    return _cache
+def _build(locale: str) -> Catalog[Hero]:
+    cat: Catalog[Hero] = Catalog(locale)
+    # stream records one by one: list root or {"heroes": [...]}
+    for _, d in iter_json_with_fallback(*locale_paths(locale, HEROES_FILE, HEROES_PATHS), keys=HEROES_KEYS):
+        if not isinstance(d, dict):
+            continue
+        # translated files should carry the same slug as the default one
+        d.setdefault("slug", _slugify(d.get("name", "")))
+        d = _with_image_guess(d)
+        # pydantic will coerce nested lists/dicts to Talent/HeroSkill models
+        h = Hero(**d)
+        cat.add(
+            h,
+            [
+                h.name, h.season,
+                " ".join(h.specialty or []),
+                " ".join(f"{t.name or ''} {t.description or ''}" for t in (h.talents or [])),
+                " ".join(f"{sk.name or ''} {sk.type or ''} {sk.description or ''}" for sk in (h.skills or [])),
+            ],
+            slug=h.slug,
+            name=cat.norm(h.name),
+        )
+    return cat
+
+
+_catalogs: LocaleCatalogs[Hero] = LocaleCatalogs(HEROES_FILE, _build)
+
+
+def _catalog(locale: str | None = None) -> Catalog[Hero]:
+    return _catalogs.get(locale)
+
 
+def version() -> int:
+    return _catalogs.version
 
-def list_heroes() -> List[Hero]:
-    return sorted(_load(), key=lambda h: h.name.lower())
 
+def reload() -> None:
+    _catalogs.clear()
 
-def get_by_slug_or_name(key: str) -> Optional[Hero]:
+
+def state():
+    """Loaded catalogs for the warm-start snapshot (see utils/snapshot.py)."""
+    return _catalogs.state()
+
+
+def restore(state) -> None:
+    _catalogs.restore(state)
+
+
+def _load(locale: str | None = None) -> List[Hero]:
+    return _catalog(locale).items
+
+
+def list_heroes(locale: str | None = None) -> List[Hero]:
+    return _catalog(locale).sorted_by(lambda h: h.name.lower())
+
+
+def get_by_slug_or_name(key: str, locale: str | None = None) -> Optional[Hero]:
     if not key:
         return None
-    q = key.strip().lower()
-    for h in _load():
-        if h.slug == q or h.name.lower() == q:
-            return h
-    return None
+    cat = _catalog(locale)
+    k = key.strip()
+    return cat.get("slug", k.lower()) or cat.get("name", cat.norm(k))
 
 
-def search(q: str, *, season: str | None = None, spec: str | None = None) -> List[Hero]:
-    ql = (q or "").strip().lower()
+def search(q: str, *, season: str | None = None, spec: str | None = None,
+           locale: str | None = None) -> List[Hero]:
+    cat = _catalog(locale)
+    positions = cat.match(q) if (q or "").strip() else range(len(cat.items))
     res = []
-    for h in _load():
-        # text haystack
-        hay = " ".join([
-            h.name.lower(),
-            (h.season or "").lower(),
-            " ".join([s.lower() for s in (h.specialty or [])]),
-            " ".join([(t.name or "").lower() + " " + (t.description or "").lower() for t in (h.talents or [])]),
-            " ".join([
-                (sk.name or "").lower() + " " + (sk.type or "").lower() + " " + (sk.description or "").lower()
-                for sk in (h.skills or [])
-            ]),
-        ])
-        if ql and ql not in hay:
-            continue
+    for i in positions:
+        h = cat.items[i]
         if season and (h.season or "").lower() != season.lower():
             continue
         if spec and not any(spec.lower() in s.lower() for s in (h.specialty or [])):
@@ -0,0 +1,130 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, field_validator
+
+from app.utils.i18n import locale_paths
+from .catalog import Catalog, LocaleCatalogs
+from .storage import iter_json_with_fallback
+
+log = logging.getLogger(__name__)
+
+JEWELS_FILE = "jewels.json"
+JEWELS_PATHS = ("data/jewels.json", "./jewels.json")
+# jewels.json: { "currency": "gold", "jewels": [...] } или просто список камней
+JEWELS_KEYS = ("jewels", "currency")
+
+
+class JewelLevel(BaseModel):
+    level: int
+    stats: Dict[str, str] = {}     # для показа: {"Attack": "+2%"}
+    combine: int = 0               # сколько камней предыдущего уровня уходит на один этого
+    cost: int = 0                  # плата за одно улучшение (в валюте каталога)
+    buy: int | None = None         # цена готового камня этого уровня; None — не продаётся
+
+    @field_validator("stats", mode="before")
+    @classmethod
+    def _str_stats(cls, v):
+        return {str(k): str(x) for k, x in (v or {}).items()}
+
+
+class Jewel(BaseModel):
+    slug: str
+    name: str
+    type: str | None = None        # что усиливает: attack / defense / …
+    description: str = ""
+    image: str | None = None
+    levels: List[JewelLevel] = []
+
+    @field_validator("levels")
+    @classmethod
+    def _contiguous(cls, v: List[JewelLevel]):
+        v = sorted(v, key=lambda x: x.level)
+        if [x.level for x in v] != list(range(1, len(v) + 1)):
+            raise ValueError("levels must be 1..N without gaps")
+        if any(x.combine < 1 for x in v[1:]):
+            raise ValueError("every level above 1 needs combine >= 1")
+        return v
+
+    @property
+    def max_level(self) -> int:
+        return len(self.levels)
+
+
+@dataclass
+class JewelCatalog(Catalog[Jewel]):
+    currency: str = ""
+    # тип → камни в порядке файла
+    by_type: Dict[str, List[Jewel]] = field(default_factory=dict)
+
+
+def _build(locale: str) -> JewelCatalog:
+    cat = JewelCatalog(locale)
+    for key, x in iter_json_with_fallback(*locale_paths(locale, JEWELS_FILE, JEWELS_PATHS), keys=JEWELS_KEYS):
+        if key == "currency":
+            cat.currency = str(x or "")
+            continue
+        if not isinstance(x, dict):
+            continue
+        try:
+            j = Jewel(**x)
+        except ValueError:
+            log.warning("bad jewel record %r skipped", x.get("slug") or x.get("name"), exc_info=True)
+            continue
+        cat.add(j, [j.name, j.slug, j.type, j.description], slug=j.slug, name=cat.norm(j.name))
+        cat.by_type.setdefault((j.type or "").lower(), []).append(j)
+    return cat
+
+
+# Каталоги по локалям: data/<locale>/jewels.json грузится при первом запросе
+_catalogs: LocaleCatalogs[Jewel] = LocaleCatalogs(JEWELS_FILE, _build)
+
+
+def _catalog(locale: str | None = None) -> JewelCatalog:
+    try:
+        return _catalogs.get(locale)
+    except FileNotFoundError:
+        # раздела может не быть вовсе — это не ошибка, просто пустой каталог
+        return JewelCatalog(locale or "")
+
+
+def version() -> int:
+    return _catalogs.version
+
+
+def reload() -> None:
+    _catalogs.clear()
+
+
+def state():
+    """Loaded catalogs for the warm-start snapshot (see utils/snapshot.py)."""
+    return _catalogs.state()
+
+
+def restore(state) -> None:
+    _catalogs.restore(state)
+
+
+def list_jewels(locale: str | None = None) -> List[Jewel]:
+    return _catalog(locale).sorted_by(lambda j: j.name.lower())
+
+
+def by_type(type_: str, locale: str | None = None) -> List[Jewel]:
+    return _catalog(locale).by_type.get(type_.lower(), [])
+
+
+def currency(locale: str | None = None) -> str:
+    return _catalog(locale).currency
+
+
+def get_by_slug_or_name(key: str, locale: str | None = None) -> Optional[Jewel]:
+    if not key:
+        return None
+    cat = _catalog(locale)
+    return cat.get("slug", key) or cat.get("name", cat.norm(key.strip()))
+
+
+def search(q: str, locale: str | None = None) -> List[Jewel]:
+    cat = _catalog(locale)
+    return [cat.items[i] for i in cat.match(q)]
@@ -0,0 +1,211 @@
+import csv
+import io
+import itertools
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# Состав альянса к KvK по колонкам: имена — один массив, каждая характеристика —
+# свой float64-массив той же длины (NaN — «не указано»). Приходит CSV-файлами
+# из таблиц руководства; файлы сливаются по имени игрока, так что мощь и войска
+# можно прислать разными таблицами. Хранится по чату: data/kvk/<chat_id>.npz.
+KVK_DIR = "data/kvk"
+
+# canonical → заголовки, под которыми колонка встречается в таблицах
+COLUMNS: Dict[str, tuple] = {
+    "power": ("power", "might", "сила", "мощь"),
+    "infantry": ("infantry", "inf", "пехота"),
+    "cavalry": ("cavalry", "cav", "кавалерия", "конница"),
+    "archer": ("archer", "archers", "arch", "лучники"),
+    "march": ("march", "march size", "march_size", "марш"),
+    "rally": ("rally", "rally capacity", "rally_capacity", "rally cap", "сбор"),
+    "kills": ("kills", "kill points", "kill_points", "kp", "убийства"),
+    "points": ("points", "kvk points", "kvk_points", "очки"),
+}
+NAME_HEADERS = ("name", "member", "player", "nickname", "nick", "ник", "имя", "игрок")
+MAX_ROWS = 20_000
+
+_ALIAS = {a: col for col, names in COLUMNS.items() for a in names}
+_SUFFIX = (("k", 1e3), ("m", 1e6), ("b", 1e9))
+
+
+class BadTable(ValueError):
+    """The file is not a member table we understand (message is shown to the user)."""
+
+
+@dataclass
+class Roster:
+    names: np.ndarray                                    # str, уникальные, отсортированы
+    cols: Dict[str, np.ndarray] = field(default_factory=dict)
+    updated: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def col(self, name: str) -> Optional[np.ndarray]:
+        """The column, or None when no member has a value in it."""
+        a = self.cols.get(name)
+        return a if a is not None and not np.isnan(a).all() else None
+
+
+# =========================
+# CSV → columns
+# =========================
+def _numbers(raw: List[str]) -> np.ndarray:
+    """Spreadsheet numbers as float64, vectorized: "1,234,567", "1 234 567", "2.5M", "40k", "" → NaN."""
+    a = np.char.lower(np.char.strip(np.array(raw, dtype=str)))
+    for ch in (",", " ", " ", "_"):
+        a = np.char.replace(a, ch, "")
+    mult = np.ones(len(a))
+    for suf, m in _SUFFIX:
+        hit = np.char.endswith(a, suf)
+        mult[hit] = m
+        a = np.where(hit, np.char.rstrip(a, suf), a)
+    a = np.where((a == "") | (a == "-"), "nan", a)
+    try:
+        v = a.astype(np.float64)
+    except ValueError:
+        # редкая ячейка с текстом — разбираем поштучно, мусор → NaN
+        v = np.array([_float_or_nan(x) for x in a])
+    return v * mult
+
+
+def _float_or_nan(x: str) -> float:
+    try:
+        return float(x)
+    except ValueError:
+        return float("nan")
+
+
+def _decode(data: bytes) -> str:
+    for enc in ("utf-8-sig", "cp1251"):
+        try:
+            return data.decode(enc)
+        except UnicodeDecodeError:
+            continue
+    raise BadTable("unknown text encoding, save the table as UTF-8 CSV")
+
+
+def parse_csv(data: bytes) -> Roster:
+    text = _decode(data)
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    rows = csv.reader(io.StringIO(text), dialect)
+    header = [h.strip().lower() for h in next(rows, [])]
+    if not header:
+        raise BadTable("the file is empty")
+    name_at = next((i for i, h in enumerate(header) if h in NAME_HEADERS), None)
+    if name_at is None:
+        raise BadTable(f"no name column (one of: {', '.join(NAME_HEADERS[:4])})")
+    wanted = {i: _ALIAS[h] for i, h in enumerate(header) if h in _ALIAS}
+    if not wanted:
+        raise BadTable(f"no known stat columns (e.g. {', '.join(COLUMNS)})")
+    body = [r for r in itertools.islice(rows, MAX_ROWS + 1) if len(r) > name_at and r[name_at].strip()]
+    if not body:
+        raise BadTable("no member rows")
+    if len(body) > MAX_ROWS:
+        raise BadTable(f"more than {MAX_ROWS} rows")
+    # построчно только раскладываем по колонкам, числа разбираются массивами
+    width = len(header)
+    cells = list(zip(*(r[:width] + [""] * (width - len(r)) for r in body)))
+    names = np.array([s.strip() for s in cells[name_at]], dtype=str)
+    cols = {col: _numbers(list(cells[i])) for i, col in wanted.items()}
+    # одно имя дважды — берём последнюю строку
+    rev_names = names[::-1]
+    uniq, first_in_rev = np.unique(rev_names, return_index=True)
+    keep = len(names) - 1 - first_in_rev
+    return Roster(uniq, {c: a[keep] for c, a in cols.items()}, time.time())
+
+
+def merge(old: Optional[Roster], new: Roster) -> Roster:
+    """New values win for the members and columns in `new`; everyone else keeps theirs."""
+    if old is None or not len(old):
+        return new
+    names = np.union1d(old.names, new.names)
+    oi = np.searchsorted(names, old.names)
+    ni = np.searchsorted(names, new.names)
+    cols = {}
+    for c in set(old.cols) | set(new.cols):
+        a = np.full(len(names), np.nan)
+        if c in old.cols:
+            a[oi] = old.cols[c]
+        if c in new.cols:
+            v = new.cols[c]
+            # пустая ячейка в новом файле не затирает известное значение
+            a[ni] = np.where(np.isnan(v), a[ni], v)
+        cols[c] = a
+    return Roster(names, cols, new.updated)
+
+
+# =========================
+# Storage per chat
+# =========================
+_rosters: Dict[int, Optional[Roster]] = {}
+_lock = threading.Lock()
+# два файла подряд в один чат: второй сливается уже с результатом первого
+_import_lock = threading.Lock()
+
+
+def _path(chat_id: int) -> Path:
+    return Path(KVK_DIR) / f"{chat_id}.npz"
+
+
+def load(chat_id: int) -> Optional[Roster]:
+    with _lock:
+        if chat_id in _rosters:
+            return _rosters[chat_id]
+        r = None
+        try:
+            with np.load(_path(chat_id), allow_pickle=False) as z:
+                r = Roster(
+                    z["names"], {k[4:]: z[k] for k in z.files if k.startswith("col_")},
+                    float(z["updated"]),
+                )
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError):
+            log.warning("kvk roster for chat %s unreadable, ignoring", chat_id, exc_info=True)
+        _rosters[chat_id] = r
+        return r
+
+
+def save(chat_id: int, roster: Roster) -> None:
+    path = _path(chat_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        np.savez_compressed(
+            f, names=roster.names, updated=np.float64(roster.updated),
+            **{f"col_{k}": v for k, v in roster.cols.items()},
+        )
+    os.replace(tmp, path)
+    with _lock:
+        _rosters[chat_id] = roster
+
+
+def import_csv(chat_id: int, data: bytes) -> Tuple[Roster, int]:
+    """Parse, merge into the chat's roster and persist → (roster, members in the file). Blocking — call via to_thread."""
+    new = parse_csv(data)
+    with _import_lock:
+        roster = merge(load(chat_id), new)
+        save(chat_id, roster)
+    return roster, len(new)
+
+
+def reset(chat_id: int) -> None:
+    with _lock:
+        _rosters[chat_id] = None
+    try:
+        _path(chat_id).unlink()
+    except FileNotFoundError:
+        pass
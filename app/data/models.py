@@ -1,6 +1,15 @@
+from datetime import datetime
 from pydantic import BaseModel
 from typing import List, Optional
 
+class TimeWindow(BaseModel):
+    start: datetime                   # naive → wall time in tz
+    end: Optional[datetime] = None
+    length: Optional[str] = None      # "3d", "12h 30m" — if no end
+    every: Optional[str] = None       # repeat period for rotations: "7d", "14d"
+    until: Optional[datetime] = None  # last possible start (season end)
+    tz: str = "UTC"
+
 class Event(BaseModel):
     id: str
     name: str
@@ -15,3 +24,4 @@ class Event(BaseModel):
     has_rules: bool = False
     rules_text: Optional[str] = None
     season: Optional[str] = None
+    windows: List[TimeWindow] = []
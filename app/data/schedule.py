@@ -0,0 +1,223 @@
+import heapq
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .models import Event, TimeWindow
+from . import events_repo
+
+# Сколько истории/будущего разворачиваем для повторяющихся ротаций
+HORIZON_PAST = timedelta(days=30)
+HORIZON_FUTURE = timedelta(days=120)
+# Перестраиваем индекс заранее, когда до края горизонта осталось меньше этого
+REBUILD_MARGIN = timedelta(days=30)
+
+_SPAN_RE = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(weeks?|w|days?|d|hours?|hrs?|h|minutes?|mins?|m)\b",
+    re.IGNORECASE,
+)
+_SPAN_UNITS = {"w": timedelta(weeks=1), "d": timedelta(days=1), "h": timedelta(hours=1), "m": timedelta(minutes=1)}
+
+
+@dataclass(frozen=True)
+class Occurrence:
+    event_id: str
+    start: datetime   # aware, UTC
+    end: datetime     # aware, UTC
+
+    def is_live(self, at: datetime) -> bool:
+        return self.start <= at < self.end
+
+
+def parse_span(text: str | None) -> Optional[timedelta]:
+    """'3d', '12h 30m', '3 days', '1 week' → timedelta; None if nothing recognised."""
+    if not text:
+        return None
+    total = timedelta()
+    found = False
+    for num, unit in _SPAN_RE.findall(text):
+        total += float(num) * _SPAN_UNITS[unit[0].lower()]
+        found = True
+    return total if found and total > timedelta() else None
+
+
+def now_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _zone(name: str):
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def _wall(dt: datetime, zone) -> datetime:
+    """Naive wall-clock time in zone (naive input is already wall time there)."""
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(zone).replace(tzinfo=None)
+
+
+def _utc(wall: datetime, zone) -> datetime:
+    return wall.replace(tzinfo=zone).astimezone(timezone.utc)
+
+
+def _aware(dt: datetime, zone) -> datetime:
+    return _utc(dt, zone) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def expand(w: TimeWindow, fallback_length: str | None, frm: datetime, to: datetime) -> Iterator[Tuple[datetime, datetime]]:
+    """
+    Occurrences (start, end) of one window overlapping [frm, to), in UTC.
+    Recurrence is stepped in the window's wall clock, so a weekly 10:00
+    Europe/Moscow rotation stays at 10:00 local across DST changes.
+    """
+    zone = _zone(w.tz)
+    start = _wall(w.start, zone)
+    if w.end is not None:
+        length = _wall(w.end, zone) - start
+    else:
+        length = parse_span(w.length) or parse_span(fallback_length)
+    if not length or length <= timedelta():
+        return
+
+    period = parse_span(w.every)
+    if period is None:
+        s, e = _utc(start, zone), _utc(start + length, zone)
+        if s < to and e > frm:
+            yield s, e
+        return
+
+    until = _aware(w.until, zone) if w.until is not None else None
+    # прыгаем сразу к первому вхождению, которое может пересечь frm
+    k = max(0, (_wall(frm, zone) - length - start) // period)
+    while True:
+        local = start + k * period
+        s = _utc(local, zone)
+        if s >= to or (until is not None and s > until):
+            return
+        e = _utc(local + length, zone)
+        if e > frm:
+            yield s, e
+        k += 1
+
+
+class ScheduleIndex:
+    """
+    Sorted-boundary index over concrete occurrences.
+    - boundaries: every distinct start/end, sorted; segment i is [b[i], b[i+1])
+      and stores the occurrences live in it → live(at) is one bisect.
+      An occurrence is copied into every segment it spans, so memory is the sum
+      over occurrences of the boundaries inside them: O(n) while windows rarely
+      overlap, up to O(n·k) when k occurrences are live at once (long windows
+      over a frequent rotation)
+    - starts: occurrences sorted by start → upcoming(at) is one bisect + slice
+    - per event: its occurrences sorted by start → next_after(ev, at) is one
+      bisect; upcoming(distinct=True) takes the earliest of those per event
+    """
+
+    def __init__(self, occurrences: List[Occurrence], lo: datetime, hi: datetime):
+        self.lo, self.hi = lo, hi
+        self.starts = sorted(occurrences, key=lambda o: (o.start, o.end, o.event_id))
+        self._start_keys = [o.start for o in self.starts]
+
+        self._by_event: Dict[str, List[Occurrence]] = {}
+        for o in self.starts:
+            self._by_event.setdefault(o.event_id, []).append(o)
+        self._event_keys = {ev_id: [o.start for o in occ] for ev_id, occ in self._by_event.items()}
+
+        self.boundaries = sorted({o.start for o in occurrences} | {o.end for o in occurrences})
+        pos = {b: i for i, b in enumerate(self.boundaries)}
+        segs: List[List[Occurrence]] = [[] for _ in self.boundaries]
+        for o in self.starts:
+            for i in range(pos[o.start], pos[o.end]):
+                segs[i].append(o)
+        self._segments = [tuple(sorted(s, key=lambda o: o.end)) for s in segs]
+
+    def covers(self, at: datetime) -> bool:
+        return self.lo <= at and at + REBUILD_MARGIN <= self.hi
+
+    def live(self, at: datetime) -> Tuple[Occurrence, ...]:
+        i = bisect_right(self.boundaries, at) - 1
+        if i < 0:
+            return ()
+        return self._segments[i]
+
+    def next_after(self, ev_id: str, at: datetime) -> Optional[Occurrence]:
+        """First occurrence of one event starting after `at`."""
+        keys = self._event_keys.get(ev_id)
+        if not keys:
+            return None
+        i = bisect_right(keys, at)
+        return self._by_event[ev_id][i] if i < len(keys) else None
+
+    def upcoming(self, at: datetime, limit: int = 10, distinct: bool = False) -> List[Occurrence]:
+        if not distinct:
+            i = bisect_right(self._start_keys, at)
+            return self.starts[i:i + limit]
+        # только ближайшее вхождение каждого события: по бисекции на событие,
+        # а не проход по всем вхождениям частых ротаций
+        nxt = (self.next_after(ev_id, at) for ev_id in self._by_event)
+        return heapq.nsmallest(
+            limit, (o for o in nxt if o is not None), key=lambda o: (o.start, o.end, o.event_id),
+        )
+
+
+def build_index(events: List[Event], at: datetime) -> ScheduleIndex:
+    lo, hi = at - HORIZON_PAST, at + HORIZON_FUTURE
+    occ: List[Occurrence] = []
+    for ev in events:
+        for w in ev.windows:
+            for s, e in expand(w, ev.duration, lo, hi):
+                occ.append(Occurrence(ev.id, s, e))
+    return ScheduleIndex(occ, lo, hi)
+
+
+_index: ScheduleIndex | None = None
+_index_src: List[Event] | None = None
+
+
+def get_index(at: datetime | None = None) -> ScheduleIndex:
+    """Index for the current catalog; rebuilt when the catalog or the horizon changes."""
+    global _index, _index_src
+    at = at or now_utc()
+    events = events_repo._load()
+    if _index is None or _index_src is not events or not _index.covers(at):
+        _index = build_index(events, at)
+        _index_src = events
+    return _index
+
+
+def live_now(at: datetime | None = None, locale: str | None = None) -> List[Tuple[Event, Occurrence]]:
+    at = at or now_utc()
+    return _resolve(get_index(at).live(at), locale)
+
+
+def upcoming(at: datetime | None = None, limit: int = 10, distinct: bool = True,
+             locale: str | None = None) -> List[Tuple[Event, Occurrence]]:
+    """Events resolve in the caller's locale; windows come from the default catalog."""
+    at = at or now_utc()
+    return _resolve(get_index(at).upcoming(at, limit, distinct), locale)
+
+
+def next_occurrence(ev_id: str, at: datetime | None = None) -> Optional[Occurrence]:
+    """Current or next occurrence of one event (within the horizon)."""
+    at = at or now_utc()
+    idx = get_index(at)
+    for o in idx.live(at):
+        if o.event_id == ev_id:
+            return o
+    return idx.next_after(ev_id, at)
+
+
+def _resolve(occ, locale: str | None) -> List[Tuple[Event, Occurrence]]:
+    out: List[Tuple[Event, Occurrence]] = []
+    for o in occ:
+        ev = events_repo.get_by_id(o.event_id, locale)
+        if ev is not None:
+            out.append((ev, o))
+    return out
@@ -1,8 +1,13 @@
-from typing import List, Optional, Any
+from typing import List, Optional
 from pydantic import BaseModel
-from .storage import load_json_with_fallback
+from app.utils.i18n import locale_paths
+from .catalog import Catalog, LocaleCatalogs
+from .storage import iter_json_with_fallback
 
+SKILLS_FILE = "skills.json"
 SKILLS_PATHS = ("data/skills.json", "./skills.json")
+# skills.json — это список; на всякий случай поддержим { "skills": [...] }
+SKILLS_KEYS = ("skills",)
 
 class Skill(BaseModel):
     slug: str
@@ -15,48 +20,63 @@ class Skill(BaseModel):
     image: str | None = None  # "data/images/..." или url
 
 
-_cache: List[Skill] | None = None
+def _build(locale: str) -> Catalog[Skill]:
+    cat: Catalog[Skill] = Catalog(locale)
+    for _, x in iter_json_with_fallback(*locale_paths(locale, SKILLS_FILE, SKILLS_PATHS), keys=SKILLS_KEYS):
+        if not isinstance(x, dict):
+            continue
+        s = Skill(**x)
+        cat.add(s, [s.name, s.slug, s.effect], slug=s.slug, name=cat.norm(s.name))
+    return cat
+
+
+# Каталоги по локалям: data/<locale>/skills.json грузится при первом запросе
+_catalogs: LocaleCatalogs[Skill] = LocaleCatalogs(SKILLS_FILE, _build)
+
+
+def _catalog(locale: str | None = None) -> Catalog[Skill]:
+    return _catalogs.get(locale)
+
 
+def version() -> int:
+    return _catalogs.version
 
-def _as_list(raw: Any) -> List[dict]:
-    # skills.json — это список
-    if isinstance(raw, list):
-        return raw
-    # На всякий случай поддержим { "skills": [...] }
-    if isinstance(raw, dict) and isinstance(raw.get("skills"), list):
-        return raw["skills"]
-    return []
 
+def reload() -> None:
+    _catalogs.clear()
 
-def _load() -> List[Skill]:
-    global _cache
-    if _cache is None:
-        raw = load_json_with_fallback(*SKILLS_PATHS)
-        rows = _as_list(raw)
-        _cache = [Skill(**x) for x in rows]
-    return _cache
 
+def state():
+    """Loaded catalogs for the warm-start snapshot (see utils/snapshot.py)."""
+    return _catalogs.state()
 
-def list_skills() -> List[Skill]:
-    return sorted(_load(), key=lambda s: s.name.lower())
 
+def restore(state) -> None:
+    _catalogs.restore(state)
 
-def get_by_slug_or_name(key: str) -> Optional[Skill]:
+
+def _load(locale: str | None = None) -> List[Skill]:
+    return _catalog(locale).items
+
+
+def list_skills(locale: str | None = None) -> List[Skill]:
+    return _catalog(locale).sorted_by(lambda s: s.name.lower())
+
+
+def get_by_slug_or_name(key: str, locale: str | None = None) -> Optional[Skill]:
     if not key:
         return None
-    q = key.strip().lower()
-    for s in _load():
-        if s.slug == key or s.name.lower() == q:
-            return s
-    return None
+    cat = _catalog(locale)
+    return cat.get("slug", key) or cat.get("name", cat.norm(key.strip()))
 
 
-def search(q: str, *, season: str | None = None, type_: str | None = None) -> List[Skill]:
-    ql = (q or "").strip().lower()
+def search(q: str, *, season: str | None = None, type_: str | None = None,
+           locale: str | None = None) -> List[Skill]:
+    cat = _catalog(locale)
+    positions = cat.match(q) if (q or "").strip() else range(len(cat.items))
     res = []
-    for s in _load():
-        if ql and ql not in (s.name.lower() + " " + s.slug.lower() + " " + (s.effect or "").lower()):
-            continue
+    for i in positions:
+        s = cat.items[i]
         if season and s.season != season:
             continue
         if type_ and s.type.lower() != type_.lower():
@@ -1,6 +1,21 @@
 import json
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator, Tuple
+
+try:
+    import fcntl
+except ImportError:   # Windows: один процесс, блокировка не нужна
+    fcntl = None
+
+# Размер куска при потоковом чтении; при записи больше куска буфер растёт
+CHUNK_SIZE = 1 << 16
+
+_WS = " \t\r\n"
+# после законченного значения в валидном JSON может стоять только это
+_DELIMS = _WS + ",:]}"
+_decoder = json.JSONDecoder()
+
 
 def load_json_with_fallback(*paths: str) -> Any:
     for p in paths:
@@ -8,3 +23,152 @@ def load_json_with_fallback(*paths: str) -> Any:
         if path.exists():
             return json.loads(path.read_text(encoding="utf-8"))
     raise FileNotFoundError(f"No JSON found in: {paths}")
+
+
+def first_existing(*paths: str) -> Path:
+    for p in paths:
+        path = Path(p)
+        if path.exists():
+            return path
+    raise FileNotFoundError(f"No JSON found in: {paths}")
+
+
+class _Reader:
+    """
+    Минимальный инкрементальный токенайзер поверх текстового файла.
+    В памяти держим только непрочитанный хвост буфера — примерно одну запись.
+    """
+
+    def __init__(self, f, chunk_size: int = CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int | None = None) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # отбрасываем уже разобранную часть, чтобы буфер не рос
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        got = self.peek()
+        if got != ch:
+            raise json.JSONDecodeError(f"Expecting {ch!r}", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Декодируем одно JSON-значение, подчитывая файл пока его не хватает."""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+                # число на границе куска могло обрезаться ("2." из "2.5") —
+                # принимаем значение, только если за ним виден разделитель
+                if (end < len(self.buf) and self.buf[end] in _DELIMS) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # запись длиннее буфера — удваиваем порцию, чтобы не декодировать квадратично
+            self._fill(size)
+            size *= 2
+
+
+def _iter_array(r: _Reader) -> Iterator[Any]:
+    r.expect("[")
+    if r.peek() == "]":
+        r.pos += 1
+        return
+    while True:
+        yield r.value()
+        ch = r.peek()
+        r.pos += 1
+        if ch == "]":
+            return
+        if ch != ",":
+            raise json.JSONDecodeError("Expecting ',' or ']'", r.buf, r.pos - 1)
+
+
+def iter_json_records(path: Path, keys: Iterable[str] = ()) -> Iterator[Tuple[str | None, Any]]:
+    """
+    Потоковое чтение JSON без построения всего дерева.
+    - корень-список → (None, элемент) для каждого элемента
+    - корень-объект → для ключей из keys: массив отдаётся поэлементно (key, элемент),
+      любое другое значение — одной парой (key, значение); остальные ключи пропускаются
+    Пиковая память ~ размер одной записи + CHUNK_SIZE.
+    """
+    wanted = set(keys)
+    with Path(path).open("r", encoding="utf-8") as f:
+        r = _Reader(f)
+        ch = r.peek()
+        if ch == "[":
+            for item in _iter_array(r):
+                yield None, item
+            return
+        if ch != "{":
+            # скаляр в корне — отдаём как есть
+            yield None, r.value()
+            return
+
+        r.expect("{")
+        if r.peek() == "}":
+            return
+        while True:
+            key = r.value()
+            r.expect(":")
+            if key in wanted and r.peek() == "[":
+                for item in _iter_array(r):
+                    yield key, item
+            else:
+                v = r.value()
+                if key in wanted:
+                    yield key, v
+                del v
+            ch = r.peek()
+            r.pos += 1
+            if ch == "}":
+                return
+            if ch != ",":
+                raise json.JSONDecodeError("Expecting ',' or '}'", r.buf, r.pos - 1)
+
+
+def iter_json_with_fallback(*paths: str, keys: Iterable[str] = ()) -> Iterator[Tuple[str | None, Any]]:
+    """Как load_json_with_fallback, но потоково (см. iter_json_records)."""
+    return iter_json_records(first_existing(*paths), keys)
+
+
+@contextmanager
+def file_lock(path: str | Path) -> Iterator[None]:
+    """
+    Exclusive lock on <path>.lock between processes (pre-fork workers write
+    shared state files at shutdown: read → merge → replace under this lock).
+    """
+    lock = Path(str(path) + ".lock")
+    lock.parent.mkdir(parents=True, exist_ok=True)
+    with lock.open("a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
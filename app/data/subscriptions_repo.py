@@ -0,0 +1,185 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+# Подписки чатов на события + журнал доставок (чтобы не слать повторно после рестарта).
+# bot — имя бота из multibot, через которого чат подписался: напоминание можно
+# прислать только им же. "" — основной бот (и все подписки из старых баз).
+# locale — язык того, кто подписал чат: на нём и придёт напоминание.
+DB_PATH = "data/bot.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscriptions (
+    bot        TEXT    NOT NULL DEFAULT '',
+    event_id   TEXT    NOT NULL,
+    chat_id    INTEGER NOT NULL,
+    created_at REAL    NOT NULL,
+    locale     TEXT    NOT NULL DEFAULT '',
+    PRIMARY KEY (bot, event_id, chat_id)
+);
+CREATE INDEX IF NOT EXISTS subscriptions_bot_chat ON subscriptions (bot, chat_id);
+CREATE TABLE IF NOT EXISTS deliveries (
+    bot        TEXT    NOT NULL DEFAULT '',
+    occurrence TEXT    NOT NULL,
+    chat_id    INTEGER NOT NULL,
+    sent_at    REAL    NOT NULL,
+    PRIMARY KEY (bot, occurrence, chat_id)
+);
+"""
+
+# базы до появления колонки bot: первичный ключ другой — пересобираем таблицы
+_MIGRATE_BOT = """
+BEGIN;
+ALTER TABLE subscriptions RENAME TO subscriptions_old;
+ALTER TABLE deliveries RENAME TO deliveries_old;
+DROP INDEX IF EXISTS subscriptions_chat;
+""" + _SCHEMA + """
+INSERT INTO subscriptions (event_id, chat_id, created_at) SELECT event_id, chat_id, created_at FROM subscriptions_old;
+INSERT INTO deliveries (occurrence, chat_id, sent_at) SELECT occurrence, chat_id, sent_at FROM deliveries_old;
+DROP TABLE subscriptions_old;
+DROP TABLE deliveries_old;
+COMMIT;
+"""
+
+_conn: sqlite3.Connection | None = None
+# Вызовы идут из asyncio.to_thread — сериализуем доступ к одному соединению
+_lock = threading.Lock()
+
+
+def init(path: str | None = None) -> None:
+    global _conn, DB_PATH
+    with _lock:
+        if path:
+            DB_PATH = path
+        if _conn is not None:
+            _conn.close()
+        Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        cols = {r[1] for r in _conn.execute("PRAGMA table_info(subscriptions)")}
+        if cols and "locale" not in cols and "bot" in cols:
+            # новая колонка в конце, ключ тот же — пересборка не нужна
+            _conn.execute("ALTER TABLE subscriptions ADD COLUMN locale TEXT NOT NULL DEFAULT ''")
+        _conn.executescript(_MIGRATE_BOT if cols and "bot" not in cols else _SCHEMA)
+
+
+def _db() -> sqlite3.Connection:
+    if _conn is None:
+        init()
+    return _conn
+
+
+def subscribe(chat_id: int, event_id: str, bot: str = "", locale: str = "") -> bool:
+    """True if the subscription is new; an existing one takes the new locale."""
+    with _lock:
+        db = _db()
+        cur = db.execute(
+            "INSERT OR IGNORE INTO subscriptions (bot, event_id, chat_id, created_at, locale) VALUES (?, ?, ?, ?, ?)",
+            (bot, event_id, chat_id, time.time(), locale),
+        )
+        if cur.rowcount > 0:
+            return True
+        db.execute(
+            "UPDATE subscriptions SET locale = ? WHERE bot = ? AND event_id = ? AND chat_id = ?",
+            (locale, bot, event_id, chat_id),
+        )
+        return False
+
+
+def unsubscribe(chat_id: int, event_id: str, bot: str = "") -> bool:
+    with _lock:
+        cur = _db().execute(
+            "DELETE FROM subscriptions WHERE bot = ? AND event_id = ? AND chat_id = ?", (bot, event_id, chat_id)
+        )
+        return cur.rowcount > 0
+
+
+def drop_chat(chat_id: int, bot: str = "") -> None:
+    """Chat blocked the bot / was deleted — forget all its subscriptions to that bot."""
+    with _lock:
+        _db().execute("DELETE FROM subscriptions WHERE bot = ? AND chat_id = ?", (bot, chat_id))
+
+
+def is_subscribed(chat_id: int, event_id: str, bot: str = "") -> bool:
+    with _lock:
+        row = _db().execute(
+            "SELECT 1 FROM subscriptions WHERE bot = ? AND event_id = ? AND chat_id = ?", (bot, event_id, chat_id)
+        ).fetchone()
+        return row is not None
+
+
+def events_for_chat(chat_id: int, bot: str = "") -> List[str]:
+    with _lock:
+        rows = _db().execute(
+            "SELECT event_id FROM subscriptions WHERE bot = ? AND chat_id = ? ORDER BY created_at", (bot, chat_id)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+
+def subscribed_events(bot: str = "") -> List[str]:
+    with _lock:
+        return [r[0] for r in _db().execute("SELECT DISTINCT event_id FROM subscriptions WHERE bot = ?", (bot,))]
+
+
+def pending_chats(
+    occurrence: str, event_id: str, after_chat: int | None, limit: int, bot: str = "",
+) -> List[Tuple[int, str]]:
+    """
+    Next page of (chat_id, locale) of subscribers not yet notified about this occurrence.
+    Keyset pagination by chat_id keeps each batch O(limit) on large tables.
+    """
+    with _lock:
+        rows = _db().execute(
+            """
+            SELECT s.chat_id, s.locale FROM subscriptions s
+            WHERE s.bot = ? AND s.event_id = ? AND s.chat_id > ?
+              AND NOT EXISTS (
+                SELECT 1 FROM deliveries d WHERE d.bot = s.bot AND d.occurrence = ? AND d.chat_id = s.chat_id
+              )
+            ORDER BY s.chat_id LIMIT ?
+            """,
+            (bot, event_id, after_chat if after_chat is not None else -(1 << 63), occurrence, limit),
+        ).fetchall()
+        return [(r[0], r[1]) for r in rows]
+
+
+def claim(occurrence: str, chat_ids: Iterable[int], bot: str = "") -> List[int]:
+    """
+    Record deliveries *before* sending; returns only chats claimed by this call.
+    A crash after claim may skip a reminder but never sends it twice.
+    """
+    now = time.time()
+    claimed: List[int] = []
+    with _lock:
+        db = _db()
+        db.execute("BEGIN")
+        try:
+            for cid in chat_ids:
+                cur = db.execute(
+                    "INSERT OR IGNORE INTO deliveries (bot, occurrence, chat_id, sent_at) VALUES (?, ?, ?, ?)",
+                    (bot, occurrence, cid, now),
+                )
+                if cur.rowcount > 0:
+                    claimed.append(cid)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+    return claimed
+
+
+def release(occurrence: str, chat_ids: Iterable[int], bot: str = "") -> None:
+    """Undo claims for sends that failed transiently: the reminder retries them, and so does a restart."""
+    with _lock:
+        _db().executemany(
+            "DELETE FROM deliveries WHERE bot = ? AND occurrence = ? AND chat_id = ?",
+            [(bot, occurrence, cid) for cid in chat_ids],
+        )
+
+
+def prune_deliveries(older_than_s: float) -> None:
+    with _lock:
+        _db().execute("DELETE FROM deliveries WHERE sent_at < ?", (time.time() - older_than_s,))
@@ -1 +1 @@
-from . import base, events, errors, skills, heroes, mount_skills, kvk3, equipment, jewels
+from . import base, events, errors, skills, heroes, mount_skills, kvk3, equipment, jewels, subscriptions, admin, team
@@ -0,0 +1,144 @@
+import asyncio
+import html
+import os
+import signal
+import time
+
+from aiogram import Router, F
+from aiogram.filters import Command
+from aiogram.types import Message, FSInputFile
+
+from app.config import settings
+from app.data import analytics_repo, equipment_repo, events_repo, heroes_repo, jewels_repo, skills_repo
+from app.keyboards.cache import keyboards
+from app.utils import analytics, equipment_opt, lifecycle, metrics, profiling, reminders, snapshot, team_builder
+from app.utils import mount_skills as S
+
+router = Router(name="admin")
+# Все команды этого роутера — только для ADMIN_IDS
+router.message.filter(F.from_user.id.in_(set(settings.ADMIN_IDS)))
+
+PROFILE_HELP = (
+    "<b>/profile</b>\n"
+    "cpu [seconds] – sample the event loop, send a .folded flamegraph file\n"
+    "mem start – start tracemalloc\n"
+    "mem diff – snapshot + diff against the previous snapshot\n"
+    "mem stop – stop tracemalloc\n"
+    "tasks – dump every asyncio task stack"
+)
+MAX_CPU_SECONDS = 120
+
+
+@router.message(Command("profile"))
+async def cmd_profile(m: Message):
+    args = (m.text or "").split()[1:]
+    if not args:
+        return await m.answer(PROFILE_HELP)
+
+    what = args[0].lower()
+    if what == "cpu":
+        try:
+            seconds = float(args[1]) if len(args) > 1 else 10.0
+        except ValueError:
+            return await m.answer(PROFILE_HELP)
+        seconds = max(1.0, min(seconds, MAX_CPU_SECONDS))
+        await m.answer(f"⏱ Sampling CPU for {seconds:g}s…")
+        try:
+            path, samples = await profiling.profile_cpu(seconds)
+        except RuntimeError as e:
+            return await m.answer(str(e))
+        return await m.answer_document(FSInputFile(path), caption=f"{samples} samples")
+
+    if what == "mem":
+        action = args[1].lower() if len(args) > 1 else "diff"
+        if action == "start":
+            await asyncio.to_thread(profiling.mem_start)
+            return await m.answer("🧠 tracemalloc started.")
+        if action == "stop":
+            profiling.mem_stop()
+            return await m.answer("🧠 tracemalloc stopped.")
+        try:
+            path = await asyncio.to_thread(profiling.mem_diff)
+        except RuntimeError as e:
+            return await m.answer(str(e))
+        return await m.answer_document(FSInputFile(path))
+
+    if what == "tasks":
+        # стек задач читаем на самом event loop — иначе он гоночный
+        path = profiling.dump_tasks()
+        return await m.answer_document(FSInputFile(path))
+
+    await m.answer(PROFILE_HELP)
+
+
+@router.message(Command("metrics"))
+async def cmd_metrics(m: Message):
+    """/metrics [prefix] — process counters and gauges (queue depth, drops, …)."""
+    args = (m.text or "").split(maxsplit=1)
+    prefix = args[1].strip() if len(args) > 1 else ""
+    await m.answer(f"<pre>{metrics.render(prefix)}</pre>")
+
+
+def reload_data() -> None:
+    """Drop parsed catalogs, models and keyboards; they are re-read on next use (or by keyboards.warm)."""
+    events_repo.reload()
+    heroes_repo.reload()
+    skills_repo.reload()
+    equipment_repo.reload()
+    jewels_repo.reload()
+    S.reload()
+    team_builder.reload_model()
+    equipment_opt.reload_goals()
+    snapshot.refresh()
+    keyboards.clear()
+
+
+@router.message(Command("reload"))
+async def cmd_reload(m: Message):
+    """
+    /reload — re-read data files, the team and gear models, rebuild cached keyboards, replan reminders.
+    Under app.prefork the parent reloads once and restarts every worker from it,
+    so all bots see the new data and the workers keep sharing it.
+    """
+    if lifecycle.prefork_parent is not None:
+        os.kill(lifecycle.prefork_parent, signal.SIGHUP)
+        return await m.answer("♻️ Reloading: all workers restart with the new data in a few seconds.")
+    reload_data()
+    # каталоги читаются с диска внутри warm — делаем это вне event loop
+    n = await asyncio.to_thread(keyboards.warm)
+    await analytics.warm(settings.WARM_POPULAR)
+    reminders.wake()
+    await m.answer(f"♻️ Reloaded. {n} keyboards prebuilt.")
+
+
+STATS_KINDS = ("event", "hero", "skill", "mount_skill")
+
+
+@router.message(Command("stats"))
+async def cmd_stats(m: Message):
+    """/stats [days] — most opened cards, frequent and fruitless searches."""
+    args = (m.text or "").split()[1:]
+    days = int(args[0]) if args and args[0].isdigit() else 7
+    # свежие нажатия ещё в буфере — сначала сбрасываем, чтобы цифры были полными
+    await analytics.flush()
+    since = int(time.time() // 86400) - days + 1
+
+    def collect():
+        tops = {kind: analytics_repo.top_views(kind, since, 10) for kind in STATS_KINDS}
+        return tops, analytics_repo.top_searches(since, 10), analytics_repo.top_searches(since, 10, empty_only=True)
+
+    tops, searches, empty = await asyncio.to_thread(collect)
+    lines = [f"<b>Last {days} day(s)</b>"]
+    for kind, rows in tops.items():
+        if rows:
+            lines.append(f"\n<b>{kind}</b>")
+            lines.extend(f"{n:>6}  {html.escape(key)}" for key, n in rows)
+    if searches:
+        lines.append("\n<b>searches</b>")
+        lines.extend(f"{n:>6}  {kind}: {html.escape(q)}" for kind, q, n, _ in searches)
+    if empty:
+        lines.append("\n<b>searches without results</b>")
+        lines.extend(f"{miss:>6}  {kind}: {html.escape(q)}" for kind, q, _, miss in empty)
+    if len(lines) == 1:
+        lines.append("no data yet")
+    await m.answer("\n".join(lines))
@@ -4,9 +4,11 @@ from aiogram.filters import CommandStart, Command
 from aiogram.types import (
     ReplyKeyboardMarkup, KeyboardButton,
     InlineKeyboardMarkup, InlineKeyboardButton,
-    FSInputFile,
 )
 
+from app.utils import media_cache
+from app.utils.cbrouter import callbacks
+
 router = Router()
 
 WELCOME_TEXT = (
@@ -21,7 +23,13 @@ WELCOME_TEXT = (
 HELP_TEXT = (
     "📖 <b>Commands</b>\n\n"
     "/events – show events (list or search)\n"
+    "/events now – events running right now\n"
+    "/events next – upcoming events\n"
+    "/subscribe &lt;event&gt; – remind this chat before an event\n"
+    "/unsubscribe &lt;event&gt; – stop those reminders\n"
+    "/subscriptions – reminders of this chat\n"
     "/skills – show skills (list or search)\n"
+    "/team [size] [specialty] [+hero] – best hero teams\n"
 )
 
 def main_menu_keyboard() -> ReplyKeyboardMarkup:
@@ -60,11 +68,12 @@ async def cmd_start(m: types.Message):
     banner = _find_banner()
 
     if banner:
-        await m.answer_photo(
-            photo=FSInputFile(banner),
+        # один баннер на всех — после первой загрузки шлём по file_id
+        await media_cache.send_photo(banner, lambda photo: m.answer_photo(
+            photo=photo,
             caption=WELCOME_TEXT.format(name=name),
             reply_markup=quick_links_inline(),
-        )
+        ))
     else:
         await m.answer(
             WELCOME_TEXT.format(name=name),
@@ -76,7 +85,9 @@ async def cmd_start(m: types.Message):
 async def cmd_help(m: types.Message):
     await m.answer(HELP_TEXT, reply_markup=main_menu_keyboard())
 
-@router.callback_query(lambda c: c.data in {"menu:events", "menu:skills"})
-async def cb_menu_open(q: types.CallbackQuery):
-    await q.message.answer("/events" if q.data == "menu:events" else "/skills")
+@callbacks.route("menu", str)
+async def cb_menu_open(q: types.CallbackQuery, section: str):
+    if section not in {"events", "skills"}:
+        return await q.answer()
+    await q.message.answer(f"/{section}")
     await q.answer()
@@ -1,17 +1,60 @@
-from aiogram import Router
-from aiogram.types import Message
+from aiogram import Router, types
 from aiogram.filters import Command
-from pathlib import Path
-from app.utils.render import load_json
+
+from app.data import equipment_repo
+from app.data.equipment_repo import TROOPS
+from app.utils import equipment_opt
+from app.utils.i18n import t, user_locale
+from app.utils.render import equipment_builds, equipment_list, esc
 
 router = Router()
-EQUIPMENT_FILE = Path("data/equipment.json")
+
+EQUIPMENT_HELP = (
+    "<b>/equipment optimize</b> [troop] [goal] [+item …]\n"
+    "/equipment – all items by slot\n"
+    "/equipment optimize cavalry attack – best attack gear for cavalry\n"
+    "/equipment optimize defense +dragon_helm – defensive gear with the Dragon Helm\n"
+    "troops: " + ", ".join(TROOPS) + "; goals: " + ", ".join(equipment_opt.DEFAULT_GOALS)
+)
+
+
+def _parse(args: list[str], locale: str):
+    """→ (troop, goal, locked item slugs, unknown words)."""
+    troop, goal, locks, unknown = None, equipment_opt.DEFAULT_GOAL, [], []
+    goals = equipment_opt.goals()
+    for a in args:
+        w = a.lower()
+        if w in TROOPS or w.rstrip("s") in TROOPS:
+            troop = w if w in TROOPS else w.rstrip("s")
+        elif w in goals:
+            goal = w
+        elif a.startswith("+") and len(a) > 1:
+            # имена из нескольких слов: +Dragon_Helm
+            e = equipment_repo.get_by_slug_or_name(a[1:], locale) \
+                or equipment_repo.get_by_slug_or_name(a[1:].replace("_", " "), locale)
+            if e:
+                locks.append(e.slug)
+            else:
+                unknown.append(a[1:])
+        else:
+            unknown.append(a)
+    return troop, goal, locks, unknown
+
 
 @router.message(Command("equipment"))
-async def cmd_equipment(message: Message):
-    equipment = load_json(EQUIPMENT_FILE)
-    if not equipment:
-        await message.answer("🛡️ Equipment section is under development.")
-        return
-    text = "\n".join([e.get("name", "Unknown") for e in equipment])
-    await message.answer(f"🛡️ Equipment:\n{text}")
+async def cmd_equipment(message: types.Message):
+    """/equipment [optimize [troop] [goal] [+item …]] — item list or the best gear set."""
+    loc = user_locale(message.from_user)
+    args = (message.text or "").split()[1:]
+    items = equipment_repo.list_equipment(loc)
+    if not items:
+        return await message.answer(t("no_equipment", loc))
+    if not args:
+        return await message.answer(equipment_list(items, loc))
+    if args[0].lower() not in ("optimize", "opt", "best"):
+        return await message.answer(EQUIPMENT_HELP)
+    troop, goal, locks, unknown = _parse(args[1:], loc)
+    if unknown:
+        return await message.answer(f"{t('not_found', loc)}: {esc(', '.join(unknown))}\n\n{EQUIPMENT_HELP}")
+    builds = await equipment_opt.best_builds(troop, goal, locks, locale=loc)
+    await message.answer(equipment_builds(builds, troop, goal, loc))
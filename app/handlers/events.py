@@ -1,9 +1,18 @@
-from aiogram import Router, types, F
+import asyncio
+
+from aiogram import Router, types
 from aiogram.filters import Command
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 from app.data import events_repo as repo
-from app.utils.render import event_card, rules_block
+from app.data import schedule
+from app.data import subscriptions_repo as subs
+from app.keyboards.cache import keyboards
+from app.keyboards.events import event_details_kb
+from app.utils import analytics, multibot
+from app.utils.cbrouter import callbacks
+from app.utils.i18n import LOCALES, t, user_locale
+from app.utils.render import event_card, rules_block, events_schedule, cached_card
 
 router = Router()
 
@@ -11,7 +20,7 @@ PER_PAGE = 10
 
 
 # ------- Keyboards -------
-def _kb_events(names: list[str], page: int = 0) -> InlineKeyboardMarkup:
+def _kb_events(names: list[str], page: int = 0, locale: str | None = None) -> InlineKeyboardMarkup:
     start = page * PER_PAGE
     chunk = names[start:start + PER_PAGE]
 
@@ -19,71 +28,108 @@ def _kb_events(names: list[str], page: int = 0) -> InlineKeyboardMarkup:
 
     nav = []
     if page > 0:
-        nav.append(InlineKeyboardButton(text="⭠ Prev", callback_data=f"ev:list:{page - 1}"))
+        nav.append(InlineKeyboardButton(text=t("prev", locale), callback_data=f"ev:list:{page - 1}"))
     if start + PER_PAGE < len(names):
-        nav.append(InlineKeyboardButton(text="Next ⭢", callback_data=f"ev:list:{page + 1}"))
+        nav.append(InlineKeyboardButton(text=t("next", locale), callback_data=f"ev:list:{page + 1}"))
     if nav:
         rows.append(nav)
 
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-def _kb_event_details(ev_id: str, has_rules: bool) -> InlineKeyboardMarkup | None:
-    if not has_rules:
-        return None
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="📜 Rules", callback_data=f"ev:rules:{ev_id}")]
-        ]
+def _kb_events_page(page: int, locale: str) -> InlineKeyboardMarkup:
+    """Page of the full list; built once per (locale, page, data version)."""
+    return keyboards.get(
+        ("ev:list", locale, page, repo.version()),
+        lambda: _kb_events([e.name for e in repo.list_events(locale)], page=page, locale=locale),
     )
 
 
+@keyboards.warmer
+def warm_keyboards() -> None:
+    """Prebuild every page of the full list for each locale."""
+    for locale in LOCALES:
+        pages = max(1, -(-len(repo.list_events(locale)) // PER_PAGE))
+        for page in range(pages):
+            _kb_events_page(page, locale)
+
+
+@analytics.warmer
+def warm_popular(n: int) -> None:
+    """Render the cards of the most opened events for each locale."""
+    for ev_id in analytics.top("event", n):
+        for locale in LOCALES:
+            ev = repo.get_by_id(ev_id, locale)
+            if ev:
+                cached_card("event", ev.id, ev, event_card, locale)
+
+
 # ------- Commands -------
 @router.message(Command("events"))
 async def cmd_events(m: types.Message):
     parts = m.text.split(maxsplit=1)
+    loc = user_locale(m.from_user)
 
     # No query -> full list with pagination
     if len(parts) == 1:
-        names = [e.name for e in repo.list_events()]
-        if not names:
-            return await m.answer("No events yet.")
-        return await m.answer("Select an event:", reply_markup=_kb_events(names, page=0))
+        if not repo.list_events(loc):
+            return await m.answer(t("no_events", loc))
+        return await m.answer(t("select_event", loc), reply_markup=_kb_events_page(0, loc))
 
-    # With query -> search (simple list, no pagination for simplicity)
     q = parts[1].strip()
-    hits = repo.search(q)
+
+    # /events now | /events next -> schedule views
+    if q.lower() in ("now", "next"):
+        return await _send_schedule(m, q.lower(), loc)
+
+    # With query -> search (simple list, no pagination for simplicity)
+    hits = repo.search(q, loc)
+    analytics.search("event", q, len(hits))
     if not hits:
-        return await m.answer("No matches found.")
-    names = [e.name for e in hits][:30]
-    await m.answer(f"Found {len(hits)} match(es). Select:", reply_markup=_kb_events(names, page=0))
+        return await m.answer(t("no_matches", loc))
+    names = [e.name for e in analytics.rank("event", hits, lambda e: e.id)][:30]
+    await m.answer(t("found", loc, n=len(hits)), reply_markup=_kb_events(names, page=0, locale=loc))
+
+
+async def _send_schedule(m: types.Message, mode: str, loc: str):
+    now = schedule.now_utc()
+    if mode == "now":
+        rows = schedule.live_now(now, locale=loc)
+    else:
+        rows = schedule.upcoming(now, limit=PER_PAGE, locale=loc)
+    text = events_schedule(rows, now, live=(mode == "now"), locale=loc)
+    names = list(dict.fromkeys(ev.name for ev, _ in rows))
+    await m.answer(text, reply_markup=_kb_events(names, page=0, locale=loc) if names else None)
 
 
 # ------- Callbacks -------
-@router.callback_query(F.data.startswith("ev:list:"))
-async def cb_list(q: types.CallbackQuery):
-    try:
-        page = int(q.data.split(":", 2)[2])
-    except Exception:
-        page = 0
-    names = [e.name for e in repo.list_events()]
-    await q.message.edit_reply_markup(reply_markup=_kb_events(names, page=page))
+@callbacks.route("ev:list", int)
+async def cb_list(q: types.CallbackQuery, page: int):
+    loc = user_locale(q.from_user)
+    await q.message.edit_reply_markup(reply_markup=_kb_events_page(page, loc))
     await q.answer()
 
-@router.callback_query(F.data.startswith("ev:view:"))
-async def cb_view(q: types.CallbackQuery):
-    name = q.data.split(":", 2)[2]
-    ev = repo.get_by_name(name)
+@callbacks.route("ev:view", str)
+async def cb_view(q: types.CallbackQuery, name: str):
+    loc = user_locale(q.from_user)
+    # кнопку мог нажать участник группы с другой локалью — пробуем и основной каталог
+    ev = repo.get_by_name(name, loc) or repo.get_by_name(name)
     if not ev:
-        return await q.answer("Not found", show_alert=True)
-    await q.message.answer(event_card(ev), reply_markup=_kb_event_details(ev.id, ev.has_rules))
+        return await q.answer(t("not_found", loc), show_alert=True)
+    ev = repo.get_by_id(ev.id, loc) or ev
+    analytics.view("event", ev.id)
+    remind = None
+    if ev.windows:
+        remind = await asyncio.to_thread(subs.is_subscribed, q.message.chat.id, ev.id, multibot.current())
+    text = cached_card("event", ev.id, ev, event_card, loc)
+    await q.message.answer(text, reply_markup=event_details_kb(ev.id, ev.has_rules, remind, loc))
     await q.answer()
 
-@router.callback_query(F.data.startswith("ev:rules:"))
-async def cb_rules(q: types.CallbackQuery):
-    ev_id = q.data.split(":", 2)[2]
-    ev = repo.get_by_id(ev_id)
+@callbacks.route("ev:rules", str)
+async def cb_rules(q: types.CallbackQuery, ev_id: str):
+    loc = user_locale(q.from_user)
+    ev = repo.get_by_id(ev_id, loc)
     if not ev:
-        return await q.answer("Not found", show_alert=True)
-    await q.message.answer(rules_block(ev.name, ev.rules_text or "—"))
+        return await q.answer(t("not_found", loc), show_alert=True)
+    await q.message.answer(rules_block(ev.name, ev.rules_text or "—", loc))
     await q.answer()
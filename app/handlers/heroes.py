@@ -1,12 +1,17 @@
+import asyncio
 from pathlib import Path
 from typing import List, Tuple
 
-from aiogram import Router, types, F
+from aiogram import Router, types
 from aiogram.filters import Command
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, FSInputFile
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, InputMediaPhoto
 
 from app.data import heroes_repo as repo
-from app.utils.render import hero_header, hero_card, clamp_for_caption
+from app.keyboards.cache import keyboards
+from app.utils import analytics, contact_sheet, media_cache, similar
+from app.utils.cbrouter import callbacks
+from app.utils.i18n import LOCALES, DEFAULT_LOCALE, t, user_locale
+from app.utils.render import hero_header, hero_card, clamp_for_caption, cached_card
 
 router = Router()
 
@@ -15,11 +20,12 @@ PER_PAGE = 10
 
 # ---------- Helpers ----------
 
-def _pairs_all() -> List[Tuple[str, str]]:
+def _pairs_all(locale: str | None = None) -> List[Tuple[str, str]]:
     """Return (name, slug) for all heroes sorted by name."""
-    return [(h.name, h.slug) for h in repo.list_heroes()]
+    return [(h.name, h.slug) for h in repo.list_heroes(locale)]
 
-def _kb_heroes(pairs: List[Tuple[str, str]], page: int = 0) -> InlineKeyboardMarkup:
+def _kb_heroes(pairs: List[Tuple[str, str]], page: int = 0,
+               locale: str | None = None) -> InlineKeyboardMarkup:
     """Inline keyboard with pagination for heroes."""
     start = page * PER_PAGE
     chunk = pairs[start:start + PER_PAGE]
@@ -29,40 +35,138 @@ def _kb_heroes(pairs: List[Tuple[str, str]], page: int = 0) -> InlineKeyboardMar
 
     nav = []
     if page > 0:
-        nav.append(InlineKeyboardButton(text="⭠ Prev", callback_data=f"hr:list:{page - 1}"))
+        nav.append(InlineKeyboardButton(text=t("prev", locale), callback_data=f"hr:list:{page - 1}"))
     if start + PER_PAGE < len(pairs):
-        nav.append(InlineKeyboardButton(text="Next ⭢", callback_data=f"hr:list:{page + 1}"))
+        nav.append(InlineKeyboardButton(text=t("next", locale), callback_data=f"hr:list:{page + 1}"))
     if nav:
         rows.append(nav)
 
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
-async def _send_hero(message: types.Message, h) -> None:
+def _kb_heroes_page(page: int, locale: str) -> InlineKeyboardMarkup:
+    """Page of the full list; built once per (locale, page, data version)."""
+    return keyboards.get(
+        ("hr:list", locale, page, repo.version()),
+        lambda: _kb_heroes(_pairs_all(locale), page=page, locale=locale),
+    )
+
+@keyboards.warmer
+def warm_keyboards() -> None:
+    """Prebuild every page of the full list for each locale."""
+    for locale in LOCALES:
+        pages = max(1, -(-len(repo.list_heroes(locale)) // PER_PAGE))
+        for page in range(pages):
+            _kb_heroes_page(page, locale)
+
+def _kb_card(slug: str, locale: str) -> InlineKeyboardMarkup | None:
+    """The "Similar" button under a hero card — only when there is something to show."""
+    if not similar.similar_heroes(slug, locale):
+        return None
+    return keyboards.get(
+        ("hr:card", locale, slug),
+        lambda: InlineKeyboardMarkup(inline_keyboard=[[
+            InlineKeyboardButton(text=t("similar", locale), callback_data=f"hr:sim:{slug}"),
+        ]]),
+    )
+
+def _similar(slug: str, locale: str) -> list:
+    """Heroes with the closest specialty/talent/skill texts, from the precomputed table."""
+    heroes = (repo.get_by_slug_or_name(other, locale) for other, _ in similar.similar_heroes(slug, locale))
+    return [h for h in heroes if h]
+
+def _kb_similar(slug: str, locale: str) -> InlineKeyboardMarkup:
+    return keyboards.get(
+        ("hr:sim", locale, slug, repo.version()),
+        lambda: _kb_heroes([(h.name, h.slug) for h in _similar(slug, locale)], page=0, locale=locale),
+    )
+
+@keyboards.warmer
+def warm_similar() -> None:
+    """Build the neighbour tables (TF-IDF over all heroes) for each locale."""
+    for locale in LOCALES:
+        similar.warm("hero", locale)
+
+@analytics.warmer
+def warm_popular(n: int) -> None:
+    """Render the most opened hero cards and pre-upload their pictures."""
+    paths = []
+    for slug in analytics.top("hero", n):
+        for locale in LOCALES:
+            h = repo.get_by_slug_or_name(slug, locale)
+            if h:
+                cached_card("hero_header", h.slug, h, hero_header, locale)
+                cached_card("hero", h.slug, h, hero_card, locale)
+                if (h.image or "").strip():
+                    paths.append(h.image.strip())
+    media_cache.prefetch(dict.fromkeys(paths))
+
+def _prefetch_neighbors(h, locale: str) -> None:
+    """Heroes are browsed in list order — pre-upload the previous/next hero pictures."""
+    heroes = repo.list_heroes(locale)
+    try:
+        i = heroes.index(h)
+    except ValueError:
+        return
+    near = (heroes[j] for j in (i - 1, i + 1) if 0 <= j < len(heroes))
+    # URL-картинки prefetch пропустит сам: это не файлы на диске
+    media_cache.prefetch(x.image.strip() for x in near if (x.image or "").strip())
+
+def _sheet(heroes) -> Path | None:
+    """Contact sheet of one list screen (same heroes as the buttons); URL pictures get a blank tile."""
+    tiles = []
+    for h in heroes[:PER_PAGE]:
+        img = (h.image or "").strip()
+        tiles.append((img if img and Path(img).is_file() else None, h.name))
+    return contact_sheet.sheet(tiles)
+
+async def _answer_list(message: types.Message, text: str, heroes, kb: InlineKeyboardMarkup) -> None:
+    """A list screen as one photo of all its heroes with the keyboard under it; text without Pillow."""
+    sheet = None
+    try:
+        sheet = await asyncio.to_thread(_sheet, heroes)
+        if sheet is not None:
+            await media_cache.send_photo(sheet, lambda photo: message.answer_photo(
+                photo=photo, caption=text, reply_markup=kb,
+            ))
+            return
+    except Exception:
+        # лист не собрался или не ушёл — список текстом
+        if sheet is not None:
+            media_cache.forget(sheet)
+    await message.answer(text, reply_markup=kb)
+
+async def _send_hero(message: types.Message, h, locale: str | None = None) -> None:
     """
     Sends hero with picture if available:
     - caption: compact header (fits into Telegram caption limits)
     - full card: separate text message (Talents, Skills, Awakening lines)
     If no image found, sends the full card as a single text message.
     """
-    header = clamp_for_caption(hero_header(h))   # safe short caption
-    full = hero_card(h)
+    loc = locale or DEFAULT_LOCALE
+    header = clamp_for_caption(cached_card("hero_header", h.slug, h, hero_header, loc))   # safe short caption
+    full = cached_card("hero", h.slug, h, hero_card, loc)
 
+    kb = _kb_card(h.slug, loc)
     img = (h.image or "").strip()
     if img:
         p = Path(img)
         if p.exists() and p.is_file():
-            await message.answer_photo(photo=FSInputFile(p), caption=header)
+            _prefetch_neighbors(h, loc)
+            await media_cache.send_photo(p, lambda photo: message.answer_photo(
+                photo=photo, caption=header, reply_markup=None if len(full) > len(header) else kb,
+            ))
             if len(full) > len(header):
-                await message.answer(full)
+                await message.answer(full, reply_markup=kb)
             return
         if img.startswith("http://") or img.startswith("https://"):
-            await message.answer_photo(photo=img, caption=header)
+            await message.answer_photo(photo=img, caption=header,
+                                       reply_markup=None if len(full) > len(header) else kb)
             if len(full) > len(header):
-                await message.answer(full)
+                await message.answer(full, reply_markup=kb)
             return
 
     # Fallback: no image → send full card only
-    await message.answer(full)
+    await message.answer(full, reply_markup=kb)
 
 
 # ---------- Commands ----------
@@ -74,40 +178,65 @@ async def cmd_heroes(m: types.Message):
     /heroes <query text>   -> search by name/specialty/season/talents/skills
     """
     parts = m.text.split(maxsplit=1)
+    loc = user_locale(m.from_user)
 
     # No query → full list
     if len(parts) == 1:
-        pairs = _pairs_all()
-        if not pairs:
-            return await m.answer("No heroes yet.")
-        return await m.answer("Select a hero:", reply_markup=_kb_heroes(pairs, page=0))
+        if not repo.list_heroes(loc):
+            return await m.answer(t("no_heroes", loc))
+        return await _answer_list(m, t("select_hero", loc), repo.list_heroes(loc), _kb_heroes_page(0, loc))
 
     # With query → search
     q = parts[1].strip()
-    hits = repo.search(q)
+    hits = repo.search(q, locale=loc)
+    analytics.search("hero", q, len(hits))
     if not hits:
-        return await m.answer("No matches found.")
-    pairs = [(h.name, h.slug) for h in hits][:30]
-    await m.answer(f"Found {len(hits)} match(es). Select:", reply_markup=_kb_heroes(pairs, page=0))
+        return await m.answer(t("no_matches", loc))
+    ranked = analytics.rank("hero", hits, lambda h: h.slug)[:30]
+    kb = _kb_heroes([(h.name, h.slug) for h in ranked], page=0, locale=loc)
+    # у результатов поиска лист был бы свой на каждый запрос и порядок популярности — только текст
+    await m.answer(t("found", loc, n=len(hits)), reply_markup=kb)
 
 
 # ---------- Callbacks ----------
 
-@router.callback_query(F.data.startswith("hr:list:"))
-async def cb_list(q: types.CallbackQuery):
-    try:
-        page = int(q.data.split(":", 2)[2])
-    except Exception:
-        page = 0
-    pairs = _pairs_all()
-    await q.message.edit_reply_markup(reply_markup=_kb_heroes(pairs, page=page))
+@callbacks.route("hr:list", int)
+async def cb_list(q: types.CallbackQuery, page: int):
+    loc = user_locale(q.from_user)
+    kb = _kb_heroes_page(page, loc)
+    sheet = None
+    if q.message.photo:
+        try:
+            sheet = await asyncio.to_thread(_sheet, repo.list_heroes(loc)[page * PER_PAGE:])
+            if sheet is not None:
+                # листаем страницы: тот же фото-список, другой лист
+                await media_cache.send_photo(sheet, lambda photo: q.message.edit_media(
+                    media=InputMediaPhoto(media=photo, caption=q.message.html_text), reply_markup=kb,
+                ))
+        except Exception:
+            if sheet is not None:
+                media_cache.forget(sheet)
+            sheet = None
+    if sheet is None:
+        # без листа (текстовый список, Pillow нет, сборка упала) меняются только кнопки
+        await q.message.edit_reply_markup(reply_markup=kb)
     await q.answer()
 
-@router.callback_query(F.data.startswith("hr:view:"))
-async def cb_view(q: types.CallbackQuery):
-    slug = q.data.split(":", 2)[2]
-    h = repo.get_by_slug_or_name(slug)
+@callbacks.route("hr:view", str)
+async def cb_view(q: types.CallbackQuery, slug: str):
+    loc = user_locale(q.from_user)
+    h = repo.get_by_slug_or_name(slug, loc)
     if not h:
-        return await q.answer("Not found", show_alert=True)
-    await _send_hero(q.message, h)
+        return await q.answer(t("not_found", loc), show_alert=True)
+    analytics.view("hero", h.slug)
+    await _send_hero(q.message, h, loc)
+    await q.answer()
+
+@callbacks.route("hr:sim", str)
+async def cb_similar(q: types.CallbackQuery, slug: str):
+    loc = user_locale(q.from_user)
+    h = repo.get_by_slug_or_name(slug, loc)
+    if not h or not similar.similar_heroes(h.slug, loc):
+        return await q.answer(t("no_similar", loc), show_alert=True)
+    await _answer_list(q.message, t("similar_to", loc, name=h.name), _similar(h.slug, loc), _kb_similar(h.slug, loc))
     await q.answer()
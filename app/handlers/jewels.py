@@ -1,8 +1,83 @@
-from aiogram import Router
-from aiogram.types import Message
+import re
+
+from aiogram import Router, types
+from aiogram.filters import Command
+
+from app.data import jewels_repo as repo
+from app.utils import analytics, jewel_upgrade
+from app.utils.i18n import t, user_locale
+from app.utils.render import cached_card, esc, jewel_card, jewel_plan
 
 router = Router()
 
-@router.message(lambda msg: msg.text and msg.text.lower().startswith("/jewels"))
-async def jewels_handler(message: Message):
-    await message.answer("💎 Jewels section is under development...")
+MAX_COUNT = 100
+
+_STOCK = re.compile(r"^\d+:\d+$")
+_COUNT = re.compile(r"^[x×](\d+)$", re.IGNORECASE)
+
+
+def _parse(args: list[str]):
+    """→ (name, target level or None, count, stock args); numbers and level:count go after the name."""
+    name, target, count, stock = [], None, 1, []
+    for a in args:
+        if _STOCK.match(a):
+            stock.append(a)
+        elif _COUNT.match(a):
+            count = int(_COUNT.match(a).group(1))
+        elif a.isdigit() and name:
+            target = int(a)
+        else:
+            name.append(a)
+    return " ".join(name), target, count, stock
+
+
+def _list(loc: str) -> str:
+    lines = [f"💎 <b>{t('jewels', loc)}</b>", ""]
+    lines += [
+        f"• {esc(j.name)}" + (f" · {esc(j.type)}" if j.type else "") + f" · {t('level', loc)} 1–{j.max_level}"
+        for j in repo.list_jewels(loc)
+    ]
+    return "\n".join(lines)
+
+
+@router.message(Command("jewels"))
+async def jewels_handler(message: types.Message):
+    """/jewels [name] [level] [xN] [level:count …] — jewel list, card or the cheapest upgrade plan."""
+    loc = user_locale(message.from_user)
+    if not repo.list_jewels(loc):
+        return await message.answer(t("no_jewels", loc))
+    args = (message.text or "").split()[1:]
+    if not args:
+        return await message.answer(_list(loc))
+    if args[0].lower() in ("help", "?"):
+        return await message.answer(t("jewels_help", loc))
+    name, target, count, stock_args = _parse(args)
+    j = repo.get_by_slug_or_name(name, loc) or repo.get_by_slug_or_name(name.replace("_", " "), loc)
+    if j is None:
+        of_type = repo.by_type(name, loc)
+        hits = analytics.rank("jewel", of_type or repo.search(name, loc), lambda h: h.slug)
+        if len(hits) != 1:
+            if not hits:
+                return await message.answer(f"{t('not_found', loc)}: {esc(name)}\n\n{t('jewels_help', loc)}")
+            return await message.answer("\n".join(
+                [f"💎 <b>{esc(name)}</b>", ""] + [f"• {esc(h.name)}" for h in hits]
+            ))
+        j = hits[0]
+    cur = repo.currency(loc)
+    analytics.view("jewel", j.slug)
+    if target is None:
+        return await message.answer(
+            cached_card("jewel", j.slug, j, lambda x, lc: jewel_card(x, lc, cur), loc)
+        )
+    if not 1 <= target <= j.max_level or not 1 <= count <= MAX_COUNT:
+        return await message.answer(t("jewels_help", loc))
+    try:
+        stock = jewel_upgrade.parse_stock(stock_args, j.max_level)
+    except ValueError:
+        return await message.answer(t("jewels_help", loc))
+    # планы одинаковы для всех с тем же запросом — и расчёт, и текст карточки в кэше
+    plan = jewel_upgrade.plan(jewel_upgrade.tiers(j), target, count, stock)
+    key = f"{j.slug}:{target}x{count}:{','.join(map(str, stock))}"
+    await message.answer(
+        cached_card("jewel_plan", key, j, lambda x, lc: jewel_plan(x, plan, stock, lc, cur), loc)
+    )
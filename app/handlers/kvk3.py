@@ -1,17 +1,108 @@
+import asyncio
+from pathlib import Path
+
 from aiogram import Router
-from aiogram.types import Message
+from aiogram.enums import ChatMemberStatus, ChatType
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
-from pathlib import Path
-from app.utils.render import load_json
+from aiogram.types import Message
+
+from app.config import settings
+from app.data import kvk_repo as repo
+from app.utils import kvk
+from app.utils.i18n import t, user_locale
+from app.utils.render import cached_card, esc, kvk_projection, kvk_rallies, kvk_summary, load_json
 
 router = Router()
 KVK_FILE = Path("data/kvk.json")
 
+MAX_FILE_MB = 5
+MAX_RALLIES = 20
+DEFAULT_RALLIES = 5
+
+
+async def _can_edit(message: Message) -> bool:
+    """Private chats belong to their user; in groups only chat admins (or bot admins) edit the table."""
+    if message.chat.type == ChatType.PRIVATE:
+        return True
+    # анонимный админ группы пишет от имени самой группы (from_user — GroupAnonymousBot)
+    if message.sender_chat is not None:
+        return message.sender_chat.id == message.chat.id
+    if message.from_user is None:
+        return False
+    if message.from_user.id in settings.ADMIN_IDS:
+        return True
+    try:
+        member = await message.bot.get_chat_member(message.chat.id, message.from_user.id)
+    except TelegramBadRequest:
+        return False
+    return member.status in (ChatMemberStatus.CREATOR, ChatMemberStatus.ADMINISTRATOR)
+
+
+async def _import(message: Message, loc: str):
+    doc = message.document
+    if (doc.file_size or 0) > MAX_FILE_MB * 1024 * 1024:
+        return await message.answer(t("kvk_too_big", loc, mb=MAX_FILE_MB))
+    buf = await message.bot.download(doc)
+    try:
+        # разбор и слияние — numpy по колонкам, но на больших файлах это всё же не для event loop
+        roster, rows = await asyncio.to_thread(repo.import_csv, message.chat.id, buf.read())
+    except repo.BadTable as e:
+        return await message.answer(t("kvk_bad_file", loc, error=esc(str(e))))
+    await message.answer(t("kvk_imported", loc, added=rows, members=len(roster)))
+
+
 @router.message(Command("kvk3"))
 async def cmd_kvk(message: Message):
-    kvk = load_json(KVK_FILE)
-    if not kvk:
-        await message.answer("⚔️ KvK-3 section is under development.")
-        return
-    text = "\n".join([k.get("name", "Unknown") for k in kvk])
-    await message.answer(f"⚔️ KvK-3:\n{text}")
+    """/kvk3 [rallies N | project day days | reset], or a CSV document captioned /kvk3."""
+    loc = user_locale(message.from_user)
+    chat = message.chat.id
+    args = (message.text or message.caption or "").split()[1:]
+    sub = args[0].lower() if args else ""
+
+    if message.document or sub == "reset":
+        if not await _can_edit(message):
+            return await message.answer(t("kvk_not_allowed", loc))
+        if message.document:
+            return await _import(message, loc)
+        await asyncio.to_thread(repo.reset, chat)
+        return await message.answer(t("kvk_reset_done", loc))
+    if sub in ("help", "?"):
+        return await message.answer(t("kvk_help", loc))
+
+    roster = await asyncio.to_thread(repo.load, chat)
+    if roster is None or not len(roster):
+        plans = [k.get("name", "Unknown") for k in load_json(KVK_FILE)]
+        text = t("kvk_no_roster", loc)
+        if plans:
+            text = "⚔️ KvK-3:\n" + "\n".join(esc(p) for p in plans) + f"\n\n{text}"
+        return await message.answer(text)
+
+    # карточки привязаны к объекту состава: новый импорт — новый объект — пересчёт
+    if not sub:
+        return await message.answer(
+            cached_card("kvk", str(chat), roster, lambda r, lc: kvk_summary(kvk.summary(r), lc), loc)
+        )
+    if sub == "rallies":
+        n = int(args[1]) if len(args) > 1 and args[1].isdigit() else DEFAULT_RALLIES
+        n = max(1, min(n, MAX_RALLIES))
+        try:
+            text = cached_card(
+                "kvk_rallies", f"{chat}:{n}", roster, lambda r, lc: kvk_rallies(*kvk.rallies(r, n), lc), loc
+            )
+        except ValueError as e:
+            text = t("kvk_need_column", loc, col=str(e))
+        return await message.answer(text)
+    if sub == "project" and len(args) == 3 and args[1].isdigit() and args[2].isdigit():
+        day, days = int(args[1]), int(args[2])
+        if not 1 <= day <= days:
+            return await message.answer(t("kvk_help", loc))
+        try:
+            text = cached_card(
+                "kvk_project", f"{chat}:{day}/{days}", roster,
+                lambda r, lc: kvk_projection(kvk.projection(r, day, days), lc), loc,
+            )
+        except ValueError as e:
+            text = t("kvk_need_column", loc, col=str(e))
+        return await message.answer(text)
+    await message.answer(t("kvk_help", loc))
@@ -1,77 +1,206 @@
 from __future__ import annotations
 
-from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, FSInputFile, InputMediaPhoto
+import asyncio
+from typing import get_args
+
+from aiogram import Router
+from aiogram.types import Message, CallbackQuery, InputMediaPhoto
 from aiogram.filters import Command
 
+from app.utils import analytics, contact_sheet, i18n, media_cache, mount_combos as MC
 from app.utils import mount_skills as S
-from app.keyboards.mount_skills import type_menu_kb, slots_kb, list_kb, item_kb, empty_list_kb
+from app.utils.cbrouter import callbacks
+from app.keyboards.cache import keyboards
+from app.keyboards.mount_skills import type_menu_kb, slots_kb, list_kb, item_kb, empty_list_kb, combos_kb
+from app.utils.render import cached_card, esc
 
 router = Router(name="mount_skills")
 
+MOUNT_TYPES = get_args(S.MountType)
+
+
+# клавиатуры зависят только от (тип, слот, индекс) и данных — кэшируем по версии
+def _kb_menu():
+    return keyboards.get(("ms:menu",), type_menu_kb)
+
+def _kb_slots(t: str, locale: str):
+    return keyboards.get(("ms:slots", t, locale), lambda: slots_kb(t, locale))
+
+def _kb_list(t: str, s: int):
+    def build():
+        names = [x.name for x in S.get_list(t, s)]
+        return list_kb(t, s, names) if names else empty_list_kb(t, s)
+    return keyboards.get(("ms:list", t, s, S.version()), build)
+
+def _kb_item(t: str, s: int, i: int):
+    return keyboards.get(("ms:item", t, s, i, S.version()), lambda: item_kb(t, s, i, *S.idx_prev_next(t, s, i)))
+
+def _kb_best(t: str, locale: str):
+    def build():
+        a, b = S.get_list(t, 1), S.get_list(t, 2)
+        pairs = [(c.slot1, a[c.slot1].name, c.slot2, b[c.slot2].name) for c in MC.best(t).combos]
+        return combos_kb(t, pairs, locale)
+    return keyboards.get(("ms:best", t, locale, S.version()), build)
+
+def _combos_text(t: str, locale: str) -> str:
+    # рейтинг посчитан заранее; текст рендерится один раз на объект рейтинга и язык
+    def render(r, lc):
+        a, b = S.get_list(t, 1), S.get_list(t, 2)
+        title = f"{t.title()} — {i18n.t('ms_best_combos', lc)}"
+        if not r.combos:
+            return f"{title}\n\n{i18n.t('ms_no_combos', lc)}"
+        lines = [f"<b>{title}</b> <i>({i18n.t('ms_pairs', lc, n=r.pairs)})</i>", ""]
+        for n, c in enumerate(r.combos, start=1):
+            lines.append(f"{n}. <b>{esc(a[c.slot1].name)}</b> + <b>{esc(b[c.slot2].name)}</b> — {c.score:.1f}")
+            if c.tags:
+                lines.append(f"   <i>{esc(', '.join(c.tags))}</i>")
+        return "\n".join(lines)
+    return cached_card("mount_combos", t, MC.best(t), render, locale)
+
+def _sheet_tiles(t: str, s: int):
+    # подписи с теми же номерами, что на кнопках списка
+    return [(str(S.asset_path(x.image)), f"{i+1}. {x.name}") for i, x in enumerate(S.get_list(t, s))]
+
+@keyboards.warmer
+def warm_keyboards() -> None:
+    """Rank slot combos of changed mount types, prebuild the menu, slot lists, sheets, combo views and every item keyboard."""
+    MC.refresh()
+    _kb_menu()
+    for t in MOUNT_TYPES:
+        for loc in i18n.LOCALES:
+            _kb_slots(t, loc)
+            _kb_best(t, loc)
+            _combos_text(t, loc)
+        for s in (1, 2):
+            _kb_list(t, s)
+            contact_sheet.sheet(_sheet_tiles(t, s))   # уже собранный лист — только stat иконок
+            for i in range(len(S.get_list(t, s))):
+                _kb_item(t, s, i)
+
+def _prefetch_neighbors(t: str, s: int, i: int) -> None:
+    # следующий тап почти наверняка prev/next — грузим их картинки заранее
+    media_cache.prefetch(
+        S.asset_path(S.get_skill(t, s, j).image)
+        for j in S.idx_prev_next(t, s, i) if j is not None
+    )
+
+@analytics.warmer
+def warm_popular(n: int) -> None:
+    """Pre-upload pictures of the most opened mount skills (key "type:slot:name")."""
+    paths = []
+    for key in analytics.top("mount_skill", n):
+        t, s, name = key.split(":", 2)
+        if t not in MOUNT_TYPES or s not in ("1", "2"):
+            continue
+        skill = next((x for x in S.get_list(t, int(s)) if x.name == name), None)
+        if skill is not None:
+            paths.append(S.asset_path(skill.image))
+    media_cache.prefetch(paths)
+
+async def _show_text(c: CallbackQuery, text: str, kb, **kw) -> None:
+    """Edit the screen in place; a photo (slot sheet, skill card) cannot become text — replace it."""
+    if not c.message.photo:
+        await c.message.edit_text(text, reply_markup=kb, **kw)
+        return
+    try:
+        await c.message.delete()
+    except Exception:
+        pass
+    await c.message.answer(text, reply_markup=kb, **kw)
+
 def _caption(skill, index: int | None = None, total: int | None = None) -> str:
     pos = f" ({index+1}/{total})" if index is not None and total is not None else ""
     return f"<b>{skill.name}</b>{pos}\n<i>Type:</i> {skill.type}\n\n{skill.description}"
 
 @router.message(Command("mount_skills"))
 async def cmd_mount_skills(message: Message):
-    await message.answer("Choose mount type:", reply_markup=type_menu_kb())
+    await message.answer("Choose mount type:", reply_markup=_kb_menu())
 
-@router.callback_query(F.data == "ms:menu")
+@callbacks.route("ms:menu")
 async def cb_menu(c: CallbackQuery):
-    await c.message.edit_text("Choose mount type:", reply_markup=type_menu_kb())
+    await _show_text(c, "Choose mount type:", _kb_menu())
     await c.answer()
 
 # экран выбора слотов (фиксированные кнопки Slot1/Slot2)
-@router.callback_query(F.data.startswith("ms:slots:"))
-async def cb_slots(c: CallbackQuery):
-    _, _, t = c.data.split(":")
-    await c.message.edit_text(f"{t.title()} — Slots", reply_markup=slots_kb(t))
+@callbacks.route("ms:slots", str)
+async def cb_slots(c: CallbackQuery, t: str):
+    await _show_text(c, f"{t.title()} — Slots", _kb_slots(t, i18n.user_locale(c.from_user)))
     await c.answer()
 
-# список умений конкретного слота
-@router.callback_query(F.data.startswith("ms:list:"))
-async def cb_list(c: CallbackQuery):
-    _, _, t, s = c.data.split(":")
-    s = int(s)
+# лучшие пары slot1 + slot2
+@callbacks.route("ms:best", str)
+async def cb_best(c: CallbackQuery, t: str):
+    if t not in MOUNT_TYPES:
+        await c.answer("Unknown mount type", show_alert=True)
+        return
+    loc = i18n.user_locale(c.from_user)
+    await _show_text(c, _combos_text(t, loc), _kb_best(t, loc), parse_mode="HTML")
+    await c.answer()
+
+# список умений конкретного слота: все иконки одним листом, кнопки — под ним
+@callbacks.route("ms:list", str, int)
+async def cb_list(c: CallbackQuery, t: str, s: int):
     skills = S.get_list(t, s)
-    names = [x.name for x in skills]
-    if not names:
-        await c.message.edit_text(
-            f"{t.title()} — Slot {s}\n\nNo skills yet.",
-            reply_markup=empty_list_kb(t, s)
-        )
-    else:
-        await c.message.edit_text(
-            f"{t.title()} — Slot {s}\nPick a skill:",
-            reply_markup=list_kb(t, s, names)
-        )
+    kb = _kb_list(t, s)
+    if not skills:
+        await _show_text(c, f"{t.title()} — Slot {s}\n\nNo skills yet.", kb)
+        await c.answer()
+        return
+
+    text = f"{t.title()} — Slot {s}\nPick a skill:"
+    sheet = None
+    try:
+        sheet = await asyncio.to_thread(contact_sheet.sheet, _sheet_tiles(t, s))
+    except Exception:
+        pass   # лист не собрался — список текстом
+    if sheet is None:
+        await _show_text(c, text, kb)
+        await c.answer()
+        return
+    try:
+        if c.message.photo:
+            # из карточки умения или другого слота — правка фото по file_id
+            await media_cache.send_photo(sheet, lambda photo: c.message.edit_media(
+                media=InputMediaPhoto(media=photo, caption=text), reply_markup=kb,
+            ))
+        else:
+            await media_cache.send_photo(sheet, lambda photo: c.message.answer_photo(
+                photo=photo, caption=text, reply_markup=kb,
+            ))
+            try:
+                await c.message.delete()
+            except Exception:
+                pass
+    except Exception:
+        media_cache.forget(sheet)
+        await _show_text(c, text, kb)
     await c.answer()
 
 # открыть карточку
-@router.callback_query(F.data.startswith("ms:item:"))
-async def cb_item(c: CallbackQuery):
-    _, _, t, s, i = c.data.split(":")
-    s, i = int(s), int(i)
+@callbacks.route("ms:item", str, int, int)
+async def cb_item(c: CallbackQuery, t: str, s: int, i: int):
     skills = S.get_list(t, s)
     skill = S.get_skill(t, s, i)
     if not skill:
         await c.answer("Skill not found", show_alert=True)
         return
 
-    prev_i, next_i = S.idx_prev_next(t, s, i)
-    kb = item_kb(t, s, i, prev_i, next_i)
+    kb = _kb_item(t, s, i)
     caption = _caption(skill, i, len(skills))
     photo_path = S.asset_path(skill.image)
+    analytics.view("mount_skill", f"{t}:{s}:{skill.name}")
 
+    _prefetch_neighbors(t, s, i)
     try:
-        photo = FSInputFile(photo_path)
         try:
             await c.message.delete()
         except Exception:
             pass
-        await c.message.answer_photo(photo=photo, caption=caption, reply_markup=kb, parse_mode="HTML")
+        await media_cache.send_photo(photo_path, lambda photo: c.message.answer_photo(
+            photo=photo, caption=caption, reply_markup=kb, parse_mode="HTML",
+        ))
     except Exception:
+        media_cache.forget(photo_path)
         # фолбэк без картинки
         try:
             await c.message.delete()
@@ -81,10 +210,8 @@ async def cb_item(c: CallbackQuery):
     await c.answer()
 
 # навигация prev/next
-@router.callback_query(F.data.startswith("ms:nav:"))
-async def cb_nav(c: CallbackQuery):
-    _, _, t, s, i, action = c.data.split(":")
-    s, i = int(s), int(i)
+@callbacks.route("ms:nav", str, int, int, str)
+async def cb_nav(c: CallbackQuery, t: str, s: int, i: int, action: str):
     i = i - 1 if action == "prev" else i + 1
 
     skills = S.get_list(t, s)
@@ -93,15 +220,19 @@ async def cb_nav(c: CallbackQuery):
         await c.answer("No more items")
         return
 
-    prev_i, next_i = S.idx_prev_next(t, s, i)
-    kb = item_kb(t, s, i, prev_i, next_i)
+    kb = _kb_item(t, s, i)
     caption = _caption(skill, i, len(skills))
     photo_path = S.asset_path(skill.image)
+    analytics.view("mount_skill", f"{t}:{s}:{skill.name}")
 
+    _prefetch_neighbors(t, s, i)
     try:
-        media = InputMediaPhoto(media=FSInputFile(photo_path), caption=caption, parse_mode="HTML")
-        await c.message.edit_media(media=media, reply_markup=kb)
+        # соседа обычно уже загрузил префетчер — тогда это правка по file_id, без аплоада
+        await media_cache.send_photo(photo_path, lambda photo: c.message.edit_media(
+            media=InputMediaPhoto(media=photo, caption=caption, parse_mode="HTML"), reply_markup=kb,
+        ))
     except Exception:
+        media_cache.forget(photo_path)
         # если фото/редактирование недоступно — показываем текст
         try:
             await c.message.edit_text(caption + f"\n\n<i>(image not found: {skill.image})</i>", reply_markup=kb, parse_mode="HTML")
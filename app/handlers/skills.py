@@ -1,12 +1,16 @@
 from pathlib import Path
 from typing import List, Tuple
 
-from aiogram import Router, types, F
+from aiogram import Router, types
 from aiogram.filters import Command
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, FSInputFile
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 from app.data import skills_repo as repo
-from app.utils.render import skill_card
+from app.keyboards.cache import keyboards
+from app.utils import analytics, media_cache, similar
+from app.utils.cbrouter import callbacks
+from app.utils.i18n import LOCALES, DEFAULT_LOCALE, t, user_locale
+from app.utils.render import skill_card, cached_card
 
 router = Router()
 
@@ -14,11 +18,12 @@ PER_PAGE = 10
 
 
 # ------- Helpers -------
-def _pairs_all() -> List[Tuple[str, str]]:
+def _pairs_all(locale: str | None = None) -> List[Tuple[str, str]]:
     # (name, slug)
-    return [(s.name, s.slug) for s in repo.list_skills()]
+    return [(s.name, s.slug) for s in repo.list_skills(locale)]
 
-def _kb_skills(pairs: List[Tuple[str, str]], page: int = 0) -> InlineKeyboardMarkup:
+def _kb_skills(pairs: List[Tuple[str, str]], page: int = 0,
+               locale: str | None = None) -> InlineKeyboardMarkup:
     start = page * PER_PAGE
     chunk = pairs[start:start + PER_PAGE]
 
@@ -27,63 +32,131 @@ def _kb_skills(pairs: List[Tuple[str, str]], page: int = 0) -> InlineKeyboardMar
 
     nav = []
     if page > 0:
-        nav.append(InlineKeyboardButton(text="⭠ Prev", callback_data=f"sk:list:{page - 1}"))
+        nav.append(InlineKeyboardButton(text=t("prev", locale), callback_data=f"sk:list:{page - 1}"))
     if start + PER_PAGE < len(pairs):
-        nav.append(InlineKeyboardButton(text="Next ⭢", callback_data=f"sk:list:{page + 1}"))
+        nav.append(InlineKeyboardButton(text=t("next", locale), callback_data=f"sk:list:{page + 1}"))
     if nav:
         rows.append(nav)
 
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
-async def _send_skill(message: types.Message, s) -> None:
-    text = skill_card(s)
+def _kb_skills_page(page: int, locale: str) -> InlineKeyboardMarkup:
+    """Page of the full list; built once per (locale, page, data version)."""
+    return keyboards.get(
+        ("sk:list", locale, page, repo.version()),
+        lambda: _kb_skills(_pairs_all(locale), page=page, locale=locale),
+    )
+
+@keyboards.warmer
+def warm_keyboards() -> None:
+    """Prebuild every page of the full list for each locale."""
+    for locale in LOCALES:
+        pages = max(1, -(-len(repo.list_skills(locale)) // PER_PAGE))
+        for page in range(pages):
+            _kb_skills_page(page, locale)
+
+def _kb_card(slug: str, locale: str) -> InlineKeyboardMarkup | None:
+    """The "Similar" button under a skill card — only when there is something to show."""
+    if not similar.similar_skills(slug, locale):
+        return None
+    return keyboards.get(
+        ("sk:card", locale, slug),
+        lambda: InlineKeyboardMarkup(inline_keyboard=[[
+            InlineKeyboardButton(text=t("similar", locale), callback_data=f"sk:sim:{slug}"),
+        ]]),
+    )
+
+def _kb_similar(slug: str, locale: str) -> InlineKeyboardMarkup:
+    """Nearest skills by effect text, from the precomputed neighbour table."""
+    def build() -> InlineKeyboardMarkup:
+        pairs = []
+        for other, _ in similar.similar_skills(slug, locale):
+            s = repo.get_by_slug_or_name(other, locale)
+            if s:
+                pairs.append((s.name, s.slug))
+        return _kb_skills(pairs, page=0, locale=locale)
+    return keyboards.get(("sk:sim", locale, slug, repo.version()), build)
+
+@keyboards.warmer
+def warm_similar() -> None:
+    """Build the neighbour tables (TF-IDF over all skills) for each locale."""
+    for locale in LOCALES:
+        similar.warm("skill", locale)
+
+@analytics.warmer
+def warm_popular(n: int) -> None:
+    """Render the most opened skill cards and pre-upload their pictures."""
+    paths = []
+    for slug in analytics.top("skill", n):
+        for locale in LOCALES:
+            s = repo.get_by_slug_or_name(slug, locale)
+            if s:
+                cached_card("skill", s.slug, s, skill_card, locale)
+                img = (s.image or "").strip()
+                if img and not img.startswith(("http://", "https://")):
+                    paths.append(img)
+    media_cache.prefetch(dict.fromkeys(paths))
+
+async def _send_skill(message: types.Message, s, locale: str | None = None) -> None:
+    loc = locale or DEFAULT_LOCALE
+    text = cached_card("skill", s.slug, s, skill_card, loc)
+    kb = _kb_card(s.slug, loc)
     img = (s.image or "").strip()
     if img:
         p = Path(img)
         if p.exists() and p.is_file():
-            return await message.answer_photo(photo=FSInputFile(p), caption=text)
+            return await media_cache.send_photo(p, lambda photo: message.answer_photo(
+                photo=photo, caption=text, reply_markup=kb,
+            ))
         if img.startswith("http://") or img.startswith("https://"):
-            return await message.answer_photo(photo=img, caption=text)
-    await message.answer(text)
+            return await message.answer_photo(photo=img, caption=text, reply_markup=kb)
+    await message.answer(text, reply_markup=kb)
 
 
 # ------- Commands -------
 @router.message(Command("skills"))
 async def cmd_skills(m: types.Message):
     parts = m.text.split(maxsplit=1)
+    loc = user_locale(m.from_user)
 
     # No query -> full list with pagination
     if len(parts) == 1:
-        pairs = _pairs_all()
-        if not pairs:
-            return await m.answer("No skills yet.")
-        return await m.answer("Select a skill:", reply_markup=_kb_skills(pairs, page=0))
+        if not repo.list_skills(loc):
+            return await m.answer(t("no_skills", loc))
+        return await m.answer(t("select_skill", loc), reply_markup=_kb_skills_page(0, loc))
 
     # With query -> search (simple list, no pagination for simplicity)
     q = parts[1].strip()
-    hits = repo.search(q)
+    hits = repo.search(q, locale=loc)
+    analytics.search("skill", q, len(hits))
     if not hits:
-        return await m.answer("No matches found.")
-    pairs = [(s.name, s.slug) for s in hits][:30]
-    await m.answer(f"Found {len(hits)} match(es). Select:", reply_markup=_kb_skills(pairs, page=0))
+        return await m.answer(t("no_matches", loc))
+    pairs = [(s.name, s.slug) for s in analytics.rank("skill", hits, lambda s: s.slug)][:30]
+    await m.answer(t("found", loc, n=len(hits)), reply_markup=_kb_skills(pairs, page=0, locale=loc))
 
 
 # ------- Callbacks -------
-@router.callback_query(F.data.startswith("sk:list:"))
-async def cb_list(q: types.CallbackQuery):
-    try:
-        page = int(q.data.split(":", 2)[2])
-    except Exception:
-        page = 0
-    pairs = _pairs_all()
-    await q.message.edit_reply_markup(reply_markup=_kb_skills(pairs, page=page))
+@callbacks.route("sk:list", int)
+async def cb_list(q: types.CallbackQuery, page: int):
+    loc = user_locale(q.from_user)
+    await q.message.edit_reply_markup(reply_markup=_kb_skills_page(page, loc))
     await q.answer()
 
-@router.callback_query(F.data.startswith("sk:view:"))
-async def cb_view(q: types.CallbackQuery):
-    slug = q.data.split(":", 2)[2]
-    s = repo.get_by_slug_or_name(slug)
+@callbacks.route("sk:view", str)
+async def cb_view(q: types.CallbackQuery, slug: str):
+    loc = user_locale(q.from_user)
+    s = repo.get_by_slug_or_name(slug, loc)
     if not s:
-        return await q.answer("Not found", show_alert=True)
-    await _send_skill(q.message, s)
+        return await q.answer(t("not_found", loc), show_alert=True)
+    analytics.view("skill", s.slug)
+    await _send_skill(q.message, s, loc)
+    await q.answer()
+
+@callbacks.route("sk:sim", str)
+async def cb_similar(q: types.CallbackQuery, slug: str):
+    loc = user_locale(q.from_user)
+    s = repo.get_by_slug_or_name(slug, loc)
+    if not s or not similar.similar_skills(s.slug, loc):
+        return await q.answer(t("no_similar", loc), show_alert=True)
+    await q.message.answer(t("similar_to", loc, name=s.name), reply_markup=_kb_similar(s.slug, loc))
     await q.answer()
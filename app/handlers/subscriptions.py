@@ -0,0 +1,100 @@
+import asyncio
+
+from aiogram import Router, types
+from aiogram.filters import Command
+
+from app.data import events_repo as repo
+from app.data import subscriptions_repo as subs
+from app.keyboards.events import event_details_kb
+from app.utils import multibot, reminders
+from app.utils.cbrouter import callbacks
+from app.utils.i18n import t, user_locale
+from app.utils.render import subscriptions_list, esc
+
+router = Router()
+
+
+def _find_event(q: str, locale: str):
+    """Exact name or id, then a unique search hit — in the user's locale, then the default catalog."""
+    q = (q or "").strip()
+    if not q:
+        return None
+    for loc in dict.fromkeys((locale, None)):
+        ev = repo.get_by_name(q, loc) or repo.get_by_id(q, loc)
+        if ev:
+            return repo.get_by_id(ev.id, locale) or ev
+        hits = repo.search(q, loc)
+        if len(hits) == 1:
+            return repo.get_by_id(hits[0].id, locale) or hits[0]
+    return None
+
+
+async def _toggle(chat_id: int, ev_id: str, on: bool, locale: str) -> bool:
+    # напоминания придут от того же бота, через которого подписались, и на языке подписавшего
+    if on:
+        changed = await asyncio.to_thread(subs.subscribe, chat_id, ev_id, multibot.current(), locale)
+    else:
+        changed = await asyncio.to_thread(subs.unsubscribe, chat_id, ev_id, multibot.current())
+    if changed:
+        reminders.wake()
+    return changed
+
+
+# ------- Commands -------
+@router.message(Command("subscribe"))
+async def cmd_subscribe(m: types.Message):
+    """/subscribe <event name> — remind this chat before each occurrence."""
+    loc = user_locale(m.from_user)
+    parts = m.text.split(maxsplit=1)
+    ev = _find_event(parts[1] if len(parts) > 1 else "", loc)
+    if not ev:
+        return await m.answer(t("sub_usage", loc))
+    # расписание строится по основному каталогу — по нему и проверяем
+    if not (repo.get_by_id(ev.id) or ev).windows:
+        return await m.answer(t("sub_no_schedule", loc, name=esc(ev.name)))
+    await _toggle(m.chat.id, ev.id, True, loc)
+    await m.answer(t("sub_on", loc, name=esc(ev.name)))
+
+
+@router.message(Command("unsubscribe"))
+async def cmd_unsubscribe(m: types.Message):
+    """/unsubscribe <event name> — stop reminders about that event in this chat."""
+    loc = user_locale(m.from_user)
+    parts = m.text.split(maxsplit=1)
+    ev = _find_event(parts[1] if len(parts) > 1 else "", loc)
+    if not ev:
+        return await m.answer(t("unsub_usage", loc))
+    changed = await _toggle(m.chat.id, ev.id, False, loc)
+    await m.answer(t("unsub_off", loc, name=esc(ev.name)) if changed else t("unsub_none", loc))
+
+
+@router.message(Command("subscriptions"))
+async def cmd_subscriptions(m: types.Message):
+    loc = user_locale(m.from_user)
+    ids = await asyncio.to_thread(subs.events_for_chat, m.chat.id, multibot.current())
+    events = [ev for ev in (repo.get_by_id(i, loc) or repo.get_by_id(i) for i in ids) if ev]
+    await m.answer(subscriptions_list(events, loc))
+
+
+# ------- Callbacks -------
+@callbacks.route("ev:sub", str)
+async def cb_subscribe(q: types.CallbackQuery, ev_id: str):
+    await _toggle_from_card(q, ev_id, True)
+
+
+@callbacks.route("ev:unsub", str)
+async def cb_unsubscribe(q: types.CallbackQuery, ev_id: str):
+    await _toggle_from_card(q, ev_id, False)
+
+
+async def _toggle_from_card(q: types.CallbackQuery, ev_id: str, on: bool):
+    loc = user_locale(q.from_user)
+    ev = repo.get_by_id(ev_id, loc) or repo.get_by_id(ev_id)
+    if not ev:
+        return await q.answer(t("not_found", loc), show_alert=True)
+    await _toggle(q.message.chat.id, ev.id, on, loc)
+    try:
+        await q.message.edit_reply_markup(reply_markup=event_details_kb(ev.id, ev.has_rules, on, loc))
+    except Exception:
+        pass
+    await q.answer(t("reminder_set" if on else "reminder_removed", loc))
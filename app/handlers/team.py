@@ -0,0 +1,56 @@
+from aiogram import Router, types
+from aiogram.filters import Command
+
+from app.data import heroes_repo
+from app.utils import team_builder
+from app.utils.i18n import t, user_locale
+from app.utils.render import team_list, esc
+
+router = Router()
+
+DEFAULT_SIZE = 3
+MAX_SIZE = 5
+
+TEAM_HELP = (
+    "<b>/team</b> [size] [specialty …] [+hero …]\n"
+    "/team – best 3-hero marches\n"
+    "/team 2 infantry – best infantry pairs\n"
+    "/team 3 cavalry +ivar – marches with Ivar covering cavalry"
+)
+
+
+def _parse(args: list[str], locale: str):
+    """→ (size, wanted specialties, must-have heroes, unknown hero names)."""
+    size, wanted, must, unknown = DEFAULT_SIZE, [], [], []
+    for a in args:
+        if a.isdigit():
+            size = int(a)
+        elif a.startswith("+") and len(a) > 1:
+            # имена из нескольких слов: +Ragnar_Lothbrok
+            h = heroes_repo.get_by_slug_or_name(a[1:], locale) \
+                or heroes_repo.get_by_slug_or_name(a[1:].replace("_", " "), locale)
+            if h:
+                must.append(h.slug)
+            else:
+                unknown.append(a[1:])
+        else:
+            wanted.append(a)
+    return size, wanted, must, unknown
+
+
+@router.message(Command("team"))
+async def cmd_team(m: types.Message):
+    """/team [size] [specialty …] [+hero …] — best hero combinations by the synergy model."""
+    loc = user_locale(m.from_user)
+    args = (m.text or "").split()[1:]
+    if args and args[0].lower() in ("help", "?"):
+        return await m.answer(TEAM_HELP)
+    size, wanted, must, unknown = _parse(args, loc)
+    if unknown:
+        return await m.answer(f"{t('not_found', loc)}: {esc(', '.join(unknown))}")
+    if not 2 <= size <= MAX_SIZE:
+        return await m.answer(TEAM_HELP)
+    if not heroes_repo.list_heroes(loc):
+        return await m.answer(t("no_heroes", loc))
+    teams, complete = await team_builder.best_teams(size, wanted, must, locale=loc)
+    await m.answer(team_list(teams, size, wanted, complete, loc))
@@ -0,0 +1,76 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Tuple
+
+from aiogram.types import InlineKeyboardMarkup
+
+from app.utils import metrics
+
+log = logging.getLogger(__name__)
+
+# Клавиатуры списков одинаковы для всех пользователей — строим один раз.
+# Ключ: (каталог, локаль, страница/аргументы, версия данных).
+# Версия растёт при reload, так что старые записи просто вытесняются по LRU.
+
+
+class KeyboardCache:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[Hashable, InlineKeyboardMarkup | None]" = OrderedDict()
+        self._warmers: List[Callable[[], None]] = []
+        # warm() идёт в отдельном потоке, пока loop уже читает кэш
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, build: Callable[[], InlineKeyboardMarkup | None]) -> InlineKeyboardMarkup | None:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                metrics.inc("kb_cache.hit")
+                return self._items[key]
+        metrics.inc("kb_cache.miss")
+        kb = build()
+        self.put(key, kb)
+        return kb
+
+    def put(self, key: Hashable, kb: InlineKeyboardMarkup | None) -> None:
+        with self._lock:
+            self._items[key] = kb
+            self._items.move_to_end(key)
+            if len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def state(self) -> List[Tuple[Hashable, InlineKeyboardMarkup | None]]:
+        """Entries in LRU order — for the warm-start snapshot."""
+        with self._lock:
+            return list(self._items.items())
+
+    def restore(self, items: List[Tuple[Hashable, InlineKeyboardMarkup | None]]) -> None:
+        for key, kb in items:
+            self.put(key, kb)
+
+    def warmer(self, fn: Callable[[], None]) -> Callable[[], None]:
+        """Register a function that prebuilds a module's keyboards (see warm)."""
+        self._warmers.append(fn)
+        return fn
+
+    def warm(self) -> int:
+        """Run every registered warmer; returns the cache size afterwards."""
+        for fn in self._warmers:
+            try:
+                fn()
+            except Exception:
+                # нет файла с данными и т.п. — раздел соберётся лениво (и упадёт там же, где раньше)
+                log.warning("keyboard warmer %s failed", fn.__module__, exc_info=True)
+        return len(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+keyboards = KeyboardCache()
+metrics.gauge("kb_cache.size", lambda: len(keyboards))
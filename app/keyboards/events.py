@@ -1,6 +1,7 @@
 from typing import Iterable
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton as B
 from app.utils.callbacks import EventCb
+from app.utils.i18n import DEFAULT_LOCALE, t
 
 def events_list(names: Iterable[str], page: int = 0, per: int = 10) -> InlineKeyboardMarkup:
     names = list(names)
@@ -22,3 +23,16 @@ def details_kb(ev_id: str, has_rules: bool):
     if has_rules:
         rows.append([B(text="📜 Rules", callback_data=EventCb(action="rules", id=ev_id).pack())])
     return InlineKeyboardMarkup(inline_keyboard=rows) if rows else None
+
+def event_details_kb(
+    ev_id: str, has_rules: bool, remind: bool | None = None, locale: str = DEFAULT_LOCALE,
+) -> InlineKeyboardMarkup | None:
+    """Buttons under an event card. remind: None — no schedule; True/False — chat is (not) subscribed."""
+    rows = []
+    if has_rules:
+        rows.append([B(text="📜 Rules", callback_data=f"ev:rules:{ev_id}")])
+    if remind is False:
+        rows.append([B(text=t("remind_me", locale), callback_data=f"ev:sub:{ev_id}")])
+    elif remind is True:
+        rows.append([B(text=t("stop_reminders", locale), callback_data=f"ev:unsub:{ev_id}")])
+    return InlineKeyboardMarkup(inline_keyboard=rows) if rows else None
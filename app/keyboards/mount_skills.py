@@ -1,10 +1,13 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
+from app.utils import i18n
+
 # ms:menu
 # ms:slots:<type>
 # ms:list:<type>:<slot>
 # ms:item:<type>:<slot>:<index>
 # ms:nav:<type>:<slot>:<index>:prev|next
+# ms:best:<type>
 
 def type_menu_kb() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -13,13 +16,14 @@ def type_menu_kb() -> InlineKeyboardMarkup:
         [InlineKeyboardButton(text="Archers",  callback_data="ms:slots:archers")],
     ])
 
-def slots_kb(t: str) -> InlineKeyboardMarkup:
+def slots_kb(t: str, locale: str = i18n.DEFAULT_LOCALE) -> InlineKeyboardMarkup:
     # экран выбора слота
     return InlineKeyboardMarkup(inline_keyboard=[
         [
             InlineKeyboardButton(text="Slot 1", callback_data=f"ms:list:{t}:1"),
             InlineKeyboardButton(text="Slot 2", callback_data=f"ms:list:{t}:2"),
         ],
+        [InlineKeyboardButton(text="🏆 " + i18n.t("ms_best_combos", locale), callback_data=f"ms:best:{t}")],
         [InlineKeyboardButton(text="↩ Types", callback_data="ms:menu")],
     ])
 
@@ -57,3 +61,20 @@ def item_kb(t: str, s: int, i: int, prev_i, next_i) -> InlineKeyboardMarkup:
         [InlineKeyboardButton(text="↩ Types", callback_data="ms:menu")],
     ]
     return InlineKeyboardMarkup(inline_keyboard=rows)
+
+def combos_kb(
+    t: str, pairs: list[tuple[int, str, int, str]], locale: str = i18n.DEFAULT_LOCALE,
+) -> InlineKeyboardMarkup:
+    """pairs: (slot1 index, slot1 name, slot2 index, slot2 name) — each combo row opens either skill."""
+    rows = [
+        [
+            InlineKeyboardButton(text=f"{n}. {name1}", callback_data=f"ms:item:{t}:1:{i}"),
+            InlineKeyboardButton(text=name2, callback_data=f"ms:item:{t}:2:{j}"),
+        ]
+        for n, (i, name1, j, name2) in enumerate(pairs, start=1)
+    ]
+    rows.append([
+        InlineKeyboardButton(text="⬅ " + i18n.t("ms_slots", locale), callback_data=f"ms:slots:{t}"),
+        InlineKeyboardButton(text=i18n.t("ms_types", locale), callback_data="ms:menu"),
+    ])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
@@ -1,23 +1,42 @@
 import asyncio
+import inspect
 import logging
+from datetime import timedelta
+from pathlib import Path
 from aiogram import types
 from aiogram.types import BotCommand
 
-from app.bot import build_bot, build_dispatcher
-from app.config import settings
-from app.handlers import base, events, skills, heroes, kvk3, mount_skills, equipment, errors, jewels
+from app.bot import build_bot, build_dispatcher, build_session
+from app.config import BotProfile, settings
+from app.data import subscriptions_repo
+from app.keyboards.cache import keyboards
+from app.handlers import base, events, skills, heroes, kvk3, mount_skills, equipment, errors, jewels, subscriptions, admin, team
+from app.utils import analytics, lifecycle, media_cache, multibot, reminders, snapshot, team_builder, tracing
+from app.utils import procmem  # noqa: F401 — process.*_kb gauges for /metrics (per worker under app.prefork)
+from app.utils.cbrouter import callbacks
+from app.utils.update_scheduler import UpdateScheduler
+from app.utils.logs import setup_logging, UpdateContextMiddleware, HandlerNameMiddleware, ApiCallLogger
 
 
-async def set_commands_all(bot):
+# Меню команд; профиль бота (config.BotProfile) может оставить часть и переписать описания
+COMMANDS = [
+    ("help",          "Help & commands"),
+    ("events",        "Events (list/search)"),
+    ("subscriptions", "Event reminders"),
+    ("skills",        "Skills (list/search)"),
+    ("heroes",        "Heroes (list/search)"),
+    ("team",          "Hero team builder"),
+    ("kvk3",          "KvK-3 alliance planning"),
+    ("mount_skills",  "Mount skills (WIP)"),
+    ("equipment",     "Equipment and gear optimizer"),
+    ("jewels",        "Jewels and upgrade planner"),
+]
+
+
+async def set_commands_all(bot, profile):
     cmds = [
-        types.BotCommand(command="help",         description="Help & commands"),
-        types.BotCommand(command="events",       description="Events (list/search)"),
-        types.BotCommand(command="skills",       description="Skills (list/search)"),
-        types.BotCommand(command="heroes",       description="Heroes (list/search)"),
-        types.BotCommand(command="kvk3",         description="KvK - 3 (WIP)"),
-        types.BotCommand(command="mount_skills", description="Mount skills (WIP)"),
-        types.BotCommand(command="equipment",    description="Equipment (WIP)"),
-        types.BotCommand(command="jewels",       description="Jewels (WIP)"),
+        types.BotCommand(command=c, description=profile.descriptions.get(c, d))
+        for c, d in COMMANDS if profile.commands is None or c in profile.commands
     ]
     await bot.delete_my_commands(scope=types.BotCommandScopeDefault())
     await bot.delete_my_commands(scope=types.BotCommandScopeAllPrivateChats())
@@ -29,33 +48,166 @@ async def set_commands_all(bot):
     await bot.set_my_commands(cmds, scope=types.BotCommandScopeAllChatAdministrators())
 
 
-async def main():
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+def preload() -> tuple[bool, int]:
+    """Restore the previous run's cache snapshot and prebuild keyboards → (restored, keyboards). Blocking."""
+    # Снимок кэшей прошлого процесса (если данные и код те же) — тогда прогрев почти бесплатный
+    restored = snapshot.load(settings.WARM_SNAPSHOT, (settings.FILE_ID_CACHE, settings.OFFSET_FILE))
+    # Клавиатуры списков одинаковы для всех — строим заранее, а не на первом клике
+    return restored, keyboards.warm()
+
+
+def worker_log_file(worker: int | None) -> str | None:
+    """Workers of app.prefork rotate their own log files: bot.log → bot.w0.log."""
+    if not settings.LOG_FILE or worker is None:
+        return settings.LOG_FILE
+    p = Path(settings.LOG_FILE)
+    return str(p.with_name(f"{p.stem}.w{worker}{p.suffix}"))
+
+
+async def _shutdown_step(name: str, step) -> None:
+    """Run one shutdown step (sync or async); log a failure instead of skipping the rest."""
+    try:
+        res = step()
+        if inspect.isawaitable(res):
+            await res
+    except Exception:
+        logging.warning("Shutdown step %s failed", name, exc_info=True)
+
+
+async def main(profiles: list[BotProfile] | None = None, worker: int | None = None):
+    """
+    Serve `profiles` (default: all configured bots). `worker` is set by
+    app.prefork: the caches are already warm in the parent and shared
+    copy-on-write, so they are not loaded again here.
+    """
+    # Логи пишет отдельный поток-слушатель очереди: event loop не блокируется на I/O
+    log_listener = setup_logging(
+        level=settings.LOG_LEVEL,
+        json_format=settings.LOG_JSON,
+        file=worker_log_file(worker),
+        max_bytes=settings.LOG_MAX_BYTES,
+        backups=settings.LOG_BACKUPS,
     )
 
-    bot = build_bot(settings.BOT_TOKEN)
+    # Пул соединений, таймауты и адрес Bot API (в т.ч. свой сервер в --local) — из настроек.
+    # Все боты (BOT_TOKEN + BOTS) ходят через одну сессию и один диспетчер;
+    # каталоги, индексы и кэши у них общие — на бота приходится лишь объект Bot
+    session = build_session(settings)
+    profiles = profiles or settings.profiles()
+    bots = [build_bot(p.token, session=session) for p in profiles]
+    for b, p in zip(bots, profiles):
+        multibot.register(b, p)
     dp = build_dispatcher()
 
+    # Самым внешним — учёт апдейтов в работе (для остановки без потерь) и последнего update_id
+    tracker = lifecycle.UpdateTracker()
+    dp.update.outer_middleware(tracker)
+    # Какой бот принял апдейт (file_id, подписки, логи) и отключённые в его профиле команды
+    dp.update.outer_middleware(multibot.BotContext(c for c, _ in COMMANDS))
+    # Трейсы: корневой спан на апдейт (первым — чтобы ожидание в очереди тоже попало)
+    trace_exporter = None
+    if settings.TRACE_FILE:
+        trace_exporter = tracing.FileExporter(settings.TRACE_FILE)
+        dp.update.outer_middleware(tracing.TracingMiddleware(trace_exporter, settings.TRACE_SAMPLE, settings.TRACE_SLOW_MS))
+        dp.message.middleware(tracing.HandlerSpanMiddleware())
+        dp.callback_query.middleware(tracing.HandlerSpanMiddleware())
+        session.middleware(tracing.ApiSpanMiddleware())
+    # Контекст апдейта (update_id/chat_id/handler/duration) для логов
+    dp.update.outer_middleware(UpdateContextMiddleware(settings.LOG_CALLBACK_SAMPLE))
+    # Параллельно между чатами, строго по порядку внутри чата, не больше UPDATE_WORKERS сразу
+    dp.update.outer_middleware(UpdateScheduler(settings.UPDATE_WORKERS))
+    dp.message.middleware(HandlerNameMiddleware())
+    dp.callback_query.middleware(HandlerNameMiddleware())
+    session.middleware(ApiCallLogger())
+
     # Подключаем все роутеры
+    dp.include_router(admin.router)
+    # Все callback-кнопки: один фильтр + префиксное дерево (см. utils/cbrouter.py)
+    dp.include_router(callbacks.router)
     dp.include_router(base.router)
     dp.include_router(events.router)
+    dp.include_router(subscriptions.router)
     dp.include_router(skills.router)
     dp.include_router(heroes.router)
+    dp.include_router(team.router)
     dp.include_router(kvk3.router)
     dp.include_router(mount_skills.router) 
     dp.include_router(equipment.router)
     dp.include_router(jewels.router) 
     dp.include_router(errors.router)
 
+    if worker is None:
+        restored, n = await asyncio.to_thread(preload)
+        logging.info("Prebuilt %d keyboards (%s start)", n, "warm" if restored else "cold")
+    else:
+        logging.info("Worker %d serving %s", worker, ", ".join(p.name or "main" for p in profiles))
+
     # Команды и стартовая инфа
-    await set_commands_all(bot)
-    me = await bot.get_me()
-    logging.info("✅ Bot started as @%s (id=%s)", me.username, me.id)
+    for b, p in zip(bots, profiles):
+        await set_commands_all(b, p)
+        me = await b.get_me()
+        logging.info("✅ Bot started as @%s (id=%s%s)", me.username, me.id, f", profile {p.name}" if p.name else "")
+
+    # Напоминания о событиях (подписки в SQLite); у каждого бота — свои подписчики и свой лимит отправки
+    subscriptions_repo.init(settings.DB_PATH)
+    reminder_tasks = [
+        reminders.start(
+            b,
+            lead=timedelta(minutes=settings.REMINDER_LEAD_MINUTES),
+            rate=settings.BROADCAST_RATE,
+            concurrency=settings.BROADCAST_CONCURRENCY,
+            batch=settings.BROADCAST_BATCH,
+        )
+        for b, p in zip(bots, profiles) if p.reminders
+    ]
+
+    # file_id картинок: переиспользуем между пользователями, соседей грузим заранее (file_id — свои у бота)
+    media_cache.load(settings.FILE_ID_CACHE)
+    for b, p in zip(bots, profiles):
+        media_cache.start(b, p.media_cache_chat_id, settings.MEDIA_PREFETCH_CONCURRENCY)
 
-    # Запуск long-polling (завершается по Ctrl+C)
-    await dp.start_polling(bot)
+    # Статистика просмотров: буфер в памяти → SQLite; популярное прогреваем сразу
+    await analytics.start(settings.DB_PATH, settings.ANALYTICS_FLUSH_S)
+    await analytics.warm(settings.WARM_POPULAR)
+
+    # Большие переборы /team — в отдельных процессах (воркеры стартуют сразу, не на первом запросе)
+    team_builder.configure(settings.TEAM_WORKERS)
+
+    # Апдейты, обработанные прошлым процессом, Telegram больше не пришлёт
+    offsets = lifecycle.load_offsets(settings.OFFSET_FILE)
+    for b, p in zip(bots, profiles):
+        await lifecycle.confirm_offset(b, offsets.get(p.name))
+
+    # Запуск long-polling; SIGTERM/SIGINT останавливают приём апдейтов,
+    # сессию не закрываем — она ещё нужна хендлерам, которые доработают ниже
+    try:
+        await dp.start_polling(
+            *bots, handle_as_tasks=True, polling_timeout=settings.POLLING_TIMEOUT, close_bot_session=False,
+        )
+    finally:
+        # handle_as_tasks: часть апдейтов ещё может ждать старта своей задачи
+        # (_handle_update_tasks — внутренность aiogram, в старых версиях её нет)
+        queued = getattr(dp, "_handle_update_tasks", ())
+        # шаги независимы: сбой одного не должен стоить остальным (offsets, file_id, снимок)
+        await _shutdown_step("drain", lambda: tracker.drain(settings.SHUTDOWN_DRAIN_S, queued))
+        for task in reminder_tasks:
+            task.cancel()
+        await _shutdown_step("media prefetch", media_cache.stop)
+        await _shutdown_step("team workers", team_builder.shutdown)
+        await _shutdown_step("analytics", analytics.stop)
+        await _shutdown_step("file_id cache", media_cache.save)
+        await _shutdown_step("offsets", lambda: lifecycle.save_offsets(settings.OFFSET_FILE, tracker.next_offsets))
+        # из воркеров снимок пишет один: кэши у всех из одного источника
+        if not worker:
+            try:
+                size = await asyncio.to_thread(snapshot.save, settings.WARM_SNAPSHOT)
+                logging.info("Warm snapshot saved (%d KB)", size // 1024)
+            except Exception:
+                logging.warning("Warm snapshot not saved", exc_info=True)
+        await session.close()
+        if trace_exporter is not None:
+            trace_exporter.close()
+        log_listener.stop()
 
 
 if __name__ == "__main__":
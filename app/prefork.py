@@ -0,0 +1,199 @@
+import asyncio
+import gc
+import logging
+import os
+import signal
+import sys
+import time
+from typing import Dict, List, Set
+
+from app import main as app_main
+from app.config import BotProfile, settings
+from app.handlers import admin
+from app.keyboards.cache import keyboards
+from app.utils import lifecycle, procmem
+
+# Запуск несколькими процессами без лишних копий каталогов: родитель один раз
+# разбирает все JSON, строит индексы, клавиатуры и карточки (app.main.preload),
+# замораживает эти объекты для сборщика мусора (gc.freeze — GC больше не пишет
+# в их заголовки) и делает fork. Воркеры читают те же страницы памяти, пока
+# не изменят их (copy-on-write). Счётчики ссылок CPython при чтении всё же
+# пишут в объекты, так что часть страниц со временем станет своей у воркера —
+# сколько именно, видно в отчёте о памяти (SIGUSR1 родителю или раз в
+# PREFORK_REPORT_S). Один бот может опрашивать только один процесс, поэтому
+# воркеры делят боты (BOT_TOKEN + BOTS) по кругу, а не апдейты одного бота.
+# /reload в воркере шлёт родителю SIGHUP: родитель перечитывает данные сам,
+# останавливает воркеры и форкает новые — свежие данные у всех и снова общие.
+#
+#   python -m app.prefork
+
+log = logging.getLogger("app.prefork")
+
+# воркер, упавший быстрее этого, перезапускаем с паузой — не крутимся в цикле падений
+RESPAWN_BACKOFF_S = 5.0
+
+
+def shares(profiles: List[BotProfile], workers: int) -> List[List[BotProfile]]:
+    """Round-robin: worker i serves profiles i, i + n, …; never more workers than bots."""
+    n = max(1, min(workers, len(profiles)))
+    return [profiles[i::n] for i in range(n)]
+
+
+def _child(worker: int, profiles: List[BotProfile]) -> None:
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)
+    # отчёт и перезагрузка — дело родителя; `pkill -USR1 -f app.prefork` воркеры переживут
+    for sig in (signal.SIGUSR1, signal.SIGHUP):
+        signal.signal(sig, signal.SIG_IGN)
+    lifecycle.prefork_parent = os.getppid()
+    gc.enable()
+    code = 0
+    try:
+        asyncio.run(app_main.main(profiles, worker=worker))
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    except BaseException:
+        log.exception("worker %d crashed", worker)
+        code = 1
+    os._exit(code)
+
+
+def _spawn(worker: int, profiles: List[BotProfile]) -> int:
+    pid = os.fork()
+    if pid == 0:
+        _child(worker, profiles)
+    return pid
+
+
+def _mb(kb: int) -> str:
+    return f"{kb / 1024:8.1f}"
+
+
+def report(workers: Dict[int, int]) -> str:
+    """Memory table for the parent and `workers` (pid → worker number)."""
+    rows = [("parent", os.getpid())] + sorted(((str(w), pid) for pid, w in workers.items()), key=lambda r: r[0])
+    lines = [f"{'worker':>6} {'pid':>7}   rss MB   pss MB shared MB unique MB"]
+    rss = pss = 0
+    for name, pid in rows:
+        u = procmem.usage(pid)
+        if u is None:
+            lines.append(f"{name:>6} {pid:>7}   (no /proc data)")
+            continue
+        rss += u.rss
+        pss += u.pss
+        lines.append(f"{name:>6} {pid:>7} {_mb(u.rss)} {_mb(u.pss)}  {_mb(u.shared)}  {_mb(u.unique)}")
+    # RSS считает общие страницы в каждом процессе, PSS — один раз на всех
+    lines.append(f"total rss {rss / 1024:.1f} MB, pss {pss / 1024:.1f} MB: sharing saves {(rss - pss) / 1024:.1f} MB")
+    return "\n".join(lines)
+
+
+def _reload() -> None:
+    t0 = time.perf_counter()
+    # прежние каталоги больше не нужны: размораживаем, чтобы сборщик мог их освободить
+    gc.unfreeze()
+    admin.reload_data()
+    n = keyboards.warm()
+    gc.collect()
+    gc.freeze()
+    log.info("reloaded in %.1fs (%d keyboards), restarting workers", time.perf_counter() - t0, n)
+
+
+def run(workers: int) -> int:
+    logging.basicConfig(level=settings.LOG_LEVEL.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # SIGUSR1/SIGHUP по умолчанию убивают процесс, а до fork отчитываться и перезагружать нечего
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    t0 = time.perf_counter()
+    # пока строятся каталоги, сборщик только зря обходил бы растущие структуры
+    gc.disable()
+    restored, n = app_main.preload()
+    gc.collect()
+    gc.freeze()
+    gc.enable()
+    log.info(
+        "preloaded in %.1fs (%s start, %d keyboards, %d objects frozen)",
+        time.perf_counter() - t0, "warm" if restored else "cold", n, gc.get_freeze_count(),
+    )
+
+    parts = shares(settings.profiles(), workers)
+    pids: Dict[int, int] = {}
+    started: Dict[int, float] = {}
+
+    def spawn_all() -> None:
+        for i, part in enumerate(parts):
+            pids[_spawn(i, part)] = i
+            started[i] = time.monotonic()
+        log.info("started %d worker(s): %s", len(pids), ", ".join(f"{w}={pid}" for pid, w in pids.items()))
+
+    spawn_all()
+    stopping = False
+    reload_requested = False
+    retiring: Set[int] = set()   # воркеры, остановленные ради /reload; новые стартуют, когда выйдут все
+
+    def stop(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGUSR1, lambda *_: log.info("memory:\n%s", report(pids)))
+
+    def request_reload(signum, _frame):
+        nonlocal reload_requested
+        reload_requested = True
+
+    signal.signal(signal.SIGHUP, request_reload)
+
+    every = settings.PREFORK_REPORT_S
+    next_report = time.monotonic() + every if every > 0 else None
+    while pids or retiring:
+        if reload_requested and not retiring and not stopping:
+            reload_requested = False
+            # пока родитель перечитывает данные, воркеры ещё отвечают на старых
+            _reload()
+            retiring = set(pids)
+            pids.clear()
+            for pid in retiring:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid in retiring:
+            retiring.discard(pid)
+            # старые воркеры отпустили токены (иначе getUpdates двух процессов конфликтует)
+            if not retiring and not stopping:
+                spawn_all()
+            continue
+        if pid == 0:
+            if next_report is not None and time.monotonic() >= next_report:
+                log.info("memory:\n%s", report(pids))
+                next_report += every
+            time.sleep(0.5)
+            continue
+        w = pids.pop(pid, None)
+        if w is None or stopping:
+            continue
+        log.warning("worker %d (pid %d) exited with %d, restarting", w, pid, os.waitstatus_to_exitcode(status))
+        if time.monotonic() - started[w] < RESPAWN_BACKOFF_S:
+            time.sleep(RESPAWN_BACKOFF_S)
+        pids[_spawn(w, parts[w])] = w
+        started[w] = time.monotonic()
+    log.info("all workers stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    if not hasattr(os, "fork"):
+        # без fork (Windows) — обычный запуск одним процессом
+        asyncio.run(app_main.main())
+        sys.exit(0)
+    sys.exit(run(settings.PREFORK_WORKERS))
@@ -0,0 +1,179 @@
+# app/utils/analytics.py
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import time
+from collections import Counter, deque
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from app.data import analytics_repo
+from app.utils import metrics
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Что реально открывают: просмотры карточек (event/hero/skill/mount_skill) и поисковые
+# запросы. На event loop — только append в кольцевой буфер; раз в FLUSH_S буфер
+# сворачивается в счётчики и пишется в SQLite в потоке. Переполнение буфера между
+# сбросами теряет самые старые записи (и считает их в analytics.dropped).
+# Популярность за WINDOW_DAYS держим в памяти: по ней сортируется поиск
+# и выбирается, какие карточки/картинки прогреть при старте и после /reload.
+
+RING_SIZE = 10_000
+FLUSH_S = 30.0
+WINDOW_DAYS = 30
+# Окно сдвигается: раз в столько перечитываем популярность из БД, чтобы старые дни выпадали
+POPULARITY_REFRESH_S = 3600.0
+
+_views: Deque[Tuple[float, str, str]] = deque(maxlen=RING_SIZE)
+_searches: Deque[Tuple[float, str, str, bool]] = deque(maxlen=RING_SIZE)
+_popular: Dict[str, Counter] = {}
+_task: Optional[asyncio.Task] = None
+
+
+def _day(ts: float) -> int:
+    return int(ts // 86400)
+
+
+# =========================
+# Recording (event loop, O(1))
+# =========================
+def view(kind: str, key: str) -> None:
+    if len(_views) == _views.maxlen:
+        metrics.inc("analytics.dropped")
+    _views.append((time.time(), kind, key))
+    # в ранжирование попадает сразу, не дожидаясь сброса в БД
+    _popular.setdefault(kind, Counter())[key] += 1
+
+
+def search(kind: str, query: str, hits: int) -> None:
+    q = " ".join((query or "").lower().split())[:100]
+    if not q:
+        return
+    if len(_searches) == _searches.maxlen:
+        metrics.inc("analytics.dropped")
+    _searches.append((time.time(), kind, q, hits == 0))
+
+
+# =========================
+# Popularity
+# =========================
+def rank(kind: str, items: Sequence[T], key: Callable[[T], str]) -> List[T]:
+    """Most viewed first; ties keep the original (relevance/file) order."""
+    c = _popular.get(kind)
+    if not c:
+        return list(items)
+    return sorted(items, key=lambda x: -c[key(x)])
+
+
+def top(kind: str, n: int) -> List[str]:
+    c = _popular.get(kind)
+    if not c:
+        return []
+    # зовут и из потоков прогрева, пока event loop считает просмотры: dict.copy атомарна
+    snap = dict.copy(c)
+    return [k for k, _ in heapq.nlargest(n, snap.items(), key=lambda kv: kv[1])]
+
+
+async def load_popularity() -> None:
+    """(Re)read view counts of the last WINDOW_DAYS from SQLite."""
+    global _popular
+    since = _day(time.time()) - WINDOW_DAYS
+    data = await asyncio.to_thread(analytics_repo.popularity, since)
+    fresh = {kind: Counter(keys) for kind, keys in data.items()}
+    # просмотры, ещё не сброшенные в БД, не теряем
+    for _, kind, key in _views:
+        fresh.setdefault(kind, Counter())[key] += 1
+    _popular = fresh
+
+
+# =========================
+# Flush
+# =========================
+def _drain(buf: deque) -> list:
+    out = []
+    while buf:
+        out.append(buf.popleft())
+    return out
+
+
+async def flush() -> int:
+    """Aggregate the buffers and write them out; returns the number of records."""
+    views = _drain(_views)
+    searches = _drain(_searches)
+    if not views and not searches:
+        return 0
+    vc = Counter((kind, key, _day(ts)) for ts, kind, key in views)
+    sc: Counter = Counter()
+    empty: Counter = Counter()
+    for ts, kind, q, miss in searches:
+        sc[(kind, q, _day(ts))] += 1
+        empty[(kind, q, _day(ts))] += miss
+    try:
+        if vc:
+            await asyncio.to_thread(analytics_repo.add_views, [(*k, n) for k, n in vc.items()])
+        if sc:
+            await asyncio.to_thread(
+                analytics_repo.add_searches, [(*k, n, empty[k]) for k, n in sc.items()],
+            )
+    except Exception:
+        metrics.inc("analytics.flush_failed")
+        log.warning("analytics flush failed, %d records lost", len(views) + len(searches), exc_info=True)
+        return 0
+    metrics.inc("analytics.flushed", len(views) + len(searches))
+    return len(views) + len(searches)
+
+
+async def _run(interval: float) -> None:
+    reload_at = time.monotonic() + POPULARITY_REFRESH_S
+    while True:
+        await asyncio.sleep(interval)
+        await flush()
+        if time.monotonic() >= reload_at:
+            reload_at = time.monotonic() + POPULARITY_REFRESH_S
+            try:
+                await load_popularity()
+            except Exception:
+                log.warning("popularity reload failed", exc_info=True)
+
+
+async def start(db_path: str | None = None, interval: float = FLUSH_S) -> None:
+    global _task
+    analytics_repo.init(db_path)
+    await load_popularity()
+    _task = asyncio.create_task(_run(interval), name="analytics-flush")
+
+
+async def stop() -> None:
+    """Cancel the periodic flush and write out what is left."""
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+    await flush()
+
+
+# =========================
+# Warming popular cards
+# =========================
+_warmers: List[Callable[[int], None]] = []
+
+
+def warmer(fn: Callable[[int], None]) -> Callable[[int], None]:
+    """Register fn(n): pre-render / pre-upload the n most viewed items of one kind."""
+    _warmers.append(fn)
+    return fn
+
+
+async def warm(n: int) -> None:
+    # рендер карточек и чтение каталогов (SQLite, файлы) — не на event loop
+    for fn in _warmers:
+        try:
+            await asyncio.to_thread(fn, n)
+        except Exception:
+            log.warning("popular warmer %s failed", fn.__module__, exc_info=True)
+
+
+metrics.gauge("analytics.buffered", lambda: len(_views) + len(_searches))
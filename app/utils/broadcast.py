@@ -0,0 +1,96 @@
+# app/utils/broadcast.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, List
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+
+log = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Flood control hit: drain the bucket so every sender waits."""
+        self.tokens = -seconds * self.rate
+
+
+@dataclass
+class BroadcastResult:
+    sent: List[int] = field(default_factory=list)
+    dead: List[int] = field(default_factory=list)     # blocked / chat gone
+    failed: List[int] = field(default_factory=list)   # transient errors, worth retrying
+
+
+class Broadcaster:
+    """
+    Bounded-concurrency sender for mass notifications.
+    - global token bucket keeps us under Telegram's broadcast limit
+    - semaphore bounds in-flight requests (and open connections)
+    - RetryAfter pauses the whole bucket, then the message is retried
+    """
+
+    def __init__(self, bot: Bot, rate: float = 25.0, concurrency: int = 16, retries: int = 3):
+        self.bot = bot
+        self.limiter = RateLimiter(rate)
+        self.sem = asyncio.Semaphore(concurrency)
+        self.retries = retries
+
+    async def _send_one(self, chat_id: int, text: str, res: BroadcastResult, **kwargs) -> None:
+        async with self.sem:
+            for _ in range(self.retries + 1):
+                await self.limiter.acquire()
+                try:
+                    await self.bot.send_message(chat_id, text, **kwargs)
+                    res.sent.append(chat_id)
+                    return
+                except TelegramRetryAfter as e:
+                    log.warning("broadcast: flood control, sleeping %ss", e.retry_after)
+                    self.limiter.pause(e.retry_after)
+                except TelegramForbiddenError:
+                    res.dead.append(chat_id)
+                    return
+                except TelegramBadRequest as e:
+                    if "chat not found" in str(e).lower():
+                        res.dead.append(chat_id)
+                    else:
+                        log.warning("broadcast: bad request for %s: %s", chat_id, e)
+                        res.failed.append(chat_id)
+                    return
+                except Exception as e:
+                    log.warning("broadcast: send to %s failed: %s", chat_id, e)
+                    await asyncio.sleep(1)
+            res.failed.append(chat_id)
+
+    async def send_batch(self, chat_ids: Iterable[int], text: str, **kwargs) -> BroadcastResult:
+        res = BroadcastResult()
+        await asyncio.gather(*(self._send_one(cid, text, res, **kwargs) for cid in chat_ids))
+        return res
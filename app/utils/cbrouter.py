@@ -0,0 +1,114 @@
+# app/utils/cbrouter.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import Router
+from aiogram.types import CallbackQuery
+
+# Формат callback_data: "<prefix>:<prefix>:...:<arg>:<arg>", например
+#   ev:view:<name>        hr:list:<page>        ms:nav:<type>:<slot>:<index>:prev|next
+# Вместо цепочки F.data.startswith(...) по всем роутерам — один фильтр:
+# payload разбирается один раз, маршрут ищется по префиксному дереву,
+# аргументы приводятся к типам и передаются в хендлер позиционно.
+
+SEP = ":"
+
+Handler = Callable[..., Awaitable[Any]]
+Converter = Callable[[str], Any]
+
+
+@dataclass
+class Route:
+    prefix: str
+    callback: Handler
+    converters: Tuple[Converter, ...]
+
+    def convert(self, rest: List[str]) -> Optional[tuple]:
+        n = len(self.converters)
+        if n == 0:
+            return () if not rest else None
+        if len(rest) < n:
+            return None
+        # последний аргумент забирает хвост целиком (имена с ':' внутри)
+        raw = rest[:n - 1] + [SEP.join(rest[n - 1:])]
+        try:
+            return tuple(conv(v) for conv, v in zip(self.converters, raw))
+        except (TypeError, ValueError):
+            return None
+
+
+@dataclass
+class _Node:
+    children: Dict[str, "_Node"] = field(default_factory=dict)
+    routes: List[Route] = field(default_factory=list)
+
+
+class CallbackRoutes:
+    """Prefix trie over callback_data segments, exposed as one aiogram router."""
+
+    def __init__(self, name: str = "callbacks"):
+        self._root = _Node()
+        self.count = 0
+        self.router = Router(name=name)
+        self.router.callback_query.register(self._dispatch, self._match)
+        # известный префикс, но payload не разобрался (старая кнопка) — гасим "часики"
+        self.router.callback_query.register(self._stale, self._known_namespace)
+
+    def route(self, prefix: str, *converters: Converter) -> Callable[[Handler], Handler]:
+        """
+        @callbacks.route("hr:list", int)
+        async def cb_list(q: CallbackQuery, page: int): ...
+        """
+        def deco(fn: Handler) -> Handler:
+            node = self._root
+            for seg in prefix.split(SEP):
+                node = node.children.setdefault(seg, _Node())
+            node.routes.append(Route(prefix, fn, tuple(converters)))
+            self.count += 1
+            return fn
+        return deco
+
+    def resolve(self, data: str) -> Optional[Tuple[Route, tuple]]:
+        parts = data.split(SEP)
+        node = self._root
+        # кандидаты от самого длинного префикса к короткому
+        stack: List[Tuple[_Node, int]] = []
+        for depth, seg in enumerate(parts):
+            node = node.children.get(seg)
+            if node is None:
+                break
+            if node.routes:
+                stack.append((node, depth + 1))
+        for node, depth in reversed(stack):
+            rest = parts[depth:]
+            for route in node.routes:
+                args = route.convert(rest)
+                if args is not None:
+                    return route, args
+        return None
+
+    async def _match(self, q: CallbackQuery) -> bool | Dict[str, Any]:
+        if not q.data:
+            return False
+        hit = self.resolve(q.data)
+        if hit is None:
+            return False
+        route, args = hit
+        return {"route": route, "route_args": args}
+
+    async def _known_namespace(self, q: CallbackQuery) -> bool:
+        return bool(q.data) and q.data.split(SEP, 1)[0] in self._root.children
+
+    @staticmethod
+    async def _stale(q: CallbackQuery) -> None:
+        await q.answer("This button is outdated.")
+
+    @staticmethod
+    async def _dispatch(q: CallbackQuery, route: Route, route_args: tuple) -> Any:
+        return await route.callback(q, *route_args)
+
+
+# Общий реестр для всех хендлеров бота
+callbacks = CallbackRoutes()
@@ -0,0 +1,195 @@
+# app/utils/contact_sheet.py
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:   # без Pillow списки остаются текстовыми
+    Image = None
+
+from app.config import settings
+from app.utils import media_cache, metrics
+from app.utils.singleflight import ThreadSingleFlight
+
+log = logging.getLogger(__name__)
+
+# «Контактный лист»: все иконки списка (умения слота, страница героев) одной
+# картинкой с подписями — вместо загрузки по картинке на каждый элемент.
+# Лист собирается при первом запросе (или при прогреве) и лежит на диске под
+# именем-хэшем входа: пути картинок с их (mtime, size), подписи и раскладка.
+# Поменялась иконка или подпись — другой хэш, другой файл; тот же вход — тот же
+# файл, а значит и тот же file_id в media_cache: лист грузится в Telegram один раз.
+
+Tile = Tuple[Optional[str], str]    # (путь к картинке или None, подпись)
+
+FORMAT = 1             # менять при правке раскладки: старые листы перестанут совпадать
+TILE = 128             # сторона клетки под иконку, px
+LABEL_H = 34           # две строки подписи
+PAD = 8
+MAX_COLS = 5
+MAX_TILES = 50         # не больше, чем кнопок в одном списке
+KEEP_FILES = 500       # больше листов на диске — удаляем давно не открытые
+BACKGROUND = (32, 34, 40)
+PLACEHOLDER = (58, 61, 70)
+TEXT = (230, 230, 230)
+FONTS = ("DejaVuSans.ttf", "Arial.ttf")   # с кириллицей; иначе встроенный шрифт Pillow
+
+_flight = ThreadSingleFlight("contact_sheet")
+
+
+def available() -> bool:
+    return Image is not None
+
+
+def _stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def key(tiles: List[Tile]) -> str:
+    """Hash of everything the sheet is drawn from."""
+    h = hashlib.sha1(f"{FORMAT}:{TILE}:{LABEL_H}:{MAX_COLS}".encode())
+    for src, label in tiles:
+        src = os.path.abspath(src) if src else None
+        h.update(json.dumps([src, src and _stamp(src), label], ensure_ascii=False).encode("utf-8"))
+    return h.hexdigest()[:24]
+
+
+def sheet(tiles: Iterable[Tile]) -> Optional[Path]:
+    """
+    Path of the JPEG grid for `tiles`, composed on first use (blocking — call
+    via asyncio.to_thread). None without Pillow or without tiles.
+    """
+    if Image is None:
+        return None
+    tiles = list(tiles)[:MAX_TILES]
+    if not tiles:
+        return None
+    path = Path(settings.CONTACT_SHEETS_DIR) / f"{key(tiles)}.jpg"
+    if path.exists():
+        metrics.inc("contact_sheet.hit")
+        # mtime — время последнего использования: _prune удаляет давно не открытые, а не самые старые
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+    # один и тот же лист, открытый сразу несколькими, собирается один раз
+    try:
+        return _flight.do(path.name, lambda: _compose(tiles, path))
+    except Exception:
+        # вызывающий покажет список текстом; здесь только след в логе
+        metrics.inc("contact_sheet.failed")
+        log.warning("contact sheet %s failed", path.name, exc_info=True)
+        raise
+
+
+@lru_cache(maxsize=1)
+def _font():
+    for name in FONTS:
+        try:
+            return ImageFont.truetype(name, 13)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def _icon(src: Optional[str]):
+    if not src:
+        return None
+    try:
+        with Image.open(src) as im:
+            im = im.convert("RGBA")
+    except (OSError, ValueError):
+        return None
+    im.thumbnail((TILE, TILE))
+    return im
+
+
+def _lines(draw, text: str, font, width: int) -> List[str]:
+    """Up to two lines fitting `width`; the rest is cut with an ellipsis."""
+    out: List[str] = []
+    words = text.split()
+    while words and len(out) < 2:
+        line = words.pop(0)
+        while words and draw.textlength(f"{line} {words[0]}", font=font) <= width:
+            line += " " + words.pop(0)
+        if len(out) == 1 and words:
+            line += " " + " ".join(words)
+            words = []
+        if draw.textlength(line, font=font) > width:
+            while line and draw.textlength(line + "…", font=font) > width:
+                line = line[:-1]
+            line += "…"
+        out.append(line)
+    return out
+
+
+def _compose(tiles: List[Tile], path: Path) -> Path:
+    if path.exists():   # пока ждали очереди, лист собрал предыдущий
+        return path
+    t0 = time.perf_counter()
+    # почти квадратная сетка: Telegram сжимает вытянутые фото сильнее
+    cols = min(MAX_COLS, max(1, math.ceil(math.sqrt(len(tiles)))))
+    rows = -(-len(tiles) // cols)
+    cell_w, cell_h = TILE + PAD, TILE + LABEL_H + PAD
+    img = Image.new("RGB", (cols * cell_w + PAD, rows * cell_h + PAD), BACKGROUND)
+    draw = ImageDraw.Draw(img)
+    font = _font()
+    for n, (src, label) in enumerate(tiles):
+        r, c = divmod(n, cols)
+        x, y = PAD + c * cell_w, PAD + r * cell_h
+        icon = _icon(src)
+        if icon is None:
+            draw.rectangle((x, y, x + TILE - 1, y + TILE - 1), fill=PLACEHOLDER)
+        else:
+            img.paste(icon, (x + (TILE - icon.width) // 2, y + (TILE - icon.height) // 2), icon)
+        for i, line in enumerate(_lines(draw, label, font, TILE)):
+            w = draw.textlength(line, font=font)
+            draw.text((x + (TILE - w) / 2, y + TILE + 2 + i * (LABEL_H // 2)), line, font=font, fill=TEXT)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # внутри процесса лист собирает один поток (_flight), но воркеры prefork
+    # могут собирать тот же лист одновременно — у каждого свой временный файл
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+    try:
+        img.save(tmp, "JPEG", quality=88)
+        if path.exists():   # соседний воркер успел раньше — его лист такой же
+            metrics.inc("contact_sheet.hit")
+            return path
+        os.replace(tmp, path)
+    finally:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+    metrics.inc("contact_sheet.composed")
+    log.debug("contact sheet %s: %d tiles in %.0f ms", path.name, len(tiles), (time.perf_counter() - t0) * 1000)
+    _prune(path.parent)
+    return path
+
+
+def _prune(folder: Path) -> None:
+    try:
+        files = sorted(folder.glob("*.jpg"), key=lambda p: p.stat().st_mtime)
+    except OSError:
+        return
+    for p in files[:max(0, len(files) - KEEP_FILES)]:
+        try:
+            p.unlink()
+        except OSError:
+            continue
+        # file_id удалённого листа больше не понадобится — не копим его в file_ids.json
+        media_cache.forget_file(p)
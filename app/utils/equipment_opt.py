@@ -0,0 +1,359 @@
+# app/utils/equipment_opt.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.data import equipment_repo
+from app.data.equipment_repo import SLOTS, STATS, TROOPS, Equipment
+from app.data.storage import load_json_with_fallback
+from app.utils import metrics
+from app.utils.singleflight import SingleFlight
+
+log = logging.getLogger(__name__)
+
+# Подбор снаряжения: по предмету на слот, цель — взвешенная сумма характеристик
+# для рода войск плюс бонусы комплектов за 2/4/6 предметов.
+# Характеристики предметов и бонусов лежат матрицами NumPy (строка — предмет,
+# столбец — "attack", "cavalry_attack", …); оценка всех предметов под цель — одно
+# умножение на вектор весов. В паре (слот, комплект) предметы отличаются только
+# очками — берём лучший из пары. Дальше ДП по подмножествам слотов (их 6, масок 64):
+# сборка — это блоки «комплект s на слотах m» плюс свободные слоты с лучшим предметом.
+# Перебор раскладок с отсечением по верхней границе h[m]; время почти не зависит
+# от размера каталога (он входит только в векторные шаги).
+
+GOALS_PATHS = ("data/equipment_goals.json", "./equipment_goals.json")
+# цель → веса характеристик (по STATS); data/equipment_goals.json в том же виде
+DEFAULT_GOALS: Dict[str, Dict[str, float]] = {
+    "attack": {"attack": 1.0, "defense": 0.25, "health": 0.25},
+    "defense": {"attack": 0.25, "defense": 1.0, "health": 0.5},
+    "health": {"attack": 0.25, "defense": 0.5, "health": 1.0},
+    "balanced": {"attack": 1.0, "defense": 1.0, "health": 1.0},
+}
+DEFAULT_GOAL = "balanced"
+
+# столбцы матриц: общая характеристика, затем она же для каждого рода войск
+COLS = tuple(c for s in STATS for c in (s, *(f"{t}_{s}" for t in TROOPS)))
+_COL = {c: i for i, c in enumerate(COLS)}
+
+RESULT_CACHE_SIZE = 256
+
+
+def load_goals() -> Dict[str, Dict[str, float]]:
+    try:
+        raw = load_json_with_fallback(*GOALS_PATHS)
+    except FileNotFoundError:
+        return dict(DEFAULT_GOALS)
+    return {
+        str(name).lower(): {s: float(w.get(s, 0.0)) for s in STATS}
+        for name, w in raw.items() if isinstance(w, dict)
+    } or dict(DEFAULT_GOALS)
+
+
+def _matrix(rows: Sequence[Dict[str, float]]) -> np.ndarray:
+    """Stat dicts → (len(rows) × COLS), filled in one scatter instead of row by row."""
+    r, c, v = [], [], []
+    for i, stats in enumerate(rows):
+        for k, x in stats.items():
+            r.append(i)
+            c.append(_COL[k])
+            v.append(x)
+    m = np.zeros((len(rows), len(COLS)))
+    np.add.at(m, (np.array(r, dtype=np.int64), np.array(c, dtype=np.int64)), v)
+    return m
+
+
+def projection(troop: Optional[str]) -> np.ndarray:
+    """COLS × STATS: how each column counts for `troop` (None — the average over troop types)."""
+    p = np.zeros((len(COLS), len(STATS)))
+    for j, s in enumerate(STATS):
+        p[_COL[s], j] = 1.0
+        for t in TROOPS:
+            if troop is None:
+                p[_COL[f"{t}_{s}"], j] = 1.0 / len(TROOPS)
+            elif t == troop:
+                p[_COL[f"{t}_{s}"], j] = 1.0
+    return p
+
+
+# =========================
+# Prepared catalog
+# =========================
+@dataclass
+class _Prepared:
+    version: int
+    items: List[Equipment]
+    index: Dict[str, int]            # slug → строка
+    stats: np.ndarray                # (предметы × COLS)
+    slot: np.ndarray                 # номер слота в SLOTS
+    set_id: np.ndarray               # номер комплекта, -1 — вне комплекта
+    set_slugs: List[str]
+    tier_pieces: List[np.ndarray]    # по комплекту: пороги 2/4/6…
+    tier_stats: List[np.ndarray]     # по комплекту: (пороги × COLS)
+
+
+def prepare(items: Sequence[Equipment], sets: Dict[str, equipment_repo.EquipmentSet], version: int = 0) -> _Prepared:
+    set_slugs = sorted({e.set for e in items if e.set and e.set in sets})
+    sid = {s: i for i, s in enumerate(set_slugs)}
+    return _Prepared(
+        version=version,
+        items=list(items),
+        index={e.slug: i for i, e in reversed(list(enumerate(items)))},
+        stats=_matrix([e.stats for e in items]),
+        slot=np.array([SLOTS.index(e.slot) for e in items], dtype=np.int64),
+        set_id=np.array([sid.get(e.set, -1) for e in items], dtype=np.int64),
+        set_slugs=set_slugs,
+        tier_pieces=[np.array([b.pieces for b in sets[s].bonuses], dtype=np.int64) for s in set_slugs],
+        tier_stats=[_matrix([b.stats for b in sets[s].bonuses]) for s in set_slugs],
+    )
+
+
+# =========================
+# DP over slot subsets
+# =========================
+def candidates(prep: _Prepared, score: np.ndarray, locks: Tuple[int, ...]) -> np.ndarray:
+    """The best item of every (slot, set) pair; a locked item is the only choice for its slot."""
+    allowed = np.ones(len(prep.items), dtype=bool)
+    for i in locks:
+        allowed &= prep.slot != prep.slot[i]
+    allowed[list(locks)] = True
+    idx = np.flatnonzero(allowed)
+    order = idx[np.lexsort((-score[idx], prep.set_id[idx], prep.slot[idx]))]
+    group = prep.slot[order] * (len(prep.set_slugs) + 1) + prep.set_id[order] + 1
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = group[1:] != group[:-1]
+    return order[first]
+
+
+def _submasks(m: int, low: int):
+    """Non-empty submasks of m that contain the bit `low`."""
+    rest = m ^ low
+    sub = rest
+    while True:
+        yield sub | low
+        if sub == 0:
+            return
+        sub = (sub - 1) & rest
+
+
+def search(
+    prep: _Prepared, weights: np.ndarray, locks: Tuple[int, ...] = (), top: int = 3,
+) -> Tuple[List[Tuple[float, Tuple[int, ...]]], int]:
+    """
+    The best build for the weight vector over COLS and up to top-1 best
+    alternatives with a different set layout: [(score, item indices)], best
+    first; also the number of search nodes (for the log).
+    """
+    size, n_sets = len(SLOTS), len(prep.set_slugs)
+    score = prep.stats @ weights
+    cand = candidates(prep, score, locks)
+    # val/pick[g, k]: лучший предмет группы g в слоте k; g = 0 — вне комплекта, 1 + s — комплект s
+    val = np.full((n_sets + 1, size), -np.inf)
+    pick = np.full((n_sets + 1, size), -1, dtype=np.int64)
+    val[prep.set_id[cand] + 1, prep.slot[cand]] = score[cand]
+    pick[prep.set_id[cand] + 1, prep.slot[cand]] = cand
+    # свободный слот: лучший предмет вообще; пустой слот (предметов нет) даёт 0
+    g_any = val.argmax(axis=0)
+    any_pick = np.where(np.isfinite(val.max(axis=0)), pick[g_any, np.arange(size)], -1)
+    any_val = np.where(any_pick >= 0, val.max(axis=0), 0.0)
+
+    # бонус комплекта при c предметах (накопительно по порогам)
+    curve = np.zeros((n_sets, size + 1))
+    for s in range(n_sets):
+        gain = prep.tier_stats[s] @ weights
+        for p, g in zip(prep.tier_pieces[s], gain):
+            if p <= size:
+                curve[s, p:] += g
+
+    # Блок: комплект s целиком занимает слоты маски m. Блок имеет смысл, только если
+    # его размер ровно добивает порог бонуса — иначе лишний предмет ничем не лучше
+    # свободного слота (при неубывающих бонусах). Ценность блоков всех комплектов
+    # на все 2^6 масок — одна операция над массивом (комплекты × маски × слоты).
+    masks = (np.arange(1 << size)[:, None] >> np.arange(size)) & 1
+    pc = masks.sum(axis=1)
+    block = np.where(masks.astype(bool)[None], val[1:, None, :], 0.0).sum(axis=2) + curve[:, pc]
+    block[:, 0] = -np.inf
+    step = curve[:, pc] > curve[:, np.maximum(pc - 1, 0)]
+    block[~step] = -np.inf
+    # на маску хватает нескольких лучших комплектов: один комплект не бывает в двух блоках
+    k = min(n_sets, size + top)
+    blocks: List[List[Tuple[float, int]]] = [[] for _ in range(1 << size)]
+    if k:
+        best_s = np.argsort(-block, axis=0, kind="stable")[:k]
+        for m in range(1, 1 << size):
+            blocks[m] = [(float(block[s, m]), int(s)) for s in best_s[:, m] if np.isfinite(block[s, m])]
+
+    # h[m] — верхняя граница для слотов m (без запрета на повтор комплекта), ДП по подмножествам
+    any_l = any_val.tolist()
+    h = [0.0] * (1 << size)
+    for m in range(1, 1 << size):
+        low = m & -m
+        b = any_l[low.bit_length() - 1] + h[m ^ low]
+        for sub in _submasks(m, low):
+            if blocks[sub] and blocks[sub][0][0] + h[m ^ sub] > b:
+                b = blocks[sub][0][0] + h[m ^ sub]
+        h[m] = b
+
+    sc = score.tolist()
+    sid = prep.set_id.tolist()
+    curve_l = curve.tolist()
+    pick_l = pick.tolist()
+    any_pick_l = any_pick.tolist()
+    found: Dict[Tuple[int, ...], float] = {}
+    floor = -np.inf
+    nodes = 0
+
+    def record(layout: List[Tuple[int, int]]) -> None:
+        nonlocal floor
+        items = []
+        for s, m in layout:
+            for k in range(size):
+                if m >> k & 1:
+                    i = any_pick_l[k] if s < 0 else pick_l[s + 1][k]
+                    if i >= 0:
+                        items.append(i)
+        key = tuple(sorted(items))
+        if key in found:
+            return
+        # итог по настоящему числу предметов каждого комплекта (свободный слот мог добавить)
+        counts: Dict[int, int] = {}
+        for i in key:
+            if sid[i] >= 0:
+                counts[sid[i]] = counts.get(sid[i], 0) + 1
+        found[key] = sum(sc[i] for i in key) + sum(curve_l[s][c] for s, c in counts.items())
+        if len(found) >= top:
+            floor = sorted(found.values(), reverse=True)[top - 1]
+
+    def dfs(rem: int, cur: float, used: frozenset, layout: List[Tuple[int, int]]) -> None:
+        nonlocal nodes
+        nodes += 1
+        if cur + h[rem] <= floor:
+            return
+        if rem == 0:
+            record(layout)
+            return
+        low = rem & -rem
+        for sub in _submasks(rem, low):
+            for v, s in blocks[sub]:
+                if s not in used:
+                    dfs(rem ^ sub, cur + v, used | {s}, layout + [(s, sub)])
+        dfs(rem ^ low, cur + any_l[low.bit_length() - 1], used, layout + [(-1, low)])
+
+    dfs((1 << size) - 1, 0.0, frozenset(), [])
+    res = sorted(((v, key) for key, v in found.items()), reverse=True)[:top]
+    return res, nodes
+
+
+# =========================
+# Public API
+# =========================
+@dataclass
+class Build:
+    score: float
+    items: List[Equipment]                 # в порядке SLOTS
+    stats: Dict[str, float]                # итог по STATS для выбранного рода войск
+    sets: List[Tuple[str, int]]            # (комплект, предметов) — только с активным бонусом
+
+
+_goals: Optional[Dict[str, Dict[str, float]]] = None
+_prepared: Dict[str, _Prepared] = {}
+_results: "OrderedDict[Tuple, List[Build]]" = OrderedDict()
+
+
+def goals() -> Dict[str, Dict[str, float]]:
+    global _goals
+    if _goals is None:
+        _goals = load_goals()
+    return _goals
+
+
+def reload_goals() -> None:
+    global _goals
+    _goals = None
+    _results.clear()
+
+
+def _prepare(locale: str | None) -> _Prepared:
+    ver = equipment_repo.version()
+    p = _prepared.get(locale or "")
+    if p is None or p.version != ver:
+        p = _prepared[locale or ""] = prepare(
+            equipment_repo.list_equipment(locale), equipment_repo.sets(locale), ver,
+        )
+    return p
+
+
+def _describe(prep: _Prepared, score: float, idx: Tuple[int, ...], proj: np.ndarray, locale: str | None) -> Build:
+    total = prep.stats[list(idx)].sum(axis=0)
+    sets = equipment_repo.sets(locale)
+    active = []
+    ids, counts = np.unique(prep.set_id[list(idx)], return_counts=True)
+    for s, c in zip(ids.tolist(), counts.tolist()):
+        if s < 0:
+            continue
+        on = prep.tier_pieces[s] <= c
+        if on.any():
+            total = total + prep.tier_stats[s][on].sum(axis=0)
+            active.append((sets[prep.set_slugs[s]].name, c))
+    eff = total @ proj
+    items = sorted((prep.items[i] for i in idx), key=lambda e: SLOTS.index(e.slot))
+    return Build(score, items, dict(zip(STATS, eff.round(2).tolist())), active)
+
+
+_searches = SingleFlight("equipment")
+
+
+async def best_builds(
+    troop: str | None = None, goal: str = DEFAULT_GOAL, locks: Sequence[str] = (),
+    locale: str | None = None, top: int = 3,
+) -> List[Build]:
+    """
+    The best gear for `troop` (None — all troop types) and a goal from
+    goals(), then alternatives with other set layouts; `locks` are item
+    slugs that must be worn.
+    """
+    p = _prepared.get(locale or "")
+    # большой каталог разбирается в матрицы заметное время — не на event loop
+    prep = p if p is not None and p.version == equipment_repo.version() else await asyncio.to_thread(_prepare, locale)
+    weights_by_stat = goals()[goal]
+    slugs = prep.index
+    # один предмет на слот: из двух закреплённых в одном слоте остаётся последний
+    by_slot = {int(prep.slot[slugs[s]]): slugs[s] for s in locks if s in slugs}
+    locks_i = tuple(sorted(by_slot.values()))
+    key = (locale or "", prep.version, troop, goal, tuple(sorted(weights_by_stat.items())), locks_i, top)
+    hit = _results.get(key)
+    if hit is not None:
+        _results.move_to_end(key)
+        metrics.inc("equipment.cache_hit")
+        return hit
+    metrics.inc("equipment.cache_miss")
+    return await _searches.do(key, lambda: _run(key, prep, troop, weights_by_stat, locks_i, top, locale))
+
+
+async def _run(
+    key: Tuple, prep: _Prepared, troop: str | None, weights_by_stat: Dict[str, float],
+    locks_i: Tuple[int, ...], top: int, locale: str | None,
+) -> List[Build]:
+    t0 = time.perf_counter()
+    proj = projection(troop)
+    weights = proj @ np.array([weights_by_stat.get(s, 0.0) for s in STATS])
+    found, nodes = await asyncio.to_thread(search, prep, weights, locks_i, top)
+    builds = [_describe(prep, score, idx, proj, locale) for score, idx in found]
+    log.info(
+        "equipment search",
+        extra={"items": len(prep.items), "sets": len(prep.set_slugs), "nodes": nodes,
+               "duration_ms": round((time.perf_counter() - t0) * 1000, 1)},
+    )
+    _results[key] = builds
+    if len(_results) > RESULT_CACHE_SIZE:
+        _results.popitem(last=False)
+    return builds
+
+
+metrics.gauge("equipment.cached_results", lambda: len(_results))
@@ -0,0 +1,279 @@
+# app/utils/i18n.py
+from __future__ import annotations
+
+import unicodedata
+from pathlib import Path
+from typing import Dict, Tuple
+
+DEFAULT_LOCALE = "en"
+LOCALES = ("en", "ru")
+
+# language_code из Telegram → наша локаль
+_LANG_MAP = {"ru": "ru", "uk": "ru", "be": "ru", "kk": "ru"}
+
+
+def user_locale(user) -> str:
+    code = ((getattr(user, "language_code", None) or "").split("-")[0]).lower()
+    return _LANG_MAP.get(code, DEFAULT_LOCALE)
+
+
+def norm(text: str | None, locale: str = DEFAULT_LOCALE) -> str:
+    """
+    Normalisation for search, per locale:
+    - ru: casefold + ё→е (users rarely type ё)
+    - en: casefold + strip diacritics (Ragnarök → ragnarok)
+    """
+    s = (text or "").casefold()
+    if locale == "ru":
+        return s.replace("ё", "е")
+    if s.isascii():
+        return s
+    return "".join(ch for ch in unicodedata.normalize("NFKD", s) if not unicodedata.combining(ch))
+
+
+def locale_paths(locale: str, filename: str, default_paths: Tuple[str, ...]) -> Tuple[str, ...]:
+    """data/<locale>/<filename> for non-default locales; the default catalog paths otherwise."""
+    if locale == DEFAULT_LOCALE:
+        return default_paths
+    return (str(Path("data") / locale / filename),)
+
+
+def has_locale_file(locale: str, filename: str) -> bool:
+    return locale != DEFAULT_LOCALE and (Path("data") / locale / filename).exists()
+
+
+# =========================
+# UI strings
+# =========================
+_STRINGS: Dict[str, Dict[str, str]] = {
+    "en": {
+        "description": "Description",
+        "rewards": "Rewards",
+        "bonus": "Bonus",
+        "tips": "Tips",
+        "time": "Time",
+        "duration": "Duration",
+        "rules": "Rules",
+        "type": "Type",
+        "season": "Season",
+        "effect": "Effect",
+        "probability": "Probability",
+        "frequency": "Frequency",
+        "hero": "Hero",
+        "specialty": "Specialty",
+        "talents": "Talents",
+        "skills": "Skills",
+        "awakening": "Awakening",
+        "rage": "Rage",
+        "select_event": "Select an event:",
+        "select_hero": "Select a hero:",
+        "select_skill": "Select a skill:",
+        "no_events": "No events yet.",
+        "no_heroes": "No heroes yet.",
+        "no_skills": "No skills yet.",
+        "no_matches": "No matches found.",
+        "found": "Found {n} match(es). Select:",
+        "not_found": "Not found",
+        "prev": "⭠ Prev",
+        "next": "Next ⭢",
+        "live_now": "Live now",
+        "coming_next": "Coming next",
+        "nothing_live": "Nothing is running right now.",
+        "nothing_scheduled": "Nothing scheduled yet.",
+        "ends_in": "ends in {d}",
+        "starts_in": "starts in {d}",
+        "sub_usage": "Usage: /subscribe &lt;event name&gt; (exact name or a unique search)",
+        "sub_no_schedule": "<b>{name}</b> has no schedule yet — nothing to remind about.",
+        "sub_on": "🔔 This chat will be reminded about <b>{name}</b>.",
+        "unsub_usage": "Usage: /unsubscribe &lt;event name&gt;",
+        "unsub_off": "🔕 Reminders for <b>{name}</b> are off.",
+        "unsub_none": "This chat was not subscribed.",
+        "remind_me": "🔔 Remind me",
+        "stop_reminders": "🔕 Stop reminders",
+        "reminder_set": "🔔 Reminder set",
+        "reminder_removed": "🔕 Reminder removed",
+        "subs_title": "Reminders",
+        "subs_empty": "🔕 No reminders yet. Open an event and tap 🔔 or use /subscribe &lt;event&gt;.",
+        "best_teams": "Best teams",
+        "no_teams": "Not enough heroes for a team of this size.",
+        "partial_result": "Search time limit reached — best found so far.",
+        "similar": "🔎 Similar",
+        "similar_to": "Similar to {name}:",
+        "no_similar": "Nothing similar found.",
+        "equipment": "Equipment",
+        "no_equipment": "No equipment yet.",
+        "best_builds": "Best gear",
+        "no_builds": "Nothing fits these constraints.",
+        "all_troops": "all troops",
+        "jewels": "Jewels",
+        "no_jewels": "No jewels yet.",
+        "level": "Lv",
+        "buy": "buy",
+        "craft": "craft",
+        "from_stock": "from stock",
+        "in_stock": "On hand",
+        "jewel_plan": "{name} → Lv {level}",
+        "total_cost": "Total",
+        "unreachable": "Not reachable: a level on the way cannot be bought and there is not enough stock.",
+        "jewels_help": (
+            "<b>/jewels</b> [name] [level] [xN] [level:count …]\n"
+            "/jewels – all jewels\n"
+            "/jewels ruby – levels, recipes and prices\n"
+            "/jewels ruby 6 – cheapest way to a level 6 Ruby\n"
+            "/jewels ruby 6 x2 1:10 3:1 – two of them, with ten Lv 1 and one Lv 3 on hand"
+        ),
+        "kvk": "KvK-3",
+        "kvk_members": "Members",
+        "kvk_power": "Power",
+        "kvk_avg": "avg",
+        "kvk_median": "median",
+        "kvk_top_share": "Top {n}: {share} of power",
+        "kvk_troops": "Troops",
+        "kvk_strongest": "Strongest",
+        "kvk_power_unknown": "no power given: {n}",
+        "kvk_rallies": "Rallies",
+        "kvk_reserve": "Reserve (did not fit): {n}",
+        "kvk_projection": "Points projection: day {day} of {days}",
+        "kvk_now": "Now",
+        "kvk_end": "By the end",
+        "kvk_idle": "No points yet: {n}",
+        "kvk_no_roster": "No member table yet. Send a CSV file with the caption /kvk3 (columns: name, power, infantry, cavalry, archer, march, rally, kills, points).",
+        "kvk_imported": "Table imported: {added} rows, {members} members in total.",
+        "kvk_need_column": "The table has no “{col}” column — send a CSV with it first.",
+        "kvk_bad_file": "Cannot read the table: {error}",
+        "kvk_too_big": "The file is too large (limit {mb} MB).",
+        "kvk_not_allowed": "Only chat administrators can change the member table.",
+        "kvk_reset_done": "Member table cleared.",
+        "ms_best_combos": "Best combos",
+        "ms_no_combos": "No combos yet.",
+        "ms_pairs": "{n} pairs",
+        "ms_slots": "Slots",
+        "ms_types": "Types",
+        "kvk_help": (
+            "<b>/kvk3</b>\n"
+            "/kvk3 – alliance summary\n"
+            "/kvk3 rallies [N] – split members into N rallies\n"
+            "/kvk3 project &lt;day&gt; &lt;days&gt; – points by the end of KvK at the current pace\n"
+            "/kvk3 reset – clear the member table\n"
+            "Send a CSV file with the caption /kvk3 to import or update members."
+        ),
+    },
+    "ru": {
+        "description": "Описание",
+        "rewards": "Награды",
+        "bonus": "Бонус",
+        "tips": "Советы",
+        "time": "Время",
+        "duration": "Длительность",
+        "rules": "Правила",
+        "type": "Тип",
+        "season": "Сезон",
+        "effect": "Эффект",
+        "probability": "Шанс",
+        "frequency": "Частота",
+        "hero": "Герой",
+        "specialty": "Специализация",
+        "talents": "Таланты",
+        "skills": "Умения",
+        "awakening": "Пробуждение",
+        "rage": "Ярость",
+        "select_event": "Выберите событие:",
+        "select_hero": "Выберите героя:",
+        "select_skill": "Выберите умение:",
+        "no_events": "Событий пока нет.",
+        "no_heroes": "Героев пока нет.",
+        "no_skills": "Умений пока нет.",
+        "no_matches": "Ничего не найдено.",
+        "found": "Найдено: {n}. Выберите:",
+        "not_found": "Не найдено",
+        "prev": "⭠ Назад",
+        "next": "Вперёд ⭢",
+        "live_now": "Идут сейчас",
+        "coming_next": "Скоро",
+        "nothing_live": "Сейчас ничего не идёт.",
+        "nothing_scheduled": "Пока ничего не запланировано.",
+        "ends_in": "закончится через {d}",
+        "starts_in": "начнётся через {d}",
+        "sub_usage": "Использование: /subscribe &lt;название события&gt; (точное название или однозначный поиск)",
+        "sub_no_schedule": "У <b>{name}</b> пока нет расписания — напоминать не о чем.",
+        "sub_on": "🔔 Этот чат получит напоминания о <b>{name}</b>.",
+        "unsub_usage": "Использование: /unsubscribe &lt;название события&gt;",
+        "unsub_off": "🔕 Напоминания о <b>{name}</b> выключены.",
+        "unsub_none": "Этот чат не был подписан.",
+        "remind_me": "🔔 Напомнить",
+        "stop_reminders": "🔕 Не напоминать",
+        "reminder_set": "🔔 Напоминание включено",
+        "reminder_removed": "🔕 Напоминание выключено",
+        "subs_title": "Напоминания",
+        "subs_empty": "🔕 Напоминаний пока нет. Откройте событие и нажмите 🔔 или используйте /subscribe &lt;событие&gt;.",
+        "best_teams": "Лучшие отряды",
+        "no_teams": "Недостаточно героев для отряда такого размера.",
+        "partial_result": "Поиск упёрся в лимит времени — показано лучшее из найденного.",
+        "similar": "🔎 Похожие",
+        "similar_to": "Похожие на {name}:",
+        "no_similar": "Похожих не нашлось.",
+        "equipment": "Снаряжение",
+        "no_equipment": "Снаряжения пока нет.",
+        "best_builds": "Лучшее снаряжение",
+        "no_builds": "Под эти условия ничего не подходит.",
+        "all_troops": "все войска",
+        "jewels": "Камни",
+        "no_jewels": "Камней пока нет.",
+        "level": "Ур.",
+        "buy": "купить",
+        "craft": "собрать",
+        "from_stock": "из запаса",
+        "in_stock": "Есть",
+        "jewel_plan": "{name} → ур. {level}",
+        "total_cost": "Итого",
+        "unreachable": "Недостижимо: один из уровней не продаётся, а запаса не хватает.",
+        "jewels_help": (
+            "<b>/jewels</b> [название] [уровень] [xN] [уровень:количество …]\n"
+            "/jewels – все камни\n"
+            "/jewels ruby – уровни, рецепты и цены\n"
+            "/jewels ruby 6 – самый дешёвый путь к рубину 6 уровня\n"
+            "/jewels ruby 6 x2 1:10 3:1 – два таких, если есть десять ур. 1 и один ур. 3"
+        ),
+        "kvk": "KvK-3",
+        "kvk_members": "Участники",
+        "kvk_power": "Мощь",
+        "kvk_avg": "средняя",
+        "kvk_median": "медиана",
+        "kvk_top_share": "Топ {n}: {share} мощи",
+        "kvk_troops": "Войска",
+        "kvk_strongest": "Сильнейшие",
+        "kvk_power_unknown": "без мощи: {n}",
+        "kvk_rallies": "Сборы",
+        "kvk_reserve": "В резерве (не поместились): {n}",
+        "kvk_projection": "Прогноз очков: день {day} из {days}",
+        "kvk_now": "Сейчас",
+        "kvk_end": "К концу",
+        "kvk_idle": "Без очков: {n}",
+        "kvk_no_roster": "Таблицы участников пока нет. Пришлите CSV-файл с подписью /kvk3 (колонки: name, power, infantry, cavalry, archer, march, rally, kills, points).",
+        "kvk_imported": "Таблица загружена: строк {added}, всего участников {members}.",
+        "kvk_need_column": "В таблице нет колонки «{col}» — сначала пришлите CSV с ней.",
+        "kvk_bad_file": "Не удалось прочитать таблицу: {error}",
+        "kvk_too_big": "Файл слишком большой (предел {mb} МБ).",
+        "kvk_not_allowed": "Менять таблицу участников могут только администраторы чата.",
+        "kvk_reset_done": "Таблица участников очищена.",
+        "ms_best_combos": "Лучшие пары",
+        "ms_no_combos": "Пар пока нет.",
+        "ms_pairs": "пар: {n}",
+        "ms_slots": "Слоты",
+        "ms_types": "Типы",
+        "kvk_help": (
+            "<b>/kvk3</b>\n"
+            "/kvk3 – сводка по альянсу\n"
+            "/kvk3 rallies [N] – разбить участников на N сборов\n"
+            "/kvk3 project &lt;день&gt; &lt;дней&gt; – очки к концу KvK при нынешнем темпе\n"
+            "/kvk3 reset – очистить таблицу участников\n"
+            "Пришлите CSV-файл с подписью /kvk3, чтобы загрузить или обновить участников."
+        ),
+    },
+}
+
+
+def t(key: str, locale: str = DEFAULT_LOCALE, **kwargs) -> str:
+    table = _STRINGS.get(locale) or _STRINGS[DEFAULT_LOCALE]
+    s = table.get(key) or _STRINGS[DEFAULT_LOCALE].get(key, key)
+    return s.format(**kwargs) if kwargs else s
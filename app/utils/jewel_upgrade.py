@@ -0,0 +1,158 @@
+# app/utils/jewel_upgrade.py
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+from app.data.jewels_repo import Jewel
+from app.utils import metrics
+
+# Самый дешёвый путь до камня нужного уровня с учётом того, что уже есть.
+# Камень уровня L можно взять из запаса (даром), собрать из combine камней
+# уровня L-1 за cost или купить за buy (если продаётся). Цепочка линейная,
+# поэтому для каждого уровня достаточно знать цену каждого следующего камня:
+# кривую (сколько, цена за штуку), отсортированную по цене. Кривая уровня
+# строится из кривой предыдущего (ДП по уровням): запас → собранные (по combine
+# самых дешёвых снизу) → покупка, где она дешевле сборки. Кривые мемоизируются
+# по (уровни, запас), готовые планы — по (уровни, цель, количество, запас).
+
+PLAN_CACHE_SIZE = 1024
+MAX_STOCK = 100_000     # больше камней одного уровня на руках не бывает
+
+INF = math.inf
+
+# (сколько камней, цена за штуку, откуда: "stock" | "craft" | "buy")
+Segment = Tuple[float, float, str]
+
+
+@dataclass(frozen=True)
+class Tier:
+    combine: int
+    cost: int
+    buy: Optional[int]
+
+
+def tiers(j: Jewel) -> Tuple[Tier, ...]:
+    return tuple(Tier(lv.combine, lv.cost, lv.buy) for lv in j.levels)
+
+
+def _crafted(prev: Sequence[Segment], combine: int, cost: int) -> List[Segment]:
+    """Per-unit prices of crafting from the cheapest units of the previous level, in order."""
+    out: List[Segment] = []
+    part_n, part_cost = 0, 0.0     # недособранный камень на стыке двух отрезков
+    for n, price, _ in prev:
+        if part_n:
+            take = min(combine - part_n, n)
+            part_n += take
+            part_cost += take * price
+            n -= take
+            if part_n < combine:
+                continue
+            out.append((1, cost + part_cost, "craft"))
+            part_n, part_cost = 0, 0.0
+        if n == INF:
+            out.append((INF, cost + combine * price, "craft"))
+            break
+        full, rest = divmod(int(n), combine)
+        if full:
+            out.append((full, cost + combine * price, "craft"))
+        if rest:
+            part_n, part_cost = rest, rest * price
+    return out
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def curves(levels: Tuple[Tier, ...], stock: Tuple[int, ...]) -> Tuple[Tuple[Segment, ...], ...]:
+    """For every level: segments of units by increasing price (stock, then crafting / buying)."""
+    out: List[Tuple[Segment, ...]] = []
+    for lv, t in enumerate(levels):
+        segs: List[Segment] = [(stock[lv], 0.0, "stock")] if lv < len(stock) and stock[lv] > 0 else []
+        crafted = _crafted(out[-1], t.combine, t.cost) if lv else []
+        if t.buy is None:
+            segs += crafted
+        else:
+            # сборка выгодна, пока камень снизу обходится дешевле покупки готового
+            segs += [s for s in crafted if s[1] < t.buy]
+            segs.append((INF, float(t.buy), "buy"))
+        out.append(tuple(segs))
+    return tuple(out)
+
+
+def _take(curve: Sequence[Segment], n: int) -> Optional[List[Segment]]:
+    """The cheapest n units of a curve as (count, price, kind); None if there are fewer than n."""
+    got: List[Segment] = []
+    for cnt, price, kind in curve:
+        if n <= 0:
+            break
+        k = n if cnt == INF else min(n, int(cnt))
+        got.append((k, price, kind))
+        n -= k
+    return got if n <= 0 else None
+
+
+@dataclass(frozen=True)
+class Step:
+    level: int
+    from_stock: int
+    crafted: int
+    bought: int
+    craft_cost: int       # плата за сборку на этом уровне
+    buy_cost: int
+
+
+@dataclass(frozen=True)
+class Plan:
+    target: int
+    count: int
+    total: Optional[int]          # None — недостижимо (нужный уровень не купить, а запаса мало)
+    steps: Tuple[Step, ...]       # от нижнего уровня к целевому, только уровни с действиями
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def plan(levels: Tuple[Tier, ...], target: int, count: int = 1, stock: Tuple[int, ...] = ()) -> Plan:
+    """Cheapest way to hold `count` jewels of level `target` (1-based) given `stock[i]` jewels of level i+1."""
+    metrics.inc("jewels.plan_computed")
+    cv = curves(levels, stock)
+    need = [0] * target
+    need[target - 1] = count
+    rows: List[Step] = []
+    # сверху вниз: сколько собрать на уровне L — столько·combine нужно с уровня L-1
+    for lv in range(target - 1, -1, -1):
+        got = _take(cv[lv], need[lv]) if need[lv] else []
+        if got is None:
+            return Plan(target, count, None, ())
+        by = {"stock": 0, "craft": 0, "buy": 0}
+        craft_cost = buy_cost = 0
+        for k, price, kind in got:
+            by[kind] += k
+            if kind == "buy":
+                buy_cost += k * int(price)
+        if by["craft"]:
+            craft_cost = by["craft"] * levels[lv].cost
+            need[lv - 1] = by["craft"] * levels[lv].combine
+        if any(by.values()):
+            rows.append(Step(lv + 1, by["stock"], by["craft"], by["buy"], craft_cost, buy_cost))
+    rows.reverse()
+    return Plan(target, count, sum(s.craft_cost + s.buy_cost for s in rows), tuple(rows))
+
+
+def parse_stock(args: Sequence[str], max_level: int, cap: int = MAX_STOCK) -> Tuple[int, ...]:
+    """
+    ["1:12", "3:2"] → (12, 0, 2): jewels on hand per level. ValueError for a
+    level outside 1..max_level; counts above `cap` are cut to it.
+    """
+    counts: dict = {}
+    for a in args:
+        lv, _, n = a.partition(":")
+        lv = int(lv)
+        if not 1 <= lv <= max_level:
+            raise ValueError(lv)
+        # запас — это ключ кэшей планов и карточек: держим его маленьким
+        counts[lv] = min(cap, counts.get(lv, 0) + int(n))
+    top = max(counts, default=0)
+    return tuple(counts.get(lv, 0) for lv in range(1, top + 1))
+
+
+metrics.gauge("jewels.cached_plans", lambda: plan.cache_info().currsize)
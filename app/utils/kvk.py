@@ -0,0 +1,156 @@
+# app/utils/kvk.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.data.kvk_repo import Roster
+
+# Расчёты к KvK по составу альянса (kvk_repo.Roster): сводка, составы сборов,
+# прогноз очков. Всё — операции над колонками целиком, без циклов по игрокам:
+# на тысячах участников это миллисекунды. Результаты кэшируются в обработчике
+# (render.cached_card) по объекту состава — новый импорт создаёт новый объект.
+
+TROOP_COLS = ("infantry", "cavalry", "archer")
+TOP_SHARES = (10, 50, 100)
+
+
+def _nz(a: Optional[np.ndarray]) -> np.ndarray:
+    return np.nan_to_num(a, nan=0.0) if a is not None else np.zeros(0)
+
+
+# =========================
+# Summary
+# =========================
+@dataclass
+class Summary:
+    members: int
+    totals: Dict[str, float]                # колонка → сумма (только заполненные колонки)
+    power_mean: Optional[float]
+    power_median: Optional[float]
+    top_share: List[Tuple[int, float]]      # (первые N по мощи, их доля мощи альянса)
+    troop_mix: Dict[str, float]             # род войск → доля от всех войск
+    top: List[Tuple[str, float]]            # самые сильные по мощи
+    power_unknown: int = 0                  # участников без мощи (пустая ячейка)
+
+
+def summary(r: Roster, top: int = 10) -> Summary:
+    totals = {c: float(np.nansum(a)) for c in r.cols if (a := r.col(c)) is not None}
+    power = r.col("power")
+    mean = median = None
+    shares: List[Tuple[int, float]] = []
+    best: List[Tuple[str, float]] = []
+    unknown = 0
+    if power is not None:
+        has = ~np.isnan(power)
+        unknown = int(len(power) - has.sum())
+        known = power[has]
+    if power is not None and known.size:
+        mean, median = float(known.mean()), float(np.median(known))
+        desc = np.sort(known)[::-1]
+        cum = np.cumsum(desc)
+        shares = [(n, float(cum[n - 1] / cum[-1])) for n in TOP_SHARES if len(desc) > n and cum[-1] > 0]
+        # без мощи в «сильнейшие» не попадают (иначе в карточке «nan»)
+        rows = np.flatnonzero(has)
+        order = rows[np.argsort(-known, kind="stable")[:top]]
+        best = list(zip(r.names[order].tolist(), power[order].tolist()))
+    troops = {c: totals[c] for c in TROOP_COLS if c in totals}
+    all_troops = sum(troops.values())
+    mix = {c: v / all_troops for c, v in troops.items()} if all_troops > 0 else {}
+    return Summary(len(r), totals, mean, median, shares, mix, best, unknown)
+
+
+# =========================
+# Rally rosters
+# =========================
+@dataclass
+class Rally:
+    leader: str
+    capacity: float                         # inf — ёмкость сбора не указана
+    troops: float                           # лидер + принятые войска участников
+    joiners: List[Tuple[str, float]]        # (игрок, сколько войск принято)
+
+
+def rallies(r: Roster, n: int, max_joiners: Optional[int] = None) -> Tuple[List[Rally], int]:
+    """
+    n rallies: leaders are the members with the largest rally capacity (or
+    power), joiners are drafted strongest-march-first in snake order so the
+    rallies come out even, then each rally is cut at its capacity. Returns
+    (rallies, members left in reserve).
+    """
+    march = r.col("march")
+    if march is None:
+        raise ValueError("march")
+    cap = r.col("rally")
+    power = r.col("power")
+    # лидеры — по ёмкости сбора, при равной ёмкости — по мощи
+    keys = [a for a in (power, cap) if a is not None] or [march]
+    n = max(0, min(n, len(r)))
+    leaders = np.lexsort([-np.nan_to_num(a, nan=-np.inf) for a in keys])[:n]
+    if not n:
+        return [], 0
+    m = _nz(march)
+    capacity = np.full(n, np.inf) if cap is None else np.nan_to_num(cap[leaders], nan=np.inf)
+    need = np.maximum(capacity - m[leaders], 0.0)
+
+    is_leader = np.zeros(len(r), dtype=bool)
+    is_leader[leaders] = True
+    pool = np.flatnonzero(~is_leader & (m > 0))
+    pool = pool[np.argsort(-m[pool], kind="stable")]
+    # змейка: 0,1,…,n-1, n-1,…,1,0, 0,1,…
+    j = np.arange(len(pool))
+    rnd, pos = np.divmod(j, n)
+    rally_of = np.where(rnd % 2 == 0, pos, n - 1 - pos)
+    # внутри каждого сбора — по убыванию марша; накопленная сумма до участника
+    order = np.lexsort((j, rally_of))
+    rs, who = rally_of[order], pool[order]
+    sent = m[who]
+    starts = np.r_[0, np.flatnonzero(np.diff(rs)) + 1] if len(rs) else np.zeros(0, dtype=np.int64)
+    sizes = np.diff(np.r_[starts, len(rs)])
+    before = np.cumsum(sent) - sent
+    before -= np.repeat(before[starts], sizes)
+    rank = np.arange(len(rs)) - np.repeat(starts, sizes)
+    ok = before < need[rs]
+    if max_joiners is not None:
+        ok &= rank < max_joiners
+    taken = np.where(ok, np.minimum(sent, need[rs] - before), 0.0)
+    troops = m[leaders] + np.bincount(rs, weights=taken, minlength=n)
+
+    names = r.names
+    out = []
+    for k in range(n):
+        sel = (rs == k) & ok
+        out.append(Rally(
+            str(names[leaders[k]]), float(capacity[k]), float(troops[k]),
+            list(zip(names[who[sel]].tolist(), taken[sel].tolist())),
+        ))
+    return out, int((~ok).sum())
+
+
+# =========================
+# Point projection
+# =========================
+@dataclass
+class Projection:
+    day: int
+    days: int
+    total_now: float
+    total_projected: float
+    idle: int                                  # без очков на сегодня
+    top: List[Tuple[str, float, float]]        # (игрок, сейчас, к концу)
+
+
+def projection(r: Roster, day: int, days: int, top: int = 10) -> Projection:
+    """Each member keeps their average daily pace from day `day` to the end of a `days`-day KvK."""
+    points = r.col("points")
+    if points is None:
+        raise ValueError("points")
+    now = _nz(points)
+    projected = now / max(day, 1) * days
+    order = np.argsort(-projected, kind="stable")[:top]
+    return Projection(
+        day, days, float(now.sum()), float(projected.sum()), int((now <= 0).sum()),
+        list(zip(r.names[order].tolist(), now[order].tolist(), projected[order].tolist())),
+    )
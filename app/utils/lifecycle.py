@@ -0,0 +1,125 @@
+# app/utils/lifecycle.py
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.types import TelegramObject, Update
+
+from app.data.storage import file_lock
+from app.utils import metrics, multibot
+
+log = logging.getLogger(__name__)
+
+# pid родителя app.prefork, если этот процесс — его воркер: /reload перезапускает
+# через него все воркеры разом (иначе свежие данные были бы только у одного)
+prefork_parent: Optional[int] = None
+
+# Остановка без потерь. Polling aiogram сам останавливается по SIGTERM/SIGINT,
+# но уже запущенные хендлеры (handle_as_tasks) он не ждёт, а сессию закрывает сразу.
+# Поэтому: сессию закрываем сами, сначала дождавшись хендлеров (не дольше дедлайна).
+# Offset: Telegram считает апдейт подтверждённым только со следующим getUpdates,
+# так что последняя пачка после рестарта пришла бы ещё раз. Сохраняем offset
+# и подтверждаем его при старте. Как и с напоминаниями — лучше потерять апдейт,
+# чей хендлер пришлось отменить по дедлайну, чем выполнить его дважды.
+# update_id у каждого бота свой, поэтому offset хранится по имени бота (multibot).
+
+
+class UpdateTracker(BaseMiddleware):
+    """
+    Outer middleware on dp.update (register it first): remembers the
+    highest update_id seen per bot and the tasks still handling updates.
+    """
+
+    def __init__(self):
+        self.last_update_ids: Dict[str, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        metrics.gauge("updates.in_flight", lambda: len(self._tasks))
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, Update):
+            return await handler(event, data)
+        bot = multibot.name(data.get("bot"))
+        if event.update_id > self.last_update_ids.get(bot, -1):
+            self.last_update_ids[bot] = event.update_id
+        task = asyncio.current_task()
+        if task is None:
+            return await handler(event, data)
+        self._tasks.add(task)
+        try:
+            return await handler(event, data)
+        finally:
+            self._tasks.discard(task)
+
+    async def drain(self, timeout: float, queued: Iterable[asyncio.Task] = ()) -> int:
+        """
+        Wait for in-flight updates up to `timeout` s, cancel the rest; returns how many were cancelled.
+        `queued`: tasks polling already created but that may not have reached this middleware yet.
+        """
+        # без них такие апдейты выполнились бы уже после сохранения offset и на закрытой сессии
+        tasks = set(self._tasks) | {t for t in queued if not t.done()}
+        if not tasks:
+            return 0
+        log.info("draining %d in-flight update(s), up to %.0fs", len(tasks), timeout)
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for t in pending:
+            t.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            metrics.inc("updates.cancelled_on_shutdown", len(pending))
+            log.warning("%d update(s) cancelled at the drain deadline", len(pending))
+        return len(pending)
+
+    @property
+    def next_offsets(self) -> Dict[str, int]:
+        return {bot: last + 1 for bot, last in self.last_update_ids.items()}
+
+
+# =========================
+# Polling offset
+# =========================
+def load_offsets(path: str | Path) -> Dict[str, int]:
+    """Bot name → next offset; {"offset": N} written before multi-bot support is the main bot's."""
+    try:
+        raw = json.loads(Path(path).read_text(encoding="utf-8"))
+        if "offsets" in raw:
+            return {str(k): int(v) for k, v in raw["offsets"].items()}
+        return {"": int(raw["offset"])}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        log.warning("polling offset file %s unreadable, ignoring", path, exc_info=True)
+        return {}
+
+
+def save_offsets(path: str | Path, offsets: Dict[str, int]) -> None:
+    """Merged into the file: a bot that got no updates this run keeps its old offset."""
+    if not offsets:
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # воркеры prefork пишут один файл, каждый — за свои боты
+    with file_lock(path):
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"offsets": {**load_offsets(path), **offsets}}), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+async def confirm_offset(bot: Bot, offset: Optional[int]) -> None:
+    """Mark every update below `offset` as handled on the Telegram side before polling starts."""
+    if offset is None:
+        return
+    try:
+        await bot.get_updates(offset=offset, limit=1, timeout=0)
+    except Exception:
+        log.warning("could not confirm polling offset %s", offset, exc_info=True)
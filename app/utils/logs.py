@@ -0,0 +1,207 @@
+# app/utils/logs.py
+from __future__ import annotations
+
+import json
+import logging
+import logging.handlers
+import queue
+import time
+import zlib
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.types import TelegramObject, Update
+
+from app.utils import multibot
+from app.utils.tracing import current_trace_id
+
+# Контекст текущего апдейта — попадает в каждую запись лога
+update_id_var: ContextVar[int | None] = ContextVar("update_id", default=None)
+chat_id_var: ContextVar[int | None] = ContextVar("chat_id", default=None)
+handler_var: ContextVar[str | None] = ContextVar("handler", default=None)
+# False → апдейт не попал в выборку; INFO/DEBUG-записи по нему отбрасываются
+sampled_var: ContextVar[bool] = ContextVar("sampled", default=True)
+
+_CONTEXT_FIELDS = ("bot", "update_id", "chat_id", "handler", "trace_id")
+# атрибуты LogRecord, которые не считаем пользовательскими extra-полями
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName", *_CONTEXT_FIELDS}
+
+log = logging.getLogger("app.updates")
+api_log = logging.getLogger("app.api")
+
+
+class ContextFilter(logging.Filter):
+    """
+    Copies update context into the record and applies sampling.
+    Attached to the QueueHandler, i.e. runs on the event loop at emit time,
+    before the record crosses into the listener thread.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not sampled_var.get() and record.levelno < logging.WARNING:
+            return False
+        # update_id и chat_id уникальны только в пределах бота; основной бот — без поля
+        if not getattr(record, "bot", None):
+            record.bot = multibot.current() or None
+        record.update_id = update_id_var.get()
+        record.chat_id = chat_id_var.get()
+        record.handler = handler_var.get()
+        record.trace_id = current_trace_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for k in _CONTEXT_FIELDS:
+            v = getattr(record, k, None)
+            if v is not None:
+                out[k] = v
+        for k, v in record.__dict__.items():
+            if k not in _RESERVED and not k.startswith("_"):
+                out[k] = v
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # не форматируем на event loop — только фиксируем аргументы и исключение
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def setup_logging(
+    level: str = "INFO",
+    json_format: bool = True,
+    file: str | None = None,
+    max_bytes: int = 10 * 1024 * 1024,
+    backups: int = 5,
+) -> logging.handlers.QueueListener:
+    """
+    Root logger → QueueHandler (non-blocking) → QueueListener thread → stream/file.
+    Rotation of the file handler happens in the listener thread too.
+    Call .stop() on the returned listener at shutdown to flush.
+    """
+    fmt: logging.Formatter = (
+        JsonFormatter() if json_format
+        else logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    sinks: list[logging.Handler] = [logging.StreamHandler()]
+    if file:
+        sinks.append(logging.handlers.RotatingFileHandler(
+            file, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True,
+        ))
+    for h in sinks:
+        h.setFormatter(fmt)
+
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    qh = _QueueHandler(q)
+    qh.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(qh)
+    root.setLevel(level.upper())
+
+    listener = logging.handlers.QueueListener(q, *sinks, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def _sample(update_id: int, rate: float) -> bool:
+    """Deterministic per update: every record of one update is kept or dropped together."""
+    if rate >= 1:
+        return True
+    if rate <= 0:
+        return False
+    return (zlib.crc32(str(update_id).encode()) % 10_000) < rate * 10_000
+
+
+class UpdateContextMiddleware(BaseMiddleware):
+    """
+    Outer middleware on dp.update: sets update context, decides sampling
+    (callback queries are high-volume → sampled at callback_sample_rate)
+    and logs one summary record with the handler name and duration.
+    """
+
+    def __init__(self, callback_sample_rate: float = 1.0):
+        self.callback_sample_rate = callback_sample_rate
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, Update):
+            return await handler(event, data)
+        chat = data.get("event_chat")
+        update_id_var.set(event.update_id)
+        chat_id_var.set(chat.id if chat else None)
+        handler_var.set(None)
+        sampled_var.set(
+            event.callback_query is None or _sample(event.update_id, self.callback_sample_rate)
+        )
+        t0 = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            log.info(
+                "update handled",
+                extra={"update_type": event.event_type, "duration_ms": round((time.perf_counter() - t0) * 1000, 2)},
+            )
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    """Inner middleware (message/callback_query): records which handler matched."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        # для callback-кнопок настоящий хендлер — маршрут из cbrouter
+        h = data.get("route") or data.get("handler")
+        cb = getattr(h, "callback", None)
+        if cb is not None:
+            handler_var.set(f"{cb.__module__}.{getattr(cb, '__qualname__', cb)}")
+        return await handler(event, data)
+
+
+class ApiCallLogger(BaseRequestMiddleware):
+    """Bot session middleware: one record per outbound Bot API call, tied to the update."""
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot, method: TelegramMethod):
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            res = await make_request(bot, method)
+            ok = True
+            return res
+        finally:
+            api_log.info(
+                "api call",
+                extra={
+                    "method": type(method).__name__,
+                    "ok": ok,
+                    "duration_ms": round((time.perf_counter() - t0) * 1000, 2),
+                },
+            )
@@ -0,0 +1,292 @@
+# app/utils/media_cache.py
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from aiogram import Bot
+from aiogram.types import FSInputFile, Message
+
+from app.data.storage import file_lock
+from app.utils import metrics, multibot
+from app.utils.singleflight import SingleFlight
+
+log = logging.getLogger(__name__)
+
+# Telegram file_id для локальных картинок: один раз загрузили — дальше шлём по id.
+# Кэш общий для всех пользователей (file_id не привязан к чату), но свой у каждого
+# бота: чужой file_id Telegram не примет. Ключ — (имя бота, путь); вместе с id
+# храним (mtime, size): поменялась картинка → загрузим заново.
+
+Stamp = Tuple[int, int]
+Slot = Tuple[str, str]     # (имя бота из multibot, абсолютный путь)
+
+_ids: Dict[Slot, Tuple[Stamp, str]] = {}
+_dirty = False
+_path: Optional[Path] = None
+
+
+def _stamp(path: str) -> Optional[Stamp]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _key(path: str | Path) -> str:
+    return os.path.abspath(path)
+
+
+def _slot(path: str | Path, bot: Optional[str]) -> Slot:
+    return (multibot.current() if bot is None else bot), _key(path)
+
+
+def lookup(path: str | Path, bot: Optional[str] = None) -> Optional[str]:
+    """file_id of `path` for `bot` (default: the bot handling the current update)."""
+    slot = _slot(path, bot)
+    hit = _ids.get(slot)
+    if hit is not None and hit[0] == _stamp(slot[1]):
+        return hit[1]
+    return None
+
+
+def remember(path: str | Path, message: Message | bool | None, bot: Optional[str] = None) -> None:
+    """Store the file_id of a photo the bot just sent/edited from `path`."""
+    global _dirty
+    if not isinstance(message, Message) or not message.photo:
+        return
+    slot = _slot(path, bot)
+    stamp = _stamp(slot[1])
+    if stamp is None:
+        return
+    _ids[slot] = (stamp, message.photo[-1].file_id)
+    _dirty = True
+
+
+def forget(path: str | Path, bot: Optional[str] = None) -> None:
+    """Drop a file_id Telegram refused (expired / foreign bot)."""
+    global _dirty
+    if _ids.pop(_slot(path, bot), None) is not None:
+        _dirty = True
+
+
+def forget_file(path: str | Path) -> None:
+    """Drop the file_ids of every bot for a file deleted from disk. Safe to call from a worker thread."""
+    global _dirty
+    key = _key(path)
+    # list(dict) — атомарный снимок: читатели на event loop не увидят словарь посреди обхода
+    for slot in [s for s in list(_ids) if s[1] == key]:
+        if _ids.pop(slot, None) is not None:
+            _dirty = True
+
+
+# Первая загрузка файла идёт одна: кто открыл ту же картинку, пока она грузится
+# (или пока её грузит префетчер), ждёт file_id и шлёт уже по нему
+_uploads = SingleFlight("upload")
+
+
+async def send_photo(
+    path: str | Path,
+    send: Callable[[str | FSInputFile], Awaitable[Message | bool]],
+) -> Message | bool:
+    """
+    Send/edit a local photo through `send(photo)`: by file_id when known;
+    otherwise concurrent callers for the same file share one upload.
+    """
+    fid = lookup(path)
+    if fid is not None:
+        metrics.inc("file_id.hit")
+        return await send(fid)
+    metrics.inc("file_id.miss")
+    slot = _slot(path, None)
+    key = slot[1]
+    mine: Dict[str, Message | bool] = {}
+
+    async def upload() -> Optional[str]:
+        mine["led"] = True
+        mine["sent"] = sent = await send(FSInputFile(key))
+        remember(key, sent, slot[0])
+        return lookup(key, slot[0])
+
+    try:
+        fid, _ = await _uploads.do_ex(slot, upload)
+    except Exception:
+        if mine:
+            raise
+        fid = None   # упала чужая загрузка (другой чат, префетч) — это не наша ошибка
+    if mine:
+        return mine["sent"]
+    # дождались чужой загрузки; если у того не вышло — грузим сами
+    return await send(fid if fid is not None else FSInputFile(key))
+
+
+# =========================
+# Persistence
+# =========================
+def _nested(raw) -> Dict[str, dict]:
+    """{бот: {путь: [mtime, size, file_id]}}; записи старого плоского файла — это основной бот."""
+    if not isinstance(raw, dict):
+        return {}
+    out: Dict[str, dict] = {}
+    for k, v in raw.items():
+        if isinstance(v, list):
+            out.setdefault("", {})[k] = v
+        elif isinstance(v, dict):
+            out.setdefault(k, {}).update(v)
+    return out
+
+
+def load(path: str | Path) -> int:
+    global _path
+    _path = Path(path)
+    try:
+        raw = json.loads(_path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return 0
+    except (OSError, ValueError):
+        log.warning("file_id cache %s unreadable, starting empty", _path, exc_info=True)
+        return 0
+    bad = 0
+    for bot, items in _nested(raw).items():
+        for key, entry in items.items():
+            try:
+                mtime, size, fid = entry
+            except (TypeError, ValueError):
+                bad += 1
+                continue
+            _ids[bot, key] = ((mtime, size), fid)
+    if bad:
+        log.warning("file_id cache %s: skipped %d malformed entries", _path, bad)
+    return len(_ids)
+
+
+def _write(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # воркеры prefork делят файл: свои боты переписываем, чужие оставляем как есть
+    with file_lock(path):
+        try:
+            data = {**_nested(json.loads(path.read_text(encoding="utf-8"))), **data}
+        except (OSError, ValueError):
+            pass
+        # файлы, которых уже нет (удалённые контактные листы), — и свои, и чужих ботов
+        data = {bot: {k: v for k, v in items.items() if _stamp(k) is not None} for bot, items in data.items()}
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+async def save() -> None:
+    global _dirty
+    if _path is None or not _dirty:
+        return
+    mine = multibot.names()
+    data: Dict[str, dict] = {}
+    for (bot, k), (s, fid) in list(_ids.items()):
+        if not mine or bot in mine:
+            data.setdefault(bot, {})[k] = [s[0], s[1], fid]
+    _dirty = False
+    await asyncio.to_thread(_write, _path, data)
+
+
+# =========================
+# Prefetch
+# =========================
+class Prefetcher:
+    """
+    Uploads images the user is likely to open next (neighbours in a list)
+    to a private cache chat, so that navigation becomes an edit by file_id.
+    At most `concurrency` uploads run at once; a path is uploaded once even
+    if many users ask for it at the same time.
+    """
+
+    def __init__(self, bot: Bot, chat_id: int, concurrency: int = 2):
+        self.bot = bot
+        self.name = multibot.name(bot)
+        self.chat_id = chat_id
+        self._loop = asyncio.get_running_loop()
+        self._sem = asyncio.Semaphore(concurrency)
+        self._inflight: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def schedule(self, paths: Iterable[str | Path]) -> None:
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if not on_loop:
+            # из потока (прогрев популярного в to_thread) — передаём в свой event loop
+            self._loop.call_soon_threadsafe(self.schedule, list(paths))
+            return
+        for p in paths:
+            key = _key(p)
+            slot = (self.name, key)
+            if key in self._inflight or _uploads.inflight(slot) or lookup(key, self.name) is not None or _stamp(key) is None:
+                continue
+            self._inflight.add(key)
+            task = asyncio.create_task(self._upload(key), name=f"prefetch:{Path(key).name}")
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, key: str) -> Optional[str]:
+        msg = await self.bot.send_photo(self.chat_id, FSInputFile(key), disable_notification=True)
+        remember(key, msg, self.name)
+        metrics.inc("prefetch.uploaded")
+        try:
+            await self.bot.delete_message(self.chat_id, msg.message_id)
+        except Exception:
+            pass   # file_id остаётся валидным и без сообщения
+        return lookup(key, self.name)
+
+    async def _upload(self, key: str) -> None:
+        try:
+            async with self._sem:
+                if lookup(key, self.name) is not None:   # пока ждали, карточку уже открыли
+                    return
+                # та же очередь, что у send_photo: пользователь, открывший картинку
+                # во время префетча, дождётся этого file_id вместо второй загрузки
+                await _uploads.do((self.name, key), lambda: self._send(key))
+        except Exception:
+            metrics.inc("prefetch.failed")
+            log.warning("prefetch of %s failed", key, exc_info=True)
+        finally:
+            self._inflight.discard(key)
+
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    def cancel(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+
+
+# по префетчеру на бота: у каждого свой чат-кэш и свои file_id
+_prefetchers: Dict[str, Prefetcher] = {}
+
+
+def start(bot: Bot, chat_id: int | None, concurrency: int = 2) -> None:
+    """Enable prefetching for `bot`; without a cache chat only file_ids of real sends are reused."""
+    if chat_id is None:
+        return
+    p = Prefetcher(bot, chat_id, concurrency)
+    _prefetchers[p.name] = p
+
+
+def prefetch(paths: Iterable[str | Path]) -> None:
+    """Prefetch for the bot handling the current update."""
+    p = _prefetchers.get(multibot.current())
+    if p is not None:
+        p.schedule(paths)
+
+
+def stop() -> None:
+    for p in _prefetchers.values():
+        p.cancel()
+
+
+metrics.gauge("file_id.size", lambda: len(_ids))
+metrics.gauge("prefetch.inflight", lambda: sum(p.inflight() for p in _prefetchers.values()))
@@ -0,0 +1,46 @@
+# app/utils/metrics.py
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Callable, Dict
+
+# Простейший реестр метрик процесса: счётчики + гейджи (значение или функция).
+# Читается админ-командой /metrics; внешних зависимостей нет.
+
+_counters: Dict[str, float] = defaultdict(float)
+_gauges: Dict[str, Callable[[], float]] = {}
+
+
+def inc(name: str, n: float = 1) -> None:
+    _counters[name] += n
+
+
+def get(name: str) -> float:
+    return _counters.get(name, 0.0)
+
+
+def gauge(name: str, fn: Callable[[], float]) -> None:
+    """Register a gauge evaluated lazily at snapshot time."""
+    _gauges[name] = fn
+
+
+def ratio(hits: str, misses: str) -> float:
+    h, m = get(hits), get(misses)
+    return h / (h + m) if h + m else 0.0
+
+
+def snapshot() -> Dict[str, float]:
+    out: Dict[str, float] = dict(_counters)
+    for name, fn in _gauges.items():
+        try:
+            out[name] = float(fn())
+        except Exception:
+            out[name] = float("nan")
+    return dict(sorted(out.items()))
+
+
+def render(prefix: str = "") -> str:
+    rows = [(k, v) for k, v in snapshot().items() if k.startswith(prefix)]
+    if not rows:
+        return "No metrics yet."
+    return "\n".join(f"{k} = {v:g}" for k, v in rows)
@@ -0,0 +1,204 @@
+# app/utils/mount_combos.py
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, get_args
+
+import numpy as np
+
+from app.utils import metrics
+from app.utils import mount_skills as S
+
+log = logging.getLogger(__name__)
+
+# Лучшие пары «умение слота 1 + умение слота 2» для каждого типа коней.
+# Оценка пары = вес типа каждого умения + веса эффектов, покрытых парой (эффект,
+# который есть у обоих, считается один раз) + бонусы за сочетания эффектов
+# + штраф за два умения одного типа. Все n1×n2 пар считаются матрицами сразу.
+# Рейтинги строятся при загрузке (прогрев клавиатур) и после /reload — заново
+# только для тех типов, чей файл или файл весов изменился; запрос лишь читает готовое.
+
+WEIGHTS_FILE = "combo_weights.json"   # рядом с данными: data/mount_skills/combo_weights.json
+MOUNT_TYPES: Tuple[str, ...] = get_args(S.MountType)
+
+# data/mount_skills/combo_weights.json в том же виде; отсутствующие разделы берутся отсюда
+DEFAULT_WEIGHTS: Dict = {
+    "types": {"attack": 3.0, "defense": 2.0, "support": 1.5, "control": 2.0},
+    "tags": {"damage": 2.0, "control": 2.0, "heal": 1.5, "shield": 1.5, "buff": 1.0, "debuff": 1.0, "speed": 0.5},
+    # эффект → слова в описании, по которым он узнаётся, если у умения нет явных "tags"
+    "keywords": {
+        "damage": ["damage", "урон"],
+        "control": ["stun", "silence", "disarm", "оглуш", "немот"],
+        "heal": ["heal", "restore", "лечит", "восстанав"],
+        "shield": ["shield", "щит"],
+        "buff": ["increase", "повыша", "увелич"],
+        "debuff": ["reduce", "decrease", "снижа", "уменьша"],
+        "speed": ["speed", "скорост"],
+    },
+    "pairs": {"damage+control": 1.0, "heal+shield": -0.5, "damage+buff": 0.5},
+    "same_type": -0.5,
+    "top": 10,
+}
+
+
+@dataclass(frozen=True)
+class Weights:
+    types: Dict[str, float]
+    tags: Dict[str, float]
+    keywords: Dict[str, Tuple[str, ...]]
+    pairs: Dict[Tuple[str, str], float]
+    same_type: float
+    top: int
+
+
+def _weights_from(raw: Dict) -> Weights:
+    w = {**DEFAULT_WEIGHTS, **raw}
+    pairs = {}
+    for k, v in w["pairs"].items():
+        a, _, b = str(k).lower().partition("+")
+        if a and b:
+            pairs[(a, b)] = float(v)
+    return Weights(
+        types={str(k).lower(): float(v) for k, v in w["types"].items()},
+        tags={str(k).lower(): float(v) for k, v in w["tags"].items()},
+        keywords={str(k).lower(): tuple(str(x).lower() for x in v) for k, v in w["keywords"].items()},
+        pairs=pairs,
+        same_type=float(w["same_type"]),
+        top=max(1, int(w["top"])),
+    )
+
+
+@dataclass(frozen=True)
+class Combo:
+    slot1: int                 # индексы в S.get_list(t, 1) / S.get_list(t, 2)
+    slot2: int
+    score: float
+    tags: Tuple[str, ...]      # эффекты, покрытые парой
+
+
+@dataclass
+class Ranking:
+    stamp: tuple               # (файл типа, файл весов) — по нему решаем, пересчитывать ли
+    combos: List[Combo]
+    pairs: int                 # сколько пар оценено
+
+
+_rankings: Dict[str, Ranking] = {}
+_weights: Optional[Tuple[tuple, Weights]] = None
+_lock = threading.Lock()
+
+
+def _stat(path) -> tuple:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return ()
+    return st.st_mtime_ns, st.st_size
+
+
+def _load_weights() -> Tuple[tuple, Weights]:
+    """Weights with the stamp of their file; re-read only when the file changed."""
+    global _weights
+    path = S.DATA_DIR / WEIGHTS_FILE
+    stamp = _stat(path)
+    if _weights is not None and _weights[0] == stamp:
+        return _weights
+    raw: Dict = {}
+    if stamp:
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+        except ValueError:
+            log.warning("bad %s, using default combo weights", path, exc_info=True)
+    _weights = (stamp, _weights_from(raw if isinstance(raw, dict) else {}))
+    return _weights
+
+
+def skill_tags(skill: S.Skill, w: Weights) -> Tuple[str, ...]:
+    """Explicit tags from the data file, or effects recognised by keywords in the description."""
+    if skill.tags:
+        return tuple(skill.tags)
+    text = f"{skill.name} {skill.description}".lower()
+    return tuple(tag for tag, words in w.keywords.items() if any(x in text for x in words))
+
+
+def rank(ms: S.MountSkills, w: Weights) -> List[Combo]:
+    """Top w.top pairs of one mount type, best first."""
+    a, b = ms.slot1, ms.slot2
+    if not a or not b:
+        return []
+    tags1 = [skill_tags(s, w) for s in a]
+    tags2 = [skill_tags(s, w) for s in b]
+    vocab = sorted(set(w.tags) | {t for p in w.pairs for t in p} | {t for ts in tags1 + tags2 for t in ts})
+    col = {t: i for i, t in enumerate(vocab)}
+
+    def onehot(rows: List[Tuple[str, ...]]) -> np.ndarray:
+        m = np.zeros((len(rows), len(vocab)), dtype=bool)
+        for i, ts in enumerate(rows):
+            m[i, [col[t] for t in ts]] = True
+        return m
+
+    tag_w = np.array([w.tags.get(t, 0.0) for t in vocab])
+    pair_w = np.zeros((len(vocab), len(vocab)))
+    for (x, y), v in w.pairs.items():
+        pair_w[col[x], col[y]] = pair_w[col[y], col[x]] = v / 2 if x != y else v
+    # покрытие эффектов парой: n1 × n2 × K
+    cover = (onehot(tags1)[:, None, :] | onehot(tags2)[None, :, :]).astype(np.float64)
+    type1 = np.array([s.type.lower() for s in a])
+    type2 = np.array([s.type.lower() for s in b])
+    score = (
+        np.array([w.types.get(t, 0.0) for t in type1])[:, None]
+        + np.array([w.types.get(t, 0.0) for t in type2])[None, :]
+        + cover @ tag_w
+        + np.einsum("ijk,kl,ijl->ij", cover, pair_w, cover)
+        + w.same_type * (type1[:, None] == type2[None, :])
+    )
+    flat = score.ravel()
+    best = np.argsort(-flat, kind="stable")[:w.top]
+    return [
+        Combo(int(i), int(j), float(flat[k]), tuple(t for t, on in zip(vocab, cover[i, j]) if on))
+        for k in best for i, j in [divmod(int(k), len(b))]
+    ]
+
+
+def refresh(types: Iterable[str] = MOUNT_TYPES) -> List[str]:
+    """Recompute rankings whose data file or weights changed since the last run → refreshed types."""
+    done = []
+    with _lock:
+        wstamp, w = _load_weights()
+        for t in types:
+            stamp = (_stat(S.data_file(t)), wstamp)
+            old = _rankings.get(t)
+            if old is not None and old.stamp == stamp:
+                continue
+            try:
+                ms = S.load_mount(t)
+            except FileNotFoundError:
+                ms = S.MountSkills(t, [], [])
+            _rankings[t] = Ranking(stamp, rank(ms, w), len(ms.slot1) * len(ms.slot2))
+            done.append(t)
+    if done:
+        metrics.inc("mount_combos.refreshed", len(done))
+        log.info("mount combos ranked for %s", ", ".join(done))
+    return done
+
+
+def best(t: str) -> Ranking:
+    """Precomputed ranking; computed on the spot only if nothing has warmed it yet."""
+    r = _rankings.get(t)
+    if r is None:
+        refresh((t,))
+        r = _rankings[t]
+    return r
+
+
+def state():
+    """Rankings for the warm-start snapshot (see utils/snapshot.py)."""
+    return dict(_rankings)
+
+
+def restore(state) -> None:
+    _rankings.update(state)
@@ -1,12 +1,12 @@
 # app/utils/mount_skills.py
 from __future__ import annotations
 
-import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import lru_cache
 from pathlib import Path
 from typing import List, Optional, Literal, Dict
 
+from app.data.storage import iter_json_records
 
 ROOT_DIR = Path(__file__).resolve().parents[1]   # .../app
 DATA_DIR = ROOT_DIR.parent / "data" / "mount_skills"
@@ -14,6 +14,15 @@ ASSETS_DIR = ROOT_DIR.parent / "assets" / "mount_skills"
 
 MountType = Literal["spears", "infantry", "archers"]
 
+FILE_MAP: Dict[str, str] = {
+    "spears": "spears.json",
+    "infantry": "infantry.json",
+    "archers": "archers.json",
+}
+
+def data_file(mount_type: MountType) -> Path:
+    return DATA_DIR / FILE_MAP[mount_type]
+
 @dataclass
 class Skill:
     id: str
@@ -21,6 +30,7 @@ class Skill:
     type: str
     description: str
     image: str  # relative path, e.g. "spears/ragebeast_soul.png"
+    tags: List[str] = field(default_factory=list)  # эффекты: "damage", "heal", … (см. mount_combos)
 
 @dataclass
 class MountSkills:
@@ -28,38 +38,47 @@ class MountSkills:
     slot1: List[Skill]
     slot2: List[Skill]
 
-def _load_json(path: Path) -> dict:
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
+def _normalize_one(s: dict) -> Skill:
+    return Skill(
+        id=s["id"],
+        name=s["name"],
+        type=s["type"],
+        description=s["description"],
+        image=s["image"],
+        tags=[str(x).lower() for x in s.get("tags") or []],
+    )
 
 def _normalize(raw_list: List[dict]) -> List[Skill]:
-    return [
-        Skill(
-            id=s["id"],
-            name=s["name"],
-            type=s["type"],
-            description=s["description"],
-            image=s["image"],
-        )
-        for s in raw_list
-    ]
+    return [_normalize_one(s) for s in raw_list]
 
 @lru_cache(maxsize=3)
 def load_mount(mount_type: MountType) -> MountSkills:
     """Загрузка одного типа коней (spears/infantry/archers) из JSON."""
-    file_map: Dict[MountType, str] = {
-        "spears": "spears.json",
-        "infantry": "infantry.json",
-        "archers": "archers.json",
-    }
-    raw = _load_json(DATA_DIR / file_map[mount_type])
-    mt = raw.get("mount_type") or mount_type
+    mt: str = mount_type
+    slots: Dict[str, List[Skill]] = {"slot1": [], "slot2": []}
+    # читаем потоково: каждое умение превращается в Skill сразу после разбора
+    for key, val in iter_json_records(data_file(mount_type), keys=("mount_type", "slot1", "slot2")):
+        if key == "mount_type":
+            mt = val or mount_type
+        elif key in slots and isinstance(val, dict):
+            slots[key].append(_normalize_one(val))
     return MountSkills(
         mount_type=mt,
-        slot1=_normalize(raw.get("slot1", [])),
-        slot2=_normalize(raw.get("slot2", [])),
+        slot1=slots["slot1"],
+        slot2=slots["slot2"],
     )
 
+_version = 0
+
+def version() -> int:
+    return _version
+
+def reload() -> None:
+    """Перечитать JSON при следующем обращении."""
+    global _version
+    load_mount.cache_clear()
+    _version += 1
+
 def get_list(mount_type: MountType, slot: int) -> List[Skill]:
     ms = load_mount(mount_type)
     return ms.slot1 if slot == 1 else ms.slot2
@@ -0,0 +1,93 @@
+# app/utils/multibot.py
+from __future__ import annotations
+
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.types import TelegramObject, Update
+
+from app.config import BotProfile
+from app.utils import metrics
+
+# Несколько ботов (королевств) в одном процессе и одном event loop. Каталоги,
+# индексы поиска, кэши карточек и клавиатур — модульные, поэтому общие для всех
+# ботов сами собой; на каждого бота приходится только объект Bot (HTTP-сессия
+# тоже общая), задача polling, префетчер картинок и планировщик напоминаний.
+# Своё у каждого бота — только то, что Telegram привязывает к боту: update_id,
+# file_id и чаты, подписавшиеся через него. Всё это ключуется именем профиля.
+
+_profiles: Dict[int, BotProfile] = {}
+# имя бота, обрабатывающего текущий апдейт ("" — основной, BOT_TOKEN)
+_current: ContextVar[str] = ContextVar("bot", default="")
+
+
+def register(bot: Bot, profile: BotProfile) -> None:
+    _profiles[bot.id] = profile
+
+
+def profile(bot: Bot) -> Optional[BotProfile]:
+    return _profiles.get(bot.id)
+
+
+def name(bot: Bot | None) -> str:
+    p = _profiles.get(bot.id) if bot is not None else None
+    return p.name if p is not None else ""
+
+
+def current() -> str:
+    return _current.get()
+
+
+def count() -> int:
+    return len(_profiles)
+
+
+def names() -> Set[str]:
+    """Bots served by this process (a pre-fork worker serves only its share)."""
+    return {p.name for p in _profiles.values()}
+
+
+def _command(event: Update) -> Optional[str]:
+    m = event.message
+    if m is None:
+        return None
+    text = m.text or m.caption or ""
+    if not text.startswith("/"):
+        return None
+    return text[1:].split(maxsplit=1)[0].split("@", 1)[0].lower() if len(text) > 1 else None
+
+
+class BotContext(BaseMiddleware):
+    """
+    Outer middleware on dp.update: marks which bot the update came through
+    (for file_ids and subscriptions deeper down) and drops commands in
+    `gated` that this bot's profile does not offer.
+    """
+
+    def __init__(self, gated: Iterable[str]):
+        self.gated = frozenset(gated)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        p = profile(data["bot"]) if "bot" in data else None
+        if p is None:
+            return await handler(event, data)
+        if p.commands is not None and isinstance(event, Update):
+            cmd = _command(event)
+            if cmd in self.gated and cmd not in p.commands:
+                metrics.inc("updates.command_disabled")
+                return None
+        token = _current.set(p.name)
+        data["profile"] = p
+        try:
+            return await handler(event, data)
+        finally:
+            _current.reset(token)
+
+
+metrics.gauge("bots.count", count)
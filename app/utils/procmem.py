@@ -0,0 +1,59 @@
+# app/utils/procmem.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.utils import metrics
+
+# Память процесса по /proc/<pid>/smaps_rollup (Linux): сколько страниц у процесса
+# свои (unique — освободятся с ним), а сколько общих с родителем/соседями
+# (copy-on-write после fork). PSS — доля процесса в общих страницах; сумма PSS
+# по воркерам и есть их настоящий расход памяти.
+
+
+@dataclass(frozen=True)
+class Usage:
+    rss: int       # kB
+    pss: int
+    shared: int    # Shared_Clean + Shared_Dirty
+    unique: int    # Private_Clean + Private_Dirty
+
+
+def _rollup(pid: int | str) -> Optional[Dict[str, int]]:
+    try:
+        text = Path(f"/proc/{pid}/smaps_rollup").read_text()
+    except OSError:
+        return None
+    out: Dict[str, int] = {}
+    for line in text.splitlines():
+        key, _, rest = line.partition(":")
+        parts = rest.split()
+        if len(parts) == 2 and parts[1] == "kB":
+            out[key] = int(parts[0])
+    return out
+
+
+def usage(pid: int | str = "self") -> Optional[Usage]:
+    """None where smaps_rollup is unavailable (not Linux, or the process is gone)."""
+    r = _rollup(pid)
+    if r is None:
+        return None
+    return Usage(
+        rss=r.get("Rss", 0),
+        pss=r.get("Pss", 0),
+        shared=r.get("Shared_Clean", 0) + r.get("Shared_Dirty", 0),
+        unique=r.get("Private_Clean", 0) + r.get("Private_Dirty", 0),
+    )
+
+
+def _field(name: str):
+    def read() -> float:
+        u = usage()
+        return getattr(u, name) if u is not None else 0
+    return read
+
+
+for _name in ("rss", "pss", "shared", "unique"):
+    metrics.gauge(f"process.{_name}_kb", _field(_name))
@@ -0,0 +1,167 @@
+# app/utils/profiling.py
+from __future__ import annotations
+
+import asyncio
+import linecache
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional
+
+# Всё здесь включается только по команде админа: пока профилировщик выключен,
+# нет ни потока-сэмплера, ни трассировки аллокаций — накладные расходы нулевые.
+
+PROFILE_DIR = Path("profiles")
+
+
+def _out(name: str) -> Path:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    return PROFILE_DIR / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}"
+
+
+def _frame_label(f) -> str:
+    # без номера строки: иначе одна функция дробится на много узлов флеймграфа
+    mod = f.f_globals.get("__name__", "?")
+    return f"{mod}:{f.f_code.co_name}"
+
+
+# =========================
+# CPU: sampling profiler
+# =========================
+class StackSampler:
+    """
+    Samples the stack of one thread (the event loop) from a side thread.
+    Output is collapsed-stack format ("a;b;c count"), ready for
+    flamegraph.pl / speedscope / inferno.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def write_collapsed(self, path: Path) -> Path:
+        with path.open("w", encoding="utf-8") as f:
+            for stack, n in self.counts.most_common():
+                f.write(f"{stack} {n}\n")
+        return path
+
+
+_cpu_lock = asyncio.Lock()
+
+
+async def profile_cpu(seconds: float, interval: float = 0.005) -> tuple[Path, int]:
+    """Sample the running loop for `seconds`; returns (.folded file, sample count)."""
+    if _cpu_lock.locked():
+        raise RuntimeError("CPU profiler is already running")
+    async with _cpu_lock:
+        sampler = StackSampler(threading.get_ident(), interval)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+        path = await asyncio.to_thread(sampler.write_collapsed, _out("cpu").with_suffix(".folded"))
+        return path, sampler.samples
+
+
+# =========================
+# Memory: tracemalloc snapshots
+# =========================
+_mem_prev: Optional[tracemalloc.Snapshot] = None
+
+_MEM_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def mem_start(frames: int = 25) -> None:
+    global _mem_prev
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    _mem_prev = tracemalloc.take_snapshot().filter_traces(_MEM_FILTERS)
+
+
+def mem_stop() -> None:
+    global _mem_prev
+    _mem_prev = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def mem_diff(top: int = 30) -> Path:
+    """Snapshot, diff against the previous one (by line), write a report; the new snapshot becomes the baseline."""
+    global _mem_prev
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is off — run /profile mem start first")
+    snap = tracemalloc.take_snapshot().filter_traces(_MEM_FILTERS)
+    current, peak = tracemalloc.get_traced_memory()
+    lines = [f"traced: current={current / 1e6:.1f} MB peak={peak / 1e6:.1f} MB", ""]
+    if _mem_prev is not None:
+        lines.append(f"Top {top} growth since previous snapshot:")
+        for st in snap.compare_to(_mem_prev, "lineno")[:top]:
+            lines.append(str(st))
+            fr = st.traceback[0]
+            src = linecache.getline(fr.filename, fr.lineno).strip()
+            if src:
+                lines.append(f"    {src}")
+        lines.append("")
+    lines.append(f"Top {top} allocations:")
+    for st in snap.statistics("traceback")[:top]:
+        lines.append(f"{st.size / 1024:.1f} KiB in {st.count} blocks")
+        lines.extend(f"    {ln}" for ln in st.traceback.format(limit=8))
+    _mem_prev = snap
+    path = _out("mem").with_suffix(".txt")
+    path.write_text("\n".join(lines), encoding="utf-8")
+    return path
+
+
+# =========================
+# Tasks: per-coroutine stacks
+# =========================
+def dump_tasks() -> Path:
+    """Every asyncio task with its coroutine stack (where it is awaiting right now)."""
+    lines: List[str] = []
+    tasks = sorted(asyncio.all_tasks(), key=lambda t: t.get_name())
+    lines.append(f"{len(tasks)} tasks")
+    for t in tasks:
+        coro = t.get_coro()
+        lines.append("")
+        lines.append(f"== {t.get_name()} ({getattr(coro, '__qualname__', coro)}) done={t.done()}")
+        for f in t.get_stack():
+            lines.append(f"    {f.f_code.co_filename}:{f.f_lineno} in {f.f_code.co_name}")
+            src = linecache.getline(f.f_code.co_filename, f.f_lineno).strip()
+            if src:
+                lines.append(f"        {src}")
+    path = _out("tasks").with_suffix(".txt")
+    path.write_text("\n".join(lines), encoding="utf-8")
+    return path
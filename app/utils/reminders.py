@@ -0,0 +1,197 @@
+# app/utils/reminders.py
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Set, Tuple
+
+from aiogram import Bot
+
+from app.data import events_repo, schedule
+from app.data import subscriptions_repo as subs
+from app.utils import multibot
+from app.utils.broadcast import Broadcaster
+from app.utils.i18n import DEFAULT_LOCALE
+from app.utils.render import reminder_text
+
+log = logging.getLogger(__name__)
+
+# Как далеко вперёд планируем напоминания; дальше — перестроим кучу позже
+PLAN_AHEAD = timedelta(days=2)
+# Напоминание, опоздавшее сильнее (бот был выключен), уже не шлём
+MAX_LATE = timedelta(minutes=30)
+# Журнал доставок храним с запасом на самые длинные окна
+DELIVERY_TTL_S = 14 * 24 * 3600
+# Чаты, куда отправка сорвалась временно, пробуем ещё раз с паузой — пока не вышел MAX_LATE
+RETRY_DELAYS_S = (30, 120, 600)
+
+
+def occurrence_key(occ: schedule.Occurrence) -> str:
+    return f"{occ.event_id}@{occ.start.isoformat()}"
+
+
+class ReminderScheduler:
+    """
+    Heap of (fire_at, occurrence_key, occurrence) for occurrences starting within PLAN_AHEAD.
+    One sleeping task waits for the earliest item and starts its fan-out as a
+    separate task, so a large fan-out does not hold back the next reminder;
+    `wake()` forces a replan (new subscription, catalog reload). Delivery state
+    lives in SQLite, so a restart replans the same heap and skips chats already notified.
+    One scheduler per bot: it serves the chats that subscribed through that bot.
+    """
+
+    def __init__(self, bot: Bot, lead: timedelta, rate: float, concurrency: int, batch: int):
+        self.bot = bot
+        self.name = multibot.name(bot)
+        self.lead = lead
+        self.batch = batch
+        self.sender = Broadcaster(bot, rate=rate, concurrency=concurrency)
+        self._heap: List[Tuple[datetime, str, schedule.Occurrence]] = []
+        self._planned: Set[str] = set()
+        # уже отработанные в этом процессе (ключ → начало события); после рестарта защищает журнал доставок
+        self._fired: Dict[str, datetime] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._wake = asyncio.Event()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    async def _plan(self, now: datetime) -> None:
+        wanted = set(await asyncio.to_thread(subs.subscribed_events, self.name))
+        self._heap.clear()
+        self._planned.clear()
+        # начавшиеся события в план уже не попадут — помнить их незачем
+        for key in [k for k, start in self._fired.items() if start <= now]:
+            del self._fired[key]
+        if not wanted:
+            return
+        idx = schedule.get_index(now)
+        # всё, что ещё не началось; fire_at в прошлом (рестарт внутри lead) тоже попадёт
+        for occ in idx.upcoming(now, limit=len(idx.starts)):
+            if occ.start - self.lead > now + PLAN_AHEAD:
+                break
+            if occ.event_id not in wanted:
+                continue
+            key = occurrence_key(occ)
+            if key not in self._planned and key not in self._fired:
+                self._planned.add(key)
+                heapq.heappush(self._heap, (occ.start - self.lead, key, occ))
+
+    async def run(self) -> None:
+        try:
+            await self._run()
+        finally:
+            # остановка бота: незаконченные рассылки прерываем; до кого не дошли — разошлёт рестарт по журналу доставок
+            for task in list(self._tasks):
+                task.cancel()
+
+    async def _run(self) -> None:
+        await asyncio.to_thread(subs.prune_deliveries, DELIVERY_TTL_S)
+        while True:
+            now = schedule.now_utc()
+            await self._plan(now)
+            replan_at = now + PLAN_AHEAD / 2
+            while True:
+                now = schedule.now_utc()
+                while self._heap and self._heap[0][0] <= now:
+                    fire_at, key, occ = heapq.heappop(self._heap)
+                    self._fired[key] = occ.start
+                    if now - fire_at <= MAX_LATE:
+                        task = asyncio.create_task(self._fire(key, occ, fire_at), name=f"remind:{key}")
+                        self._tasks.add(task)
+                        task.add_done_callback(self._tasks.discard)
+                wait_until = min(self._heap[0][0] if self._heap else replan_at, replan_at)
+                if now >= replan_at:
+                    break
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=(wait_until - now).total_seconds())
+                    break  # явный wake → перепланировать
+                except asyncio.TimeoutError:
+                    continue
+
+    async def _send(self, key: str, chats: List[int], text: str) -> Tuple[int, List[int]]:
+        """Claim, send, release transient failures → (sent, released chat ids)."""
+        claimed = await asyncio.to_thread(subs.claim, key, chats, self.name)
+        res = await self.sender.send_batch(claimed, text)
+        if res.failed:
+            await asyncio.to_thread(subs.release, key, res.failed, self.name)
+        for cid in res.dead:
+            await asyncio.to_thread(subs.drop_chat, cid, self.name)
+        return len(res.sent), res.failed
+
+    async def _send_page(
+        self, key: str, page: List[Tuple[int, str]], text: Callable[[str], str],
+    ) -> Tuple[int, List[Tuple[int, str]]]:
+        """Send one page of (chat, locale), one batch per locale → (sent, released (chat, locale))."""
+        by_locale: Dict[str, List[int]] = {}
+        for cid, loc in page:
+            by_locale.setdefault(loc, []).append(cid)
+        total, released = 0, []
+        for loc, chats in by_locale.items():
+            sent, failed = await self._send(key, chats, text(loc))
+            total += sent
+            released += [(cid, loc) for cid in failed]
+        return total, released
+
+    async def _fire(self, key: str, occ: schedule.Occurrence, fire_at: datetime) -> None:
+        try:
+            ev = events_repo.get_by_id(occ.event_id)
+            if ev is None:
+                return
+            now = schedule.now_utc()
+            texts: Dict[str, str] = {}
+
+            def text(loc: str) -> str:
+                # на языке того, кто подписал чат; "" — подписки до появления локали
+                if loc not in texts:
+                    local = events_repo.get_by_id(occ.event_id, loc or None) or ev
+                    texts[loc] = reminder_text(local, occ, now, loc or DEFAULT_LOCALE)
+                return texts[loc]
+
+            total = 0
+            retry: List[Tuple[int, str]] = []
+            after: int | None = None
+            while True:
+                page = await asyncio.to_thread(subs.pending_chats, key, occ.event_id, after, self.batch, self.name)
+                if not page:
+                    break
+                after = page[-1][0]
+                sent, failed = await self._send_page(key, page, text)
+                total += sent
+                retry += failed
+            # курсор уже ушёл дальше этих чатов — повторяем их отдельно
+            for delay in RETRY_DELAYS_S:
+                if not retry or schedule.now_utc() + timedelta(seconds=delay) - fire_at > MAX_LATE:
+                    break
+                await asyncio.sleep(delay)
+                failed_again: List[Tuple[int, str]] = []
+                for i in range(0, len(retry), self.batch):
+                    sent, failed = await self._send_page(key, retry[i:i + self.batch], text)
+                    total += sent
+                    failed_again += failed
+                retry = failed_again
+            log.info(
+                "reminders: %s delivered to %d chats, %d failed", key, total, len(retry),
+                extra={"bot": self.name or None},
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("reminders: fan-out of %s failed", key, extra={"bot": self.name or None})
+
+
+_schedulers: List[ReminderScheduler] = []
+
+
+def start(bot: Bot, lead: timedelta, rate: float, concurrency: int, batch: int) -> asyncio.Task:
+    sched = ReminderScheduler(bot, lead, rate, concurrency, batch)
+    _schedulers.append(sched)
+    return asyncio.create_task(sched.run(), name=f"reminders:{sched.name}" if sched.name else "reminders")
+
+
+def wake() -> None:
+    for sched in _schedulers:
+        sched.wake()
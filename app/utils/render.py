@@ -1,9 +1,13 @@
 import html
-from typing import Iterable
+from typing import Any, Callable, Iterable, Tuple
 import textwrap
 import json
+from collections import OrderedDict
 from pathlib import Path
 
+from app.utils.i18n import DEFAULT_LOCALE, t
+from app.utils.tracing import span
+
 def esc(s: str | None) -> str:
     return html.escape(s or "")
 
@@ -44,10 +48,40 @@ def clamp_for_caption(text: str, limit: int = 1000) -> str:
         return text
     return textwrap.shorten(text, width=limit, placeholder="…")
 
+# =========================
+# Per-locale card cache
+# =========================
+CARD_CACHE_SIZE = 2048
+# (kind, key, locale) → (source object, rendered text)
+_card_cache: "OrderedDict[Tuple[str, str, str], Tuple[Any, str]]" = OrderedDict()
+
+def cached_card(kind: str, key: str, obj, render: Callable[..., str], locale: str = DEFAULT_LOCALE) -> str:
+    """
+    Render once per (kind, key, locale). The entry remembers the source
+    object, so a reloaded catalog (new objects) never gets a stale card.
+    """
+    ck = (kind, key, locale)
+    hit = _card_cache.get(ck)
+    if hit is not None and hit[0] is obj:
+        _card_cache.move_to_end(ck)
+        return hit[1]
+    with span(f"render {kind}", key=key, locale=locale):
+        text = render(obj, locale)
+    _card_cache[ck] = (obj, text)
+    if len(_card_cache) > CARD_CACHE_SIZE:
+        _card_cache.popitem(last=False)
+    return text
+
+def card_cache_state() -> list:
+    return list(_card_cache.items())
+
+def restore_card_cache(items: list) -> None:
+    _card_cache.update(items)
+
 # =========================
 # Events
 # =========================
-def event_card(ev) -> str:
+def event_card(ev, locale: str = DEFAULT_LOCALE) -> str:
     """
     Expect normalized Event model:
     name, description, rewards(list[str])|rewards_text, tips(list[str])|tips_text,
@@ -74,43 +108,88 @@ def event_card(ev) -> str:
 
     # Description
     if desc:
-        parts += ["<b>• Description:</b>", desc, ""]
+        parts += [f"<b>• {t('description', locale)}:</b>", desc, ""]
 
     # Rewards
     if rewards_block:
-        parts += ["<b>• Rewards:</b>", rewards_block, ""]
+        parts += [f"<b>• {t('rewards', locale)}:</b>", rewards_block, ""]
 
     # Bonus (only if present)
     if bonus:
-        parts.append(f"✨ <b>Bonus:</b> {bonus}")
+        parts.append(f"✨ <b>{t('bonus', locale)}:</b> {bonus}")
         parts.append("")
 
     # Tips
     if tips_block:
-        parts += ["<b>• Tips:</b>", tips_block, ""]
+        parts += [f"<b>• {t('tips', locale)}:</b>", tips_block, ""]
 
     # Time (only if duration/extra text provided)
     time_lines = []
     if duration:
-        time_lines.append(f"Duration: {duration}")
+        time_lines.append(f"{t('duration', locale)}: {duration}")
     if getattr(ev, "extra_time_text", None):
         time_lines.append(esc(ev.extra_time_text))
     if time_lines:
-        parts += ["<b>• Time:</b>", "\n".join(time_lines)]
+        parts += [f"<b>• {t('time', locale)}:</b>", "\n".join(time_lines)]
 
     return _join_nonempty_lines(parts)
 
-def rules_block(title: str, rules_text: str) -> str:
+def _fmt_delta(seconds: float) -> str:
+    """Compact relative time: 2d 3h / 5h 10m / 7m."""
+    m = max(0, int(seconds // 60))
+    d, m = divmod(m, 24 * 60)
+    h, m = divmod(m, 60)
+    if d:
+        return f"{d}d {h}h"
+    if h:
+        return f"{h}h {m}m"
+    return f"{m}m"
+
+def _fmt_utc(dt) -> str:
+    return dt.strftime("%a %d %b %H:%M UTC")
+
+def events_schedule(rows, now, live: bool, locale: str = DEFAULT_LOCALE) -> str:
+    """
+    rows — list of (Event, Occurrence) from data.schedule.
+    live=True: "ends in …"; live=False: "starts in …".
+    Absolute times are UTC; relative ones are the same in any time zone.
+    """
+    title = t("live_now" if live else "coming_next", locale)
+    if not rows:
+        return f"<b>{esc(title)}</b>\n\n" + t("nothing_live" if live else "nothing_scheduled", locale)
+    lines = [f"<b>{esc(title)}</b>", ""]
+    for ev, occ in rows:
+        if live:
+            when = t("ends_in", locale, d=_fmt_delta((occ.end - now).total_seconds()))
+        else:
+            when = t("starts_in", locale, d=_fmt_delta((occ.start - now).total_seconds())) + f" · {_fmt_utc(occ.start)}"
+        lines.append(f"• <b>{esc(ev.name)}</b> — {when}")
+    return "\n".join(lines)
+
+def reminder_text(ev, occ, now, locale: str = DEFAULT_LOCALE) -> str:
+    """Reminder sent to subscribers shortly before an occurrence starts."""
+    left = _fmt_delta((occ.start - now).total_seconds())
+    return (
+        f"🔔 <b>{esc(ev.name)}</b> {t('starts_in', locale, d=left)}\n"
+        f"{_fmt_utc(occ.start)} → {_fmt_utc(occ.end)}"
+    )
+
+def subscriptions_list(events, locale: str = DEFAULT_LOCALE) -> str:
+    if not events:
+        return t("subs_empty", locale)
+    return f"🔔 <b>{t('subs_title', locale)}</b>\n\n" + "\n".join(f"• {esc(ev.name)}" for ev in events)
+
+def rules_block(title: str, rules_text: str, locale: str = DEFAULT_LOCALE) -> str:
     body = esc(rules_text or "")
     if not body:
         # If there are no rules, show title only
-        return f"<b>{esc(title)} — Rules</b>"
-    return f"<b>{esc(title)} — Rules</b>\n\n{body}"
+        return f"<b>{esc(title)} — {t('rules', locale)}</b>"
+    return f"<b>{esc(title)} — {t('rules', locale)}</b>\n\n{body}"
 
 # =========================
 # Skills
 # =========================
-def skill_card(s) -> str:
+def skill_card(s, locale: str = DEFAULT_LOCALE) -> str:
     """
     s — Skill object from skills_repo
     """
@@ -119,42 +198,42 @@ def skill_card(s) -> str:
     # Type / Season in one line (only what exists)
     type_season = []
     if s.type:
-        type_season.append(f"Type: {esc(s.type)}")
+        type_season.append(f"{t('type', locale)}: {esc(s.type)}")
     if s.season:
-        type_season.append(f"Season: {esc(s.season)}")
+        type_season.append(f"{t('season', locale)}: {esc(s.season)}")
     if type_season:
         parts.append("   ".join(type_season))
         parts.append("")
 
     # Effect
     if s.effect:
-        parts += ["<b>• Effect:</b>", esc(s.effect), ""]
+        parts += [f"<b>• {t('effect', locale)}:</b>", esc(s.effect), ""]
 
     # Probability / Frequency
     if s.probability:
-        parts.append(f"Probability: {esc(s.probability)}")
+        parts.append(f"{t('probability', locale)}: {esc(s.probability)}")
     if s.frequency:
-        parts.append(f"Frequency: {esc(s.frequency)}")
+        parts.append(f"{t('frequency', locale)}: {esc(s.frequency)}")
 
     return _join_nonempty_lines(parts)
 
 # =========================
 # Heroes (styled)
 # =========================
-def hero_header(h) -> str:
+def hero_header(h, locale: str = DEFAULT_LOCALE) -> str:
     """
     Compact header for caption (<= ~1000 chars).
     """
-    lines = [f"<b>Hero:</b> {esc(h.name)}"]
+    lines = [f"<b>{t('hero', locale)}:</b> {esc(h.name)}"]
     if h.season:
-        lines.append(f"<b>Season:</b> {esc(h.season)}")
+        lines.append(f"<b>{t('season', locale)}:</b> {esc(h.season)}")
     if getattr(h, "specialty", None):
         spec = ", ".join(esc(x) for x in h.specialty if x)
         if spec:
-            lines.append(f"<b>Specialty:</b> {spec}")
+            lines.append(f"<b>{t('specialty', locale)}:</b> {spec}")
     return "\n".join(lines)
 
-def _skill_line_numbered(i: int, sk) -> str:
+def _skill_line_numbered(i: int, sk, locale: str = DEFAULT_LOCALE) -> str:
     """
     1. Flame Slash (Active, Rage 1000, Lv.10)
        • Deals ...
@@ -164,11 +243,11 @@ def _skill_line_numbered(i: int, sk) -> str:
     if sk.type:
         badges.append(esc(sk.type))
     if sk.rage is not None:
-        badges.append(f"Rage {sk.rage}")
+        badges.append(f"{t('rage', locale)} {sk.rage}")
     if sk.level is not None:
         badges.append(f"Lv.{sk.level}")
     if sk.probability:
-        badges.append(f"Probability {esc(sk.probability)}")
+        badges.append(f"{t('probability', locale)} {esc(sk.probability)}")
     meta = f" ({', '.join(badges)})" if badges else ""
     head = f"{i}. <b>{esc(sk.name)}</b>{meta}"
 
@@ -176,22 +255,22 @@ def _skill_line_numbered(i: int, sk) -> str:
     if sk.description:
         body = f"• {esc(sk.description)}"
     if getattr(sk, "awakening", None) and (sk.awakening.name or sk.awakening.description):
-        aw_name = esc(sk.awakening.name or "Awakening")
+        aw_name = esc(sk.awakening.name or t("awakening", locale))
         aw_desc = esc(sk.awakening.description or "")
-        line = f"• <i>Awakening — {aw_name}</i>"
+        line = f"• <i>{t('awakening', locale)} — {aw_name}</i>"
         if aw_desc:
             line += f": {aw_desc}"
         body = f"{body}\n{line}" if body else line
     return f"{head}\n{body}" if body else head
 
-def hero_card(h) -> str:
+def hero_card(h, locale: str = DEFAULT_LOCALE) -> str:
     """
     Full hero card:
     - Header with labels
     - 'Talents' as bullets (only if present)
     - 'Skills' as numbered list (only if present)
     """
-    parts: list[str] = [hero_header(h)]
+    parts: list[str] = [hero_header(h, locale)]
 
     # divider (single, not repeated)
     parts += [ "──────────"]
@@ -199,30 +278,190 @@ def hero_card(h) -> str:
     # Talents
     talents_lines: list[str] = []
     if getattr(h, "talents", None):
-        for t in h.talents:
-            if not (t and (t.name or t.description or t.type)):
+        for tl in h.talents:
+            if not (tl and (tl.name or tl.description or tl.type)):
                 continue
-            line = f"• <b>{esc(t.name)}</b>" if t.name else "•"
-            if t.type:
-                line += f" (<i>{esc(t.type)}</i>)"
-            if t.description:
-                line += f": {esc(t.description)}"
+            line = f"• <b>{esc(tl.name)}</b>" if tl.name else "•"
+            if tl.type:
+                line += f" (<i>{esc(tl.type)}</i>)"
+            if tl.description:
+                line += f": {esc(tl.description)}"
             talents_lines.append(line)
     if talents_lines:
-        parts += ["<b>Talents</b>", "\n".join(talents_lines), ""]
+        parts += [f"<b>{t('talents', locale)}</b>", "\n".join(talents_lines), ""]
 
     # Skills
     skill_lines: list[str] = []
     if getattr(h, "skills", None):
         for idx, sk in enumerate(h.skills, start=1):
-            line = _skill_line_numbered(idx, sk)
+            line = _skill_line_numbered(idx, sk, locale)
             if line:
                 skill_lines.append(line)
     if skill_lines: 
-        parts += ["<b>Skills</b>", "\n".join(skill_lines)]
+        parts += [f"<b>{t('skills', locale)}</b>", "\n".join(skill_lines)]
 
     return _join_nonempty_lines(parts)
 
+# =========================
+# Teams
+# =========================
+def team_list(teams, size: int, wanted, complete: bool = True, locale: str = DEFAULT_LOCALE) -> str:
+    """teams — list of team_builder.Team, best first."""
+    head = f"🛡 <b>{t('best_teams', locale)}</b> ({size}" + "".join(f" · {esc(w)}" for w in wanted) + ")"
+    if not teams:
+        return f"{head}\n\n{t('no_teams', locale)}"
+    lines = [head, ""]
+    for i, tm in enumerate(teams, start=1):
+        names = " + ".join(f"<b>{esc(h.name)}</b>" for h in tm.heroes)
+        lines.append(f"{i}. {names} — {tm.score:.1f}")
+        lines.append("   " + " · ".join(f"{k} {v:.1f}" for k, v in tm.parts.items()))
+    if not complete:
+        lines += ["", f"<i>{t('partial_result', locale)}</i>"]
+    return "\n".join(lines)
+
+# =========================
+# Equipment
+# =========================
+EQUIPMENT_PER_SLOT = 15   # длинные списки режем, чтобы сообщение влезло в 4096 символов
+
+def equipment_list(items, locale: str = DEFAULT_LOCALE) -> str:
+    """items — equipment_repo.Equipment in slot order."""
+    by_slot: dict[str, list] = {}
+    for e in items:
+        by_slot.setdefault(e.slot, []).append(e)
+    lines = [f"🛡️ <b>{t('equipment', locale)}</b>"]
+    for slot, group in by_slot.items():
+        lines += ["", f"<b>{esc(slot.capitalize())}</b>"]
+        lines += [f"• {esc(e.name)}" for e in group[:EQUIPMENT_PER_SLOT]]
+        if len(group) > EQUIPMENT_PER_SLOT:
+            lines.append(f"… +{len(group) - EQUIPMENT_PER_SLOT}")
+    return "\n".join(lines)
+
+def equipment_builds(builds, troop: str | None, goal: str, locale: str = DEFAULT_LOCALE) -> str:
+    """builds — list of equipment_opt.Build, best first."""
+    head = f"🛡️ <b>{t('best_builds', locale)}</b> ({esc(troop or t('all_troops', locale))} · {esc(goal)})"
+    if not builds:
+        return f"{head}\n\n{t('no_builds', locale)}"
+    lines = [head]
+    for i, b in enumerate(builds, start=1):
+        lines += ["", f"{i}. <b>{b.score:.1f}</b> — " + " · ".join(f"{k} {v:g}" for k, v in b.stats.items())]
+        lines += [f"   {esc(e.slot.capitalize())}: {esc(e.name)}" for e in b.items]
+        if b.sets:
+            lines.append("   " + ", ".join(f"{esc(name)} ×{n}" for name, n in b.sets))
+    return "\n".join(lines)
+
+# =========================
+# Jewels
+# =========================
+def jewel_card(j, locale: str = DEFAULT_LOCALE, currency: str = "") -> str:
+    """j — jewels_repo.Jewel: levels with stats, recipe and shop price."""
+    cur = f" {esc(currency)}" if currency else ""
+    parts = [f"💎 <b>{esc(j.name)}</b>" + (f" · {esc(j.type)}" if j.type else "")]
+    if j.description:
+        parts += ["", esc(j.description)]
+    rows = []
+    for lv in j.levels:
+        line = f"<b>{t('level', locale)} {lv.level}</b>"
+        if lv.stats:
+            line += ": " + ", ".join(f"{esc(k)} {esc(v)}" for k, v in lv.stats.items())
+        how = []
+        if lv.level > 1:
+            how.append(f"{lv.combine}× {t('level', locale)} {lv.level - 1}" + (f" + {lv.cost:,}{cur}" if lv.cost else ""))
+        if lv.buy is not None:
+            how.append(f"{t('buy', locale)} {lv.buy:,}{cur}")
+        if how:
+            line += f"\n   <i>{' · '.join(how)}</i>"
+        rows.append(line)
+    if rows:
+        parts += ["", "\n".join(rows)]
+    return _join_nonempty_lines(parts)
+
+def jewel_plan(j, plan, stock, locale: str = DEFAULT_LOCALE, currency: str = "") -> str:
+    """plan — jewel_upgrade.Plan; stock — jewels on hand per level (1-based order)."""
+    cur = f" {esc(currency)}" if currency else ""
+    head = f"💎 <b>{t('jewel_plan', locale, name=esc(j.name), level=plan.target)}</b>"
+    if plan.count > 1:
+        head += f" ×{plan.count}"
+    lines = [head]
+    if any(stock):
+        lines.append(f"<i>{t('in_stock', locale)}: " + ", ".join(
+            f"{t('level', locale)} {lv}×{n}" for lv, n in enumerate(stock, start=1) if n) + "</i>")
+    if plan.total is None:
+        return "\n".join(lines + ["", t("unreachable", locale)])
+    lines.append("")
+    for st in plan.steps:
+        acts = []
+        if st.from_stock:
+            acts.append(f"{t('from_stock', locale)} {st.from_stock}")
+        if st.crafted:
+            acts.append(f"{t('craft', locale)} {st.crafted}" + (f" ({st.craft_cost:,}{cur})" if st.craft_cost else ""))
+        if st.bought:
+            acts.append(f"{t('buy', locale)} {st.bought} ({st.buy_cost:,}{cur})")
+        lines.append(f"<b>{t('level', locale)} {st.level}</b>: " + " · ".join(acts))
+    lines += ["", f"<b>{t('total_cost', locale)}</b>: {plan.total:,}{cur}"]
+    return "\n".join(lines)
+
+# =========================
+# KvK
+# =========================
+def big(x: float) -> str:
+    """1234567 → 1.23M; spreadsheet-style short numbers for power and troops."""
+    for div, suf in ((1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if abs(x) >= div:
+            return f"{x / div:.2f}".rstrip("0").rstrip(".") + suf
+    return f"{x:,.0f}"
+
+KVK_TOTALS = ("march", "kills", "points")
+
+def kvk_summary(s, locale: str = DEFAULT_LOCALE) -> str:
+    """s — kvk.Summary."""
+    lines = [f"⚔️ <b>{t('kvk', locale)}</b>", "", f"<b>{t('kvk_members', locale)}</b>: {s.members:,}"]
+    if s.power_mean is not None:
+        lines.append(
+            f"<b>{t('kvk_power', locale)}</b>: {big(s.totals['power'])}"
+            f" ({t('kvk_avg', locale)} {big(s.power_mean)}, {t('kvk_median', locale)} {big(s.power_median)})"
+        )
+        lines += [f"  {t('kvk_top_share', locale, n=n, share=f'{share:.0%}')}" for n, share in s.top_share]
+    if s.power_unknown:
+        lines.append(f"  {t('kvk_power_unknown', locale, n=s.power_unknown)}")
+    if s.troop_mix:
+        lines.append(f"<b>{t('kvk_troops', locale)}</b>: " + " · ".join(
+            f"{esc(c)} {big(s.totals[c])} ({share:.0%})" for c, share in s.troop_mix.items()))
+    lines += [f"<b>{esc(c)}</b>: {big(s.totals[c])}" for c in KVK_TOTALS if c in s.totals]
+    if s.top:
+        lines += ["", f"<b>{t('kvk_strongest', locale)}</b>:"]
+        lines += [f"{i}. {esc(name)} — {big(p)}" for i, (name, p) in enumerate(s.top, start=1)]
+    return "\n".join(lines)
+
+KVK_JOINERS_SHOWN = 8     # полный состав сбора длинный — показываем сильнейших
+
+def kvk_rallies(rallies, reserve: int, locale: str = DEFAULT_LOCALE) -> str:
+    """rallies — kvk.Rally list; reserve — members that did not fit anywhere."""
+    lines = [f"⚔️ <b>{t('kvk_rallies', locale)}</b>"]
+    for i, r in enumerate(rallies, start=1):
+        cap = "" if r.capacity == float("inf") else f" / {big(r.capacity)}"
+        lines += ["", f"<b>{i}. {esc(r.leader)}</b> — {big(r.troops)}{cap} · 👥 {len(r.joiners)}"]
+        shown = r.joiners[:KVK_JOINERS_SHOWN]
+        if shown:
+            more = len(r.joiners) - len(shown)
+            lines.append("   " + ", ".join(f"{esc(n)} {big(v)}" for n, v in shown) + (f" … +{more}" if more else ""))
+    if reserve:
+        lines += ["", t("kvk_reserve", locale, n=reserve)]
+    return "\n".join(lines)
+
+def kvk_projection(p, locale: str = DEFAULT_LOCALE) -> str:
+    """p — kvk.Projection."""
+    lines = [
+        f"📈 <b>{t('kvk_projection', locale, day=p.day, days=p.days)}</b>", "",
+        f"<b>{t('kvk_now', locale)}</b>: {big(p.total_now)}",
+        f"<b>{t('kvk_end', locale)}</b>: {big(p.total_projected)}",
+    ]
+    if p.idle:
+        lines.append(t("kvk_idle", locale, n=p.idle))
+    lines.append("")
+    lines += [f"{i}. {esc(name)} — {big(now)} → {big(end)}" for i, (name, now, end) in enumerate(p.top, start=1)]
+    return "\n".join(lines)
+
 def load_json(file_path: Path):
     """Load JSON data from file, return list or empty list."""
     if not file_path.exists():
@@ -0,0 +1,167 @@
+# app/utils/similar.py
+from __future__ import annotations
+
+import logging
+import re
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.data import heroes_repo, skills_repo
+from app.utils import metrics
+from app.utils.singleflight import ThreadSingleFlight
+from app.utils.tracing import span
+
+log = logging.getLogger(__name__)
+
+# «Похожие» навыки и герои: TF-IDF по текстам описаний, косинусная близость,
+# top-k соседей считается один раз на (вид, локаль, версия данных).
+# Ответ на кнопку — просто чтение готовой таблицы.
+
+TOP_K = 8
+MIN_SCORE = 0.05          # ниже — совпадение на уровне шума, не показываем
+STEM = 7                  # грубый стемминг: обрезаем слова до префикса (en/ru окончания)
+BLOCK = 512               # строк матрицы сходства за раз — память O(BLOCK·n), а не O(n²)
+
+_WORD = re.compile(r"[^\W\d_]{3,}", re.UNICODE)
+_STOP = frozenset(
+    "the and for with from that this when each are has have its into their while will "
+    "для при это его как или что все она они над под после только также".split()
+)
+
+
+def tokens(text: str) -> List[str]:
+    return [w[:STEM] for w in _WORD.findall(text.lower()) if w not in _STOP]
+
+
+class Neighbors:
+    """
+    Precomputed top-k table: slug -> [(slug, score), ...], best first.
+    Built from one text document per item.
+    """
+
+    def __init__(self, slugs: Sequence[str], docs: Sequence[str], k: int = TOP_K):
+        self.table: Dict[str, List[Tuple[str, float]]] = {}
+        n = len(slugs)
+        if n < 2:
+            return
+        # словарь и пары (документ, слово) — разреженная матрица в COO-виде
+        vocab: Dict[str, int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        for i, doc in enumerate(docs):
+            for w in tokens(doc):
+                rows.append(i)
+                cols.append(vocab.setdefault(w, len(vocab)))
+        if not vocab:
+            return
+        r = np.asarray(rows, dtype=np.int32)
+        c = np.asarray(cols, dtype=np.int32)
+
+        # df: в скольких документах встречается слово; слова из одного документа
+        # на близость не влияют, но раздувают норму — выкидываем
+        pairs = np.unique(r.astype(np.int64) * len(vocab) + c)
+        df = np.bincount(pairs % len(vocab), minlength=len(vocab))
+        keep = df > 1
+        if not keep.any():
+            return
+        col = np.cumsum(keep) - 1
+        m = keep[c]
+        idf = (np.log((1 + n) / (1 + df[keep])) + 1.0).astype(np.float32)
+
+        x = np.zeros((n, len(idf)), dtype=np.float32)
+        np.add.at(x, (r[m], col[c[m]]), 1.0)
+        x = np.log1p(x, out=x) * idf                 # сублинейный tf · idf
+        norm = np.linalg.norm(x, axis=1, keepdims=True)
+        x /= np.where(norm > 0, norm, 1.0)
+
+        k = min(k, n - 1)
+        for lo in range(0, n, BLOCK):
+            sim = x[lo:lo + BLOCK] @ x.T
+            sim[np.arange(sim.shape[0]), np.arange(lo, lo + sim.shape[0])] = -1.0
+            top = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+            for bi, idx in enumerate(top):
+                scores = sim[bi, idx]
+                order = np.argsort(-scores, kind="stable")
+                self.table[slugs[lo + bi]] = [
+                    (slugs[j], float(s)) for j, s in zip(idx[order], scores[order]) if s >= MIN_SCORE
+                ]
+
+    def get(self, slug: str) -> List[Tuple[str, float]]:
+        return self.table.get(slug, [])
+
+
+# =========================
+# Documents
+# =========================
+def skill_doc(s: skills_repo.Skill) -> str:
+    return f"{s.type} {s.effect}"
+
+
+def hero_doc(h: heroes_repo.Hero) -> str:
+    parts = list(h.specialty or [])
+    parts += [f"{t.type or ''} {t.description or ''}" for t in (h.talents or [])]
+    for sk in h.skills or []:
+        parts.append(f"{sk.type or ''} {sk.description or ''}")
+        if sk.awakening:
+            parts.append(sk.awakening.description or "")
+    return " ".join(parts)
+
+
+# =========================
+# Tables per (kind, locale, version)
+# =========================
+_KINDS: Dict[str, Tuple[Callable[[str | None], list], Callable, Callable[[], int]]] = {
+    "skill": (skills_repo.list_skills, skill_doc, skills_repo.version),
+    "hero": (heroes_repo.list_heroes, hero_doc, heroes_repo.version),
+}
+_tables: Dict[Tuple[str, str | None], Tuple[int, Neighbors]] = {}
+# warm() строит таблицы в потоке — параллельный запрос из хендлера ждёт ту же сборку
+_builds = ThreadSingleFlight("similar")
+
+
+def _table(kind: str, locale: str | None) -> Neighbors:
+    v = _KINDS[kind][2]()
+    hit = _tables.get((kind, locale))
+    if hit is not None and hit[0] == v:
+        return hit[1]
+    return _builds.do((kind, locale, v), lambda: _build(kind, locale, v))
+
+
+def _build(kind: str, locale: str | None, v: int) -> Neighbors:
+    hit = _tables.get((kind, locale))
+    if hit is not None and hit[0] == v:
+        return hit[1]
+    items, doc, _ = _KINDS[kind]
+    t0 = time.perf_counter()
+    xs = items(locale)
+    with span("similar.build", catalog=kind, locale=locale, items=len(xs)):
+        nb = Neighbors([x.slug for x in xs], [doc(x) for x in xs])
+    _tables[(kind, locale)] = (v, nb)
+    log.info("similar %s[%s]: %d items in %.0f ms", kind, locale, len(xs), (time.perf_counter() - t0) * 1000)
+    return nb
+
+
+def state() -> Dict[Tuple[str, str | None], Tuple[int, Neighbors]]:
+    return dict(_tables)
+
+
+def restore(tables: Dict[Tuple[str, str | None], Tuple[int, Neighbors]]) -> None:
+    _tables.update(tables)
+
+
+def warm(kind: str, locale: str | None = None) -> int:
+    """Build the table now (startup, /reload) instead of on the first click."""
+    return len(_table(kind, locale).table)
+
+
+def similar_skills(slug: str, locale: str | None = None) -> List[Tuple[str, float]]:
+    return _table("skill", locale).get(slug)
+
+
+def similar_heroes(slug: str, locale: str | None = None) -> List[Tuple[str, float]]:
+    return _table("hero", locale).get(slug)
+
+
+metrics.gauge("similar.tables", lambda: len(_tables))
@@ -0,0 +1,96 @@
+# app/utils/singleflight.py
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+from app.utils import metrics
+
+T = TypeVar("T")
+
+# Single-flight: одинаковая работа, запрошенная одновременно, выполняется один раз,
+# остальные ждут её результат. Это не кэш — после завершения ключ забывается.
+# Метрики: singleflight.<name>.leader (выполнили сами), .shared (дождались чужого).
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent coroutines on one event loop. The work runs in its
+    own task, so a cancelled caller does not cancel it for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        metrics.gauge(f"singleflight.{name}.inflight", lambda: len(self._calls))
+
+    def inflight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        result, _ = await self.do_ex(key, fn)
+        return result
+
+    async def do_ex(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Like do(); the flag is True when the result came from another caller's run."""
+        task = self._calls.get(key)
+        if task is not None:
+            metrics.inc(f"singleflight.{self.name}.shared")
+            return await asyncio.shield(task), True
+        metrics.inc(f"singleflight.{self.name}.leader")
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task), False
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        self._calls.pop(key, None)
+        # все ждавшие могли отмениться — исключение забираем, чтобы asyncio не ругался
+        if not task.cancelled():
+            task.exception()
+
+
+class ThreadSingleFlight:
+    """
+    Same for plain functions called from several threads (event loop +
+    asyncio.to_thread workers): the first caller computes, the rest block
+    until it is done and get its result or its exception.
+    """
+
+    class _Call:
+        __slots__ = ("done", "result", "error")
+
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error: BaseException | None = None
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, ThreadSingleFlight._Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+        if not leader:
+            metrics.inc(f"singleflight.{self.name}.shared")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        metrics.inc(f"singleflight.{self.name}.leader")
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
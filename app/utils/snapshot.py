@@ -0,0 +1,124 @@
+# app/utils/snapshot.py
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import platform
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable
+
+from app.data import equipment_repo, events_repo, heroes_repo, jewels_repo, skills_repo
+from app.keyboards.cache import keyboards
+from app.utils import mount_combos, render, similar
+
+log = logging.getLogger(__name__)
+
+# Снимок тёплых кэшей для быстрого старта: разобранные каталоги, готовые
+# клавиатуры, отрендеренные карточки, таблицы «похожих», рейтинги пар умений
+# коней. Пишется при остановке, читается при запуске до прогрева — прогрев тогда
+# почти ничего не строит.
+# Снимок годится, только если не менялись ни данные (data/**/*.json), ни код
+# (app/**/*.py), ни версия Python — иначе его молча игнорируем.
+# Всё кладётся одним pickle: общие объекты (каталог ↔ кэш карточек) остаются общими,
+# поэтому проверка «карточка от этого же объекта» в cached_card продолжает работать.
+
+FORMAT = 1
+_APP_DIR = Path(__file__).resolve().parents[1]
+_REPOS = {
+    "events": events_repo, "heroes": heroes_repo, "skills": skills_repo,
+    "equipment": equipment_repo, "jewels": jewels_repo,
+}
+
+
+def _files(data_dir: Path, skip: Iterable[str]) -> Iterable[Path]:
+    skip = {os.path.abspath(p) for p in skip}
+    for p in sorted(data_dir.rglob("*.json")):
+        if os.path.abspath(p) not in skip:
+            yield p
+    for p in sorted(Path(".").glob("*.json")):   # запасные пути репозиториев (./events.json …)
+        yield p
+    yield from sorted(_APP_DIR.rglob("*.py"))
+
+
+def fingerprint(data_dir: str | Path = "data", skip: Iterable[str] = ()) -> str:
+    h = hashlib.sha256(f"{FORMAT}|{platform.python_version()}".encode())
+    for p in _files(Path(data_dir), skip):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        h.update(f"{p}|{st.st_mtime_ns}|{st.st_size}\n".encode())
+    return h.hexdigest()
+
+
+def _collect() -> Dict[str, Any]:
+    return {
+        "catalogs": {name: repo.state() for name, repo in _REPOS.items()},
+        "keyboards": keyboards.state(),
+        "cards": render.card_cache_state(),
+        "similar": similar.state(),
+        "mount_combos": mount_combos.state(),
+    }
+
+
+# отпечаток данных, которые сейчас загружены: считается при старте и после /reload
+_fp: str | None = None
+_skip: tuple = ()
+
+
+def refresh() -> None:
+    """Data was re-read (/reload): the next snapshot describes the files as they are now."""
+    global _fp
+    _fp = fingerprint(skip=_skip)
+
+
+def save(path: str | Path) -> int:
+    """Write the snapshot atomically; returns its size in bytes. Blocking — call via to_thread."""
+    if _fp is None:
+        return 0
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    blob = pickle.dumps({"fingerprint": _fp, "state": _collect()}, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(blob)
+    os.replace(tmp, path)
+    return len(blob)
+
+
+def load(path: str | Path, skip: Iterable[str] = ()) -> bool:
+    """
+    Restore caches from the snapshot if data and code are unchanged; False
+    when absent/stale/broken. `skip`: json files under data/ the bot writes
+    itself (file_id cache) — they must not invalidate the snapshot.
+    """
+    global _skip
+    _skip = tuple(skip)
+    refresh()
+    path = Path(path)
+    t0 = time.perf_counter()
+    try:
+        raw = pickle.loads(path.read_bytes())
+    except FileNotFoundError:
+        return False
+    except Exception:
+        log.warning("warm snapshot %s unreadable, cold start", path, exc_info=True)
+        return False
+    if raw.get("fingerprint") != _fp:
+        log.info("warm snapshot %s is stale (data or code changed), cold start", path)
+        return False
+    state = raw["state"]
+    for name, repo in _REPOS.items():
+        repo.restore(state["catalogs"][name])
+    keyboards.restore(state["keyboards"])
+    render.restore_card_cache(state["cards"])
+    similar.restore(state["similar"])
+    mount_combos.restore(state["mount_combos"])
+    log.info(
+        "warm snapshot restored",
+        extra={"keyboards": len(state["keyboards"]), "cards": len(state["cards"]),
+               "duration_ms": round((time.perf_counter() - t0) * 1000, 1)},
+    )
+    return True
@@ -0,0 +1,449 @@
+# app/utils/team_builder.py
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import multiprocessing
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from app.data import heroes_repo
+from app.data.storage import load_json_with_fallback
+from app.utils import metrics
+from app.utils.singleflight import SingleFlight
+
+log = logging.getLogger(__name__)
+
+# Подбор отряда (пара / полный марш) по модели синергии.
+# Очки раскладываются на слагаемые:
+#   герой:  бонусы за типы умений − штраф за ярость самого дешёвого активного умения
+#   пара:   общая специализация (одна линия войск) + взаимодополняющие типы умений
+#   отряд:  покрытие специализаций (+ запрошенных) и разнообразие типов умений
+# Поиск — ветви и границы по сочетаниям; оценки пар мемоизируются,
+# большие каталоги делятся по первому герою между процессами.
+
+SYNERGY_PATHS = ("data/team_synergy.json", "./team_synergy.json")
+
+# меньше — считаем в потоке; больше — раздаём процессам
+PARALLEL_MIN_HEROES = 120
+# бюджет одного поиска; по истечении отдаём лучшее найденное
+TIME_LIMIT_S = 3.0
+# предварительный проход в основном процессе перед раздачей воркерам
+SEED_S = 0.05
+RESULT_CACHE_SIZE = 256
+
+
+@dataclass(frozen=True)
+class SynergyModel:
+    w_specialty: float = 1.0          # за каждую специализацию, покрытую отрядом
+    w_wanted: float = 5.0             # за каждую запрошенную специализацию
+    w_shared: float = 0.6             # пара с общей специализацией
+    w_skill_type: float = 0.8         # за каждый тип умений в отряде
+    w_complement: float = 0.4         # пара: типы, которые есть только у одного
+    w_rage: float = 1.0               # штраф за 1000 ярости
+    # бонус героя за наличие умения такого типа
+    skill_type_bonus: Tuple[Tuple[str, float], ...] = (
+        ("active", 1.0), ("command", 0.8), ("passive", 0.5), ("counterattack", 0.4),
+    )
+
+
+def load_model() -> SynergyModel:
+    """data/team_synergy.json (same keys as SynergyModel) or the defaults."""
+    try:
+        raw = load_json_with_fallback(*SYNERGY_PATHS)
+    except FileNotFoundError:
+        return SynergyModel()
+    bonus = raw.pop("skill_type_bonus", None)
+    known = {k: float(v) for k, v in raw.items() if k in SynergyModel.__dataclass_fields__}
+    if isinstance(bonus, dict):
+        known["skill_type_bonus"] = tuple((str(k).lower(), float(v)) for k, v in bonus.items())
+    return SynergyModel(**known)
+
+
+# =========================
+# Scoring
+# =========================
+@dataclass(frozen=True)
+class Feat:
+    """What the model needs from a hero; small and picklable (sent to workers)."""
+    slug: str
+    specs: FrozenSet[str]
+    types: FrozenSet[str]
+    rage: Optional[int]
+
+
+def features(h: heroes_repo.Hero) -> Feat:
+    rages = [sk.rage for sk in h.skills if sk.rage and (sk.type or "").lower() == "active"]
+    return Feat(
+        slug=h.slug,
+        specs=frozenset(s.strip().lower() for s in h.specialty if s.strip()),
+        types=frozenset((sk.type or "").strip().lower() for sk in h.skills if (sk.type or "").strip()),
+        rage=min(rages) if rages else None,
+    )
+
+
+class Scorer:
+    """Per-hero and per-pair sub-scores, memoized for the lifetime of one catalog."""
+
+    def __init__(self, feats: Sequence[Feat], model: SynergyModel):
+        self.feats = list(feats)
+        self.model = model
+        bonus = dict(model.skill_type_bonus)
+        self.indiv = [
+            sum(bonus.get(tp, 0.0) for tp in f.types) - model.w_rage * (f.rage or 0) / 1000
+            for f in self.feats
+        ]
+        # строки матрицы пар считаются при первом обращении и живут, пока жив каталог
+        self._rows: List[Optional[array]] = [None] * len(self.feats)
+        self._best_pair: List[Optional[float]] = [None] * len(self.feats)
+
+    def row(self, i: int) -> array:
+        r = self._rows[i]
+        if r is None:
+            m, a = self.model, self.feats[i]
+            r = self._rows[i] = array("d", (
+                m.w_shared * len(a.specs & b.specs) + m.w_complement * len(a.types ^ b.types)
+                for b in self.feats
+            ))
+        return r
+
+    def pair(self, i: int, j: int) -> float:
+        return self.row(i)[j]
+
+    def best_pair(self, i: int) -> float:
+        """Upper bound of pair(i, ·) over the whole catalog."""
+        v = self._best_pair[i]
+        if v is None:
+            r = self.row(i)
+            v = self._best_pair[i] = max((r[j] for j in range(len(r)) if j != i), default=0.0)
+        return v
+
+    def group(self, specs: FrozenSet[str], types: FrozenSet[str], wanted: FrozenSet[str]) -> float:
+        m = self.model
+        return m.w_specialty * len(specs) + m.w_wanted * len(specs & wanted) + m.w_skill_type * len(types)
+
+    def score(self, team: Sequence[int], wanted: FrozenSet[str]) -> float:
+        specs = frozenset().union(*(self.feats[i].specs for i in team))
+        types = frozenset().union(*(self.feats[i].types for i in team))
+        return (
+            sum(self.indiv[i] for i in team)
+            + sum(self.pair(a, b) for k, a in enumerate(team) for b in team[k + 1:])
+            + self.group(specs, types, wanted)
+        )
+
+    def breakdown(self, team: Sequence[int], wanted: FrozenSet[str]) -> Dict[str, float]:
+        specs = frozenset().union(*(self.feats[i].specs for i in team))
+        types = frozenset().union(*(self.feats[i].types for i in team))
+        return {
+            "heroes": sum(self.indiv[i] for i in team),
+            "pairs": sum(self.pair(a, b) for k, a in enumerate(team) for b in team[k + 1:]),
+            "coverage": self.group(specs, types, wanted),
+        }
+
+
+# =========================
+# Branch and bound
+# =========================
+@dataclass
+class _Search:
+    sc: Scorer
+    size: int
+    wanted: FrozenSet[str]
+    top: int
+    deadline: float                   # time.time(): общий для всех процессов одного поиска
+    best: List[Tuple[float, Tuple[int, ...]]] = field(default_factory=list)   # min-heap
+    nodes: int = 0
+    timed_out: bool = False
+    ub: List[float] = field(default_factory=list)
+    # порог, известный заранее (из быстрого предварительного прохода): всё не выше — отсекаем
+    floor: float = float("-inf")
+    # (i, n): из корня идём только в ветви с номером ≡ i (mod n) — доля одного воркера
+    part: Optional[Tuple[int, int]] = None
+    root: int = 0
+
+    def __post_init__(self) -> None:
+        # статическая верхняя граница прироста от героя в любом отряде этого размера
+        sc = self.sc
+        self.ub = [
+            sc.indiv[c] + (self.size - 1) * sc.best_pair(c) + sc.group(f.specs, f.types, self.wanted)
+            for c, f in enumerate(sc.feats)
+        ]
+
+    def _floor(self) -> float:
+        return max(self.best[0][0], self.floor) if len(self.best) >= self.top else self.floor
+
+    def _gain(self, c: int, team: Tuple[int, ...], specs: FrozenSet[str], types: FrozenSet[str]) -> float:
+        """Exact score change of adding c to team."""
+        sc, f, m = self.sc, self.sc.feats[c], self.sc.model
+        row = sc.row(c)
+        return (
+            sc.indiv[c]
+            + sum(row[p] for p in team)
+            + m.w_specialty * len(f.specs - specs)
+            + m.w_wanted * len((f.specs & self.wanted) - specs)
+            + m.w_skill_type * len(f.types - types)
+        )
+
+    def run(self, team: Tuple[int, ...], cands: List[int]) -> None:
+        f = self.sc.feats
+        specs = frozenset().union(*(f[i].specs for i in team)) if team else frozenset()
+        types = frozenset().union(*(f[i].types for i in team)) if team else frozenset()
+        self._dfs(team, self.sc.score(team, self.wanted) if team else 0.0, specs, types, cands)
+
+    def _dfs(self, team, score, specs, types, cands: List[int]) -> None:
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and time.time() > self.deadline:
+            self.timed_out = True
+        if self.timed_out:
+            return
+        r = self.size - len(team)
+        if r == 0:
+            item = (score, team)
+            if len(self.best) < self.top:
+                heapq.heappush(self.best, item)
+            elif score > self.best[0][0]:
+                heapq.heapreplace(self.best, item)
+            return
+        if len(cands) < r:
+            return
+        ub, floor = self.ub, self._floor()
+        if r == 1:
+            for c in cands:
+                if score + ub[c] <= floor:   # дешёвая проверка до точного подсчёта
+                    continue
+                g = self._gain(c, team, specs, types)
+                if score + g > floor:
+                    self._dfs(team + (c,), score + g, specs, types, [])
+                    floor = self._floor()
+            return
+        top_ub = max(ub[c] for c in cands)
+        cands = [c for c in cands if score + ub[c] + (r - 1) * top_ub > floor]
+        # оптимистичный вклад кандидата: точный прирост к текущему отряду
+        # + половина лучших пар с остальными новыми (каждая пара делится на двоих)
+        gains = [(self._gain(c, team, specs, types), c) for c in cands]
+        opt = sorted(((g + (r - 1) * self.sc.best_pair(c) / 2, g, c) for g, c in gains), reverse=True)
+        bound = score + sum(o for o, _, _ in opt[:r])
+        if bound <= self._floor():
+            return
+        for k, (o, g, c) in enumerate(opt):
+            # сочетания, а не размещения: после c — только кандидаты, идущие за ним в opt;
+            # граница: c + (r-1) лучших из них (opt отсортирован по убыванию)
+            rest = opt[k + 1:k + r]
+            if len(rest) < r - 1 or score + o + sum(x for x, _, _ in rest) <= self._floor():
+                break
+            if self.part is not None and len(team) == self.root and k % self.part[1] != self.part[0]:
+                continue
+            fc = self.sc.feats[c]
+            nxt = [x for _, _, x in opt[k + 1:]]
+            self._dfs(team + (c,), score + g, specs | fc.specs, types | fc.types, nxt)
+            if self.timed_out:
+                return
+
+
+def search(
+    feats: Sequence[Feat], model: SynergyModel, size: int, wanted: FrozenSet[str],
+    must: Tuple[int, ...] = (), top: int = 5, deadline: Optional[float] = None,
+    part: Optional[Tuple[int, int]] = None, scorer: Optional[Scorer] = None,
+    floor: float = float("-inf"),
+) -> Tuple[List[Tuple[float, Tuple[int, ...]]], int, bool]:
+    """
+    Best `top` teams of `size` containing `must`. With part=(i, n), only
+    root branches i, i+n, i+2n, … are explored — the share of one worker;
+    n workers together cover exactly the single-process search tree.
+    Teams scoring <= `floor` are pruned (the caller already holds `top`
+    teams at least that good).
+    """
+    sc = scorer or Scorer(feats, model)
+    s = _Search(sc, size, wanted, top, deadline or time.time() + TIME_LIMIT_S,
+                floor=floor, part=part, root=len(must))
+    s.run(tuple(must), [i for i in range(len(feats)) if i not in must])
+    return sorted(s.best, reverse=True), s.nodes, s.timed_out
+
+
+# =========================
+# Worker processes
+# =========================
+# в процессе-воркере Scorer живёт между задачами: оценки пар считаются один раз на каталог
+_worker_scorers: Dict[Tuple, Scorer] = {}
+
+
+def _search_chunk(token: Tuple, feats, model, size, wanted, must, top, deadline, part, floor):
+    sc = _worker_scorers.get(token)
+    if sc is None:
+        _worker_scorers.clear()
+        sc = _worker_scorers[token] = Scorer(feats, model)
+    return search(feats, model, size, wanted, must, top, deadline, part, scorer=sc, floor=floor)
+
+
+def merge(parts: Sequence[List[Tuple[float, Tuple[int, ...]]]], top: int) -> List[Tuple[float, Tuple[int, ...]]]:
+    """Top teams over several partial results; the same team found twice counts once."""
+    seen: Dict[Tuple[int, ...], Tuple[float, Tuple[int, ...]]] = {}
+    for res in parts:
+        for score, idx in res:
+            seen.setdefault(tuple(sorted(idx)), (score, idx))
+    return heapq.nlargest(top, seen.values())
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 2
+
+
+def _noop() -> None:
+    return None
+
+
+def configure(workers: int) -> None:
+    """Set the pool size and start the workers now (spawn + imports take a while)."""
+    global _pool_workers
+    _pool_workers = max(0, workers)
+    pool = _get_pool()
+    if pool is not None:
+        for _ in range(_pool_workers):
+            pool.submit(_noop)
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if _pool is None and _pool_workers > 0:
+        # spawn: к моменту первого /team в процессе уже есть потоки (логи, to_thread)
+        _pool = ProcessPoolExecutor(_pool_workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# =========================
+# Public API
+# =========================
+@dataclass
+class Team:
+    score: float
+    heroes: List[heroes_repo.Hero]
+    parts: Dict[str, float]
+
+
+@dataclass
+class _Prepared:
+    version: int
+    heroes: List[heroes_repo.Hero]
+    feats: List[Feat]
+    scorer: Scorer
+
+
+_model: Optional[SynergyModel] = None
+_prepared: Dict[str, _Prepared] = {}
+_results: "OrderedDict[Tuple, Tuple[List[Team], bool]]" = OrderedDict()
+
+
+def model() -> SynergyModel:
+    global _model
+    if _model is None:
+        _model = load_model()
+    return _model
+
+
+def reload_model() -> None:
+    global _model
+    _model = None
+    _results.clear()
+
+
+def _prepare(locale: str | None) -> _Prepared:
+    ver = heroes_repo.version()
+    p = _prepared.get(locale or "")
+    if p is None or p.version != ver or p.scorer.model != model():
+        heroes = heroes_repo.list_heroes(locale)
+        feats = [features(h) for h in heroes]
+        p = _prepared[locale or ""] = _Prepared(ver, heroes, feats, Scorer(feats, model()))
+    return p
+
+
+_searches = SingleFlight("team")
+
+
+async def best_teams(
+    size: int, wanted: Sequence[str] = (), must: Sequence[str] = (),
+    locale: str | None = None, top: int = 5,
+) -> Tuple[List[Team], bool]:
+    """
+    Top teams of `size` heroes covering `wanted` specialties and containing
+    the `must` heroes (slugs). Returns (teams, complete) — complete=False
+    when the time budget ran out and the result is the best found so far.
+    """
+    prep = _prepare(locale)
+    m = model()
+    wanted_f = frozenset(w.strip().lower() for w in wanted if w.strip())
+    slugs = {f.slug: i for i, f in enumerate(prep.feats)}
+    must_i = tuple(sorted({slugs[s] for s in must if s in slugs}))
+    key = (locale or "", prep.version, m, size, wanted_f, must_i, top)
+    hit = _results.get(key)
+    if hit is not None:
+        _results.move_to_end(key)
+        metrics.inc("team.cache_hit")
+        return hit
+    metrics.inc("team.cache_miss")
+    # тот же запрос от нескольких человек сразу — один перебор на всех
+    return await _searches.do(key, lambda: _run(key, prep, m, size, wanted_f, must_i, top, locale))
+
+
+async def _run(
+    key: Tuple, prep: _Prepared, m: SynergyModel, size: int, wanted_f: FrozenSet[str],
+    must_i: Tuple[int, ...], top: int, locale: str | None,
+) -> Tuple[List[Team], bool]:
+    t0 = time.perf_counter()
+    deadline = time.time() + TIME_LIMIT_S
+    n_free = len(prep.feats) - len(must_i)
+    pool = _get_pool() if n_free >= PARALLEL_MIN_HEROES and size - len(must_i) >= 3 else None
+    loop = asyncio.get_running_loop()
+    if pool is None:
+        found, nodes, timed_out = await asyncio.to_thread(
+            search, prep.feats, m, size, wanted_f, must_i, top, deadline, None, prep.scorer,
+        )
+    else:
+        # короткий проход здесь же даёт порог top-N: без него воркеры (у каждого свой
+        # кусок и своя куча) отсекали бы в разы хуже одного процесса
+        seed, nodes, _ = await asyncio.to_thread(
+            search, prep.feats, m, size, wanted_f, must_i, top, time.time() + SEED_S, None, prep.scorer,
+        )
+        floor = seed[-1][0] if len(seed) >= top else float("-inf")
+        # ветви корня делятся через одну: перспективные (первые в порядке оценки) — всем поровну
+        token = (locale or "", prep.version, m)
+        futs = [
+            loop.run_in_executor(
+                pool, _search_chunk, token, prep.feats, m, size, wanted_f, must_i, top, deadline,
+                (k, _pool_workers), floor,
+            )
+            for k in range(_pool_workers)
+        ]
+        parts = await asyncio.gather(*futs)
+        found = merge([seed] + [res for res, _, _ in parts], top)
+        nodes += sum(n for _, n, _ in parts)
+        timed_out = any(to for _, _, to in parts)
+
+    teams = [
+        Team(score, [prep.heroes[i] for i in idx], prep.scorer.breakdown(idx, wanted_f))
+        for score, idx in found
+    ]
+    log.info(
+        "team search",
+        extra={"heroes": len(prep.feats), "size": size, "nodes": nodes, "parallel": pool is not None,
+               "timed_out": timed_out, "duration_ms": round((time.perf_counter() - t0) * 1000, 1)},
+    )
+    res = (teams, not timed_out)
+    _results[key] = res
+    if len(_results) > RESULT_CACHE_SIZE:
+        _results.popitem(last=False)
+    return res
+
+
+metrics.gauge("team.cached_results", lambda: len(_results))
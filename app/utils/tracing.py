@@ -0,0 +1,302 @@
+# app/utils/tracing.py
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.types import TelegramObject, Update
+
+from app.utils import metrics
+
+log = logging.getLogger(__name__)
+
+# Трейсы апдейтов: корневой спан на апдейт, дочерние — ожидание в очереди,
+# подбор хендлера, хендлер, каталоги, рендер, каждый вызов Bot API.
+# Спаны пишутся всегда (это пара объектов на вызов), а решение «экспортировать
+# или нет» принимается в конце апдейта: попал в выборку, медленный или с ошибкой.
+# Формат — OTLP/JSON, по запросу ExportTraceServiceRequest на строку: такой файл
+# читает otlpjsonfile receiver у OpenTelemetry Collector.
+
+SERVICE_NAME = "codex-of-dreams-bot"
+MAX_SPANS = 256           # на трейс; остальные считаем, но не храним
+
+# SpanKind из OTLP
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+# perf_counter точнее, time_ns — в эпохе; переводим одно в другое через смещение
+_EPOCH_NS = time.time_ns() - time.perf_counter_ns()
+
+
+def _now() -> int:
+    return time.perf_counter_ns()
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "kind", "start", "end", "attrs", "error")
+
+    def __init__(self, name: str, parent_id: Optional[str], kind: int = KIND_INTERNAL,
+                 start: Optional[int] = None, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start = start if start is not None else _now()
+        self.end = 0
+        self.attrs = attrs or {}
+        self.error: Optional[str] = None
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+
+class Trace:
+    __slots__ = ("trace_id", "root", "spans", "mark", "dropped", "closed")
+
+    def __init__(self, root: Span):
+        self.trace_id = os.urandom(16).hex()
+        self.root = root
+        self.spans: List[Span] = [root]
+        self.mark = root.start
+        self.dropped = 0
+        self.closed = False
+
+    def add(self, s: Span) -> bool:
+        # спаны из задач, переживших апдейт (prefetch и т.п.), в готовый трейс не пишем
+        if self.closed:
+            return False
+        if len(self.spans) >= MAX_SPANS:
+            self.dropped += 1
+            return False
+        self.spans.append(s)
+        return True
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_span: ContextVar[Optional[Span]] = ContextVar("span", default=None)
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attrs: Any) -> Iterator[Optional[Span]]:
+    """Child span of the current one; a no-op outside a traced update."""
+    tr = _trace.get()
+    if tr is None:
+        yield None
+        return
+    parent = _span.get()
+    s = Span(name, parent.span_id if parent else tr.root.span_id, kind, attrs=attrs)
+    if not tr.add(s):
+        yield None
+        return
+    token = _span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        s.end = _now()
+        _span.reset(token)
+
+
+def lap(name: str, **attrs: Any) -> None:
+    """Closed span from the previous lap (or the update start) to now."""
+    tr = _trace.get()
+    if tr is None:
+        return
+    now = _now()
+    parent = _span.get()
+    s = Span(name, parent.span_id if parent else tr.root.span_id, start=tr.mark, attrs=attrs)
+    s.end = now
+    tr.mark = now
+    tr.add(s)
+
+
+def current_trace_id() -> Optional[str]:
+    tr = _trace.get()
+    return tr.trace_id if tr is not None else None
+
+
+# =========================
+# OTLP/JSON
+# =========================
+def _attr(key: str, v: Any) -> Dict[str, Any]:
+    if isinstance(v, bool):
+        val = {"boolValue": v}
+    elif isinstance(v, int):
+        val = {"intValue": str(v)}          # int64 в OTLP/JSON — строкой
+    elif isinstance(v, float):
+        val = {"doubleValue": v}
+    else:
+        val = {"stringValue": str(v)}
+    return {"key": key, "value": val}
+
+
+def to_otlp(tr: Trace) -> Dict[str, Any]:
+    spans = []
+    for s in tr.spans:
+        d: Dict[str, Any] = {
+            "traceId": tr.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": s.kind,
+            "startTimeUnixNano": str(_EPOCH_NS + s.start),
+            "endTimeUnixNano": str(_EPOCH_NS + (s.end or s.start)),
+            "attributes": [_attr(k, v) for k, v in s.attrs.items() if v is not None],
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        }
+        if s.parent_id:
+            d["parentSpanId"] = s.parent_id
+        spans.append(d)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_attr("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+        }]
+    }
+
+
+class FileExporter:
+    """
+    Appends one OTLP/JSON request per line. Serialization and disk I/O
+    happen in a writer thread; the event loop only enqueues the trace.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._q: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, tr: Trace) -> None:
+        self._q.put(tr)
+
+    def _run(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            while True:
+                tr = self._q.get()
+                if tr is None:
+                    break
+                try:
+                    f.write(json.dumps(to_otlp(tr), ensure_ascii=False, default=str) + "\n")
+                    # следующий трейс ещё в очереди — допишем пачкой, flush один раз
+                    if self._q.empty():
+                        f.flush()
+                except Exception:
+                    log.warning("trace export failed", exc_info=True)
+
+    def close(self) -> None:
+        self._q.put(None)
+        self._thread.join(timeout=5)
+
+
+# =========================
+# Middlewares
+# =========================
+def _sampled(update_id: int, rate: float) -> bool:
+    if rate >= 1:
+        return True
+    if rate <= 0:
+        return False
+    return (zlib.crc32(str(update_id).encode()) % 10_000) < rate * 10_000
+
+
+class TracingMiddleware(BaseMiddleware):
+    """
+    Outer middleware on dp.update (register it first): root span per
+    update. Exported when sampled (sample_rate), slower than slow_ms, or
+    failed — slow and failed traces are kept regardless of sampling.
+    """
+
+    def __init__(self, exporter: FileExporter, sample_rate: float = 0.01, slow_ms: float = 500.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.slow_ns = int(slow_ms * 1_000_000)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, Update):
+            return await handler(event, data)
+        chat = data.get("event_chat")
+        root = Span(f"update {event.event_type}", None, KIND_SERVER, attrs={
+            "update.id": event.update_id,
+            "update.type": event.event_type,
+            "chat.id": chat.id if chat else None,
+            "callback.data": event.callback_query.data if event.callback_query else None,
+        })
+        tr = Trace(root)
+        t_tok = _trace.set(tr)
+        s_tok = _span.set(root)
+        try:
+            return await handler(event, data)
+        except BaseException as e:
+            root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            root.end = _now()
+            tr.closed = True
+            _span.reset(s_tok)
+            _trace.reset(t_tok)
+            self._finish(tr, event.update_id)
+
+    def _finish(self, tr: Trace, update_id: int) -> None:
+        root = tr.root
+        slow = root.end - root.start >= self.slow_ns
+        failed = any(s.error for s in tr.spans)
+        if slow:
+            metrics.inc("trace.slow")
+        if not (slow or failed or _sampled(update_id, self.sample_rate)):
+            return
+        root.set(**{"trace.retained": "slow" if slow else "error" if failed else "sampled"})
+        if tr.dropped:
+            root.set(**{"trace.dropped_spans": tr.dropped})
+        self.exporter.export(tr)
+        metrics.inc("trace.exported")
+
+
+class HandlerSpanMiddleware(BaseMiddleware):
+    """
+    Inner middleware (message/callback_query): closes the "match" span
+    (filter checks since the update left the queue) and wraps the handler.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if _trace.get() is None:
+            return await handler(event, data)
+        lap("match")
+        h = data.get("route") or data.get("handler")
+        cb = getattr(h, "callback", None)
+        name = f"{cb.__module__}.{getattr(cb, '__qualname__', cb)}" if cb is not None else "handler"
+        with span(name):
+            return await handler(event, data)
+
+
+class ApiSpanMiddleware(BaseRequestMiddleware):
+    """Bot session middleware: client span per outbound Bot API call."""
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot, method: TelegramMethod):
+        with span(f"api {type(method).__name__}", KIND_CLIENT, **{"rpc.system": "telegram-bot-api"}):
+            return await make_request(bot, method)
@@ -0,0 +1,118 @@
+# app/utils/update_scheduler.py
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from app.utils import metrics, multibot, tracing
+
+log = logging.getLogger(__name__)
+
+# Кнопки, повторное нажатие которых делает предыдущее бессмысленным:
+# важен только последний клик по этому сообщению
+SUPERSEDABLE_PREFIXES = ("ms:nav:", "ev:list:", "hr:list:", "sk:list:")
+
+
+@dataclass
+class _ChatQueue:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)   # FIFO-честный
+    depth: int = 0
+
+
+class UpdateScheduler(BaseMiddleware):
+    """
+    Outer middleware on dp.update (polling runs with handle_as_tasks=True):
+    - per-chat FIFO: updates of one chat run strictly one after another,
+      in arrival order; different chats run in parallel
+    - bounded global pool: at most `workers` handlers run at once
+    - superseded navigation: if a newer prev/next/page click for the same
+      message is queued, the older one is answered and dropped
+    """
+
+    def __init__(self, workers: int = 64):
+        self.workers = workers
+        self._pool = asyncio.Semaphore(workers)
+        self._chats: Dict[Hashable, _ChatQueue] = {}
+        self._latest: Dict[Tuple[int, int], int] = {}
+        self._seq = 0
+        self.active = 0
+        self.waiting = 0
+        metrics.gauge("updates.active", lambda: self.active)
+        metrics.gauge("updates.waiting", lambda: self.waiting)
+        metrics.gauge("updates.chats_queued", lambda: len(self._chats))
+        metrics.gauge("updates.max_chat_depth", lambda: max((q.depth for q in self._chats.values()), default=0))
+
+    @staticmethod
+    def _chat_key(event: Update, data: Dict[str, Any]) -> Optional[Hashable]:
+        # в личке chat.id — это id пользователя у любого бота: без имени бота
+        # очередь одного человека в двух ботах была бы общей (BotContext стоит раньше)
+        chat = data.get("event_chat")
+        if chat is not None:
+            return multibot.current(), chat.id
+        user = data.get("event_from_user")
+        return (multibot.current(), "user", user.id) if user is not None else None
+
+    @staticmethod
+    def _nav_key(event: Update) -> Optional[Tuple[str, int, int]]:
+        q = event.callback_query
+        if q is None or not q.data or q.message is None:
+            return None
+        if not q.data.startswith(SUPERSEDABLE_PREFIXES):
+            return None
+        # message_id нумеруются у каждого бота свои
+        return multibot.current(), q.message.chat.id, q.message.message_id
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, Update):
+            return await handler(event, data)
+
+        self._seq += 1
+        seq = self._seq
+        nav = self._nav_key(event)
+        if nav is not None:
+            self._latest[nav] = seq
+
+        key = self._chat_key(event, data)
+        cq = self._chats.get(key)
+        if cq is None:
+            cq = self._chats[key] = _ChatQueue()
+        cq.depth += 1
+        self.waiting += 1
+        queued = True
+        try:
+            async with cq.lock:
+                if nav is not None and self._latest.get(nav) != seq:
+                    metrics.inc("updates.dropped_superseded")
+                    try:
+                        await event.callback_query.answer()
+                    except Exception:
+                        pass
+                    return None
+                async with self._pool:
+                    self.waiting -= 1
+                    queued = False
+                    tracing.lap("queue")
+                    self.active += 1
+                    try:
+                        return await handler(event, data)
+                    finally:
+                        self.active -= 1
+                        metrics.inc("updates.processed")
+        finally:
+            if queued:
+                self.waiting -= 1
+            cq.depth -= 1
+            if cq.depth == 0:
+                self._chats.pop(key, None)
+            if nav is not None and self._latest.get(nav) == seq:
+                self._latest.pop(nav, None)
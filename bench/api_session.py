@@ -0,0 +1,115 @@
+"""
+Bot API session check against a local stub server (no Telegram needed).
+
+Usage:
+    python -m bench.api_session [n_requests] [concurrency]
+
+Starts an aiohttp stub of the Bot API on 127.0.0.1, points TunedSession
+at it in local mode and:
+- sends a photo from disk and checks the server got a file:// path,
+  not multipart bytes;
+- fires n concurrent getMe calls and reports latency and how many TCP
+  connections the pool actually opened (keep-alive reuse).
+"""
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from aiogram.types import FSInputFile
+from aiohttp import web
+
+from app.bot import TunedSession, build_api_server, build_bot
+
+_ME = {"id": 1, "is_bot": True, "first_name": "stub", "username": "stub_bot"}
+
+
+class Stub:
+    def __init__(self):
+        self.requests = []
+        self.peers = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.peers.add(request.transport.get_extra_info("peername"))
+        form = await request.post()
+        fields = {k: (v if isinstance(v, str) else f"<upload {v.filename}>") for k, v in form.items()}
+        self.requests.append((method, fields))
+        if method.lower() == "sendphoto":
+            result = {
+                "message_id": len(self.requests), "date": int(time.time()),
+                "chat": {"id": int(fields["chat_id"]), "type": "private"},
+                "photo": [{"file_id": "stub-file-id", "file_unique_id": "u", "width": 1, "height": 1}],
+            }
+        else:
+            result = _ME
+        return web.json_response({"ok": True, "result": result})
+
+
+async def run(n: int, concurrency: int) -> int:
+    stub = Stub()
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", stub.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    session = TunedSession(
+        api=build_api_server(f"http://127.0.0.1:{port}", local_mode=True),
+        limit=concurrency,
+    )
+    bot = build_bot("1:stub", session=session)
+    failed = 0
+    try:
+        with tempfile.NamedTemporaryFile(suffix=".png") as f:
+            f.write(b"\x89PNG fake")
+            f.flush()
+            msg = await bot.send_photo(chat_id=42, photo=FSInputFile(f.name))
+            sent = stub.requests[-1][1]["photo"]
+            ok = sent == f"file://{Path(f.name).resolve()}"
+            failed += not ok
+            print(f"sendPhoto by path: {'OK' if ok else 'FAIL'} ({sent}); file_id={msg.photo[-1].file_id}")
+
+        stub.peers.clear()
+        sem = asyncio.Semaphore(concurrency)
+        lat = []
+
+        async def one():
+            async with sem:
+                t0 = time.perf_counter()
+                await bot.get_me()
+                lat.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(n)))
+        wall = time.perf_counter() - t0
+        lat.sort()
+        print(json.dumps({
+            "requests": n,
+            "concurrency": concurrency,
+            "rps": round(n / wall),
+            "p50_ms": round(lat[len(lat) // 2] * 1000, 2),
+            "p99_ms": round(lat[int(len(lat) * 0.99) - 1] * 1000, 2),
+            "tcp_connections": len(stub.peers),
+        }))
+        if len(stub.peers) > concurrency:
+            print("FAIL: pool opened more connections than its limit")
+            failed += 1
+    finally:
+        await bot.session.close()
+        await runner.cleanup()
+    return failed
+
+
+def main(argv):
+    n = int(argv[1]) if len(argv) > 1 else 2000
+    concurrency = int(argv[2]) if len(argv) > 2 else 16
+    sys.exit(1 if asyncio.run(run(n, concurrency)) else 0)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
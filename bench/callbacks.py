@@ -0,0 +1,63 @@
+"""
+Callback dispatch microbenchmark: prefix trie vs linear F.data.startswith chain.
+
+Usage:
+    python -m bench.callbacks [n_routes ...]
+
+For each route count, registers n synthetic "nsX:actY" routes in both
+dispatchers and measures the cost of resolving a payload that matches the
+last registered route (worst case for the linear chain) and one that
+matches nothing.
+"""
+import sys
+import timeit
+from types import SimpleNamespace
+
+from aiogram import F
+
+from app.utils.cbrouter import CallbackRoutes
+
+
+async def _noop(*_):
+    return None
+
+
+def build(n: int):
+    trie = CallbackRoutes(name=f"bench-{n}")
+    linear = []
+    for i in range(n):
+        prefix = f"ns{i // 8}:act{i % 8}"
+        trie.route(prefix, str, int)(_noop)
+        # так выглядели фильтры до cbrouter: magic filter + ручной split в хендлере
+        linear.append((F.data.startswith(prefix + ":"), _noop))
+    last = f"ns{(n - 1) // 8}:act{(n - 1) % 8}:item-name:3"
+    return trie, linear, last
+
+
+def linear_resolve(linear, data: str):
+    q = SimpleNamespace(data=data)
+    for flt, fn in linear:
+        if flt.resolve(q):
+            _, _, rest = data.split(":", 2)
+            name, idx = rest.rsplit(":", 1)
+            return fn, (name, int(idx))
+    return None
+
+
+def main(argv):
+    sizes = [int(x) for x in argv[1:]] or [5, 15, 50, 200, 1000]
+    print(f"{'routes':>7} {'trie hit':>10} {'linear hit':>11} {'trie miss':>10} {'linear miss':>12}   (µs/dispatch)")
+    for n in sizes:
+        trie, linear, last = build(n)
+        assert trie.resolve(last) is not None and linear_resolve(linear, last) is not None
+        number = 20000
+        res = []
+        for data in (last, "zz:none:1"):
+            t_trie = timeit.timeit(lambda: trie.resolve(data), number=number) / number * 1e6
+            t_lin = timeit.timeit(lambda: linear_resolve(linear, data), number=number // 10) / (number // 10) * 1e6
+            res += [t_trie, t_lin]
+        print(f"{n:>7} {res[0]:>10.2f} {res[1]:>11.2f} {res[2]:>10.2f} {res[3]:>12.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,90 @@
+"""
+Ingestion benchmark: whole-file json.loads vs streaming iter_json_records.
+
+Usage:
+    python -m bench.ingest [size_mb] [--keep]
+
+Generates a synthetic {"events": [...]} catalog of roughly size_mb megabytes
+in a temp dir, then runs each loader in a fresh subprocess and reports wall
+time and peak RSS (ru_maxrss). Default size is 300 MB.
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _record(i: int) -> dict:
+    return {
+        "id": f"ev-{i}",
+        "name": f"Synthetic Event {i}",
+        "description": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4,
+        "time": {"duration": "3 days"},
+        "rewards": [{"name": f"Chest {i % 7}", "rarity": "epic", "notes": "x1"}],
+        "bonus": {"type": "Gathering", "value": "+20%", "scope": "all"},
+        "rules": ["Rule one", "Rule two", "Rule three"],
+        "source": ["Community notes"],
+    }
+
+
+def generate(path: Path, size_mb: int) -> int:
+    target = size_mb * 1024 * 1024
+    n = 0
+    with path.open("w", encoding="utf-8") as f:
+        f.write('{"version": 1, "events": [')
+        written = 0
+        while written < target:
+            chunk = ("," if n else "") + json.dumps(_record(n), ensure_ascii=False)
+            f.write(chunk)
+            written += len(chunk)
+            n += 1
+        f.write("]}")
+    return n
+
+
+def _run_mode(mode: str, path: str) -> None:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    from app.data.events_repo import _norm_event
+    from app.data.models import Event
+    from app.data.storage import iter_json_records
+
+    t0 = time.perf_counter()
+    if mode == "loads":
+        raw = json.loads(Path(path).read_text(encoding="utf-8"))
+        items = [Event(**_norm_event(x)) for x in raw["events"]]
+    else:
+        items = [Event(**_norm_event(d)) for _, d in iter_json_records(Path(path), keys=("events",))]
+    count = len(items)
+    dt = time.perf_counter() - t0
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"mode": mode, "records": count, "seconds": round(dt, 2), "peak_rss_mb": round(peak_mb, 1)}))
+
+
+def main(argv: list[str]) -> None:
+    if len(argv) >= 3 and argv[1] == "--run":
+        return _run_mode(argv[2], argv[3])
+
+    size_mb = int(argv[1]) if len(argv) > 1 and argv[1].isdigit() else 300
+    keep = "--keep" in argv
+    tmp = Path(tempfile.mkdtemp(prefix="ingest-bench-"))
+    path = tmp / "events.json"
+    n = generate(path, size_mb)
+    print(f"generated {path} ({path.stat().st_size / 1e6:.0f} MB, {n} records)")
+
+    try:
+        # both modes keep the built models, like the repos do; the gap is the raw JSON tree
+        for mode in ("loads", "stream"):
+            subprocess.run([sys.executable, "-m", "bench.ingest", "--run", mode, str(path)],
+                           check=True, cwd=Path(__file__).resolve().parents[1])
+    finally:
+        if not keep:
+            os.remove(path)
+            tmp.rmdir()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
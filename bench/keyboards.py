@@ -0,0 +1,64 @@
+"""
+Keyboard construction microbenchmark: building an InlineKeyboardMarkup per
+callback vs serving the prebuilt one from the keyboard cache.
+
+Usage:
+    python -m bench.keyboards [n_items ...]
+
+For each slot size, measures the mount-skill list keyboard (one button per
+skill) and an item keyboard: time per callback and bytes allocated per
+callback (tracemalloc).
+"""
+import sys
+import timeit
+import tracemalloc
+
+from app.keyboards.cache import KeyboardCache
+from app.keyboards.mount_skills import item_kb, list_kb
+
+
+def _alloc(fn, number: int = 200) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(number):
+            fn()
+        # пиковая, а не итоговая: собранные объекты освобождаются сразу,
+        # так что пик ≈ объём одной сборки клавиатуры
+        return tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+
+def main(argv):
+    sizes = [int(x) for x in argv[1:]] or [10, 30, 100]
+    print(f"{'items':>6} {'case':>6} {'build µs':>9} {'cached µs':>10} {'build B':>8} {'cached B':>9}")
+    for n in sizes:
+        names = [f"Skill {i}" for i in range(n)]
+        i = n // 2
+        cache = KeyboardCache()
+
+        def list_build():
+            return list_kb("spears", 1, names)
+
+        def list_cached():
+            return cache.get(("ms:list", "spears", 1, 0), list_build)
+
+        def item_build():
+            return item_kb("spears", 1, i, i - 1, i + 1)
+
+        def item_cached():
+            return cache.get(("ms:item", "spears", 1, i, 0), item_build)
+
+        number = 2000
+        for case, build, cached in (("list", list_build, list_cached), ("item", item_build, item_cached)):
+            t_b = timeit.timeit(build, number=number) / number * 1e6
+            t_c = timeit.timeit(cached, number=number) / number * 1e6
+            a_b, a_c = _alloc(build), _alloc(cached)
+            print(f"{n:>6} {case:>6} {t_b:>9.2f} {t_c:>10.2f} {a_b:>8.0f} {a_c:>9.0f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,236 @@
+"""
+Microbenchmark suite for the hot paths: repos, card rendering, keyboards,
+the equipment optimizer.
+
+Usage:
+    python -m bench.suite [--sizes 100,1000] [--filter substr]
+                          [--save bench/baseline.json]
+                          [--compare bench/baseline.json] [--threshold 0.25]
+
+Generates synthetic events/heroes/skills catalogs of each size in a temp
+dir (repos read data/*.json relative to the cwd) and times every case:
+best of several repeats, reported as µs per call.
+
+--save writes the results as a baseline; --compare prints the ratio to a
+baseline and exits with status 1 if any case got slower than
+1 + threshold. Baselines are only comparable on the same machine and
+Python version — regenerate with --save after moving.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+# handlers тянут за собой config.Settings, которому нужен токен (в сеть не ходим)
+os.environ.setdefault("BOT_TOKEN", "0:bench")
+
+import numpy as np  # noqa: E402
+
+from app.data import equipment_repo, events_repo, heroes_repo, skills_repo  # noqa: E402
+from app.handlers import events as ev_handlers  # noqa: E402
+from app.handlers import heroes as hr_handlers  # noqa: E402
+from app.handlers import skills as sk_handlers  # noqa: E402
+from app.keyboards.mount_skills import item_kb, list_kb  # noqa: E402
+from app.utils import equipment_opt, render  # noqa: E402
+
+WORDS = ("attack defense march speed troops infantry cavalry archer gathering damage heal shield "
+         "rally garrison rage skill bonus reward chest gem gold wood stone season alliance").split()
+DEFAULT_SIZES = (100, 1000)
+REPEAT = 5
+MIN_TIME = 0.05     # секунд на один повтор — короче шум таймера заметен
+
+
+def _text(rnd: random.Random, n: int) -> str:
+    return " ".join(rnd.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def generate(root: Path, n: int, seed: int = 7) -> None:
+    rnd = random.Random(seed)
+    data = root / "data"
+    (data / "images").mkdir(parents=True, exist_ok=True)
+    events = [
+        {
+            "id": f"ev-{i}",
+            "name": f"Event {i} {rnd.choice(WORDS)}",
+            "description": _text(rnd, 40),
+            "time": {"duration": "3 days", "window": "weekends"},
+            "rewards": [{"name": f"Chest {i % 7}", "rarity": "epic", "notes": "x1"} for _ in range(3)],
+            "bonus": {"type": "Gathering", "value": "+20%", "scope": "all"},
+            "rules": [_text(rnd, 12) for _ in range(4)],
+            "source": ["Community notes"],
+        }
+        for i in range(n)
+    ]
+    heroes = [
+        {
+            "slug": f"hero-{i}",
+            "name": f"Hero {i}",
+            "season": f"S{i % 4 + 1}",
+            "specialty": rnd.sample(["Infantry", "Cavalry", "Archer", "Support", "Attack"], 2),
+            "talents": [{"name": f"Talent {k}", "description": _text(rnd, 15)} for k in range(3)],
+            "skills": [
+                {"name": f"Skill {k}", "type": "Active", "rage": 1000, "description": _text(rnd, 25),
+                 "awakening": {"name": "Awakened", "description": _text(rnd, 10)}}
+                for k in range(4)
+            ],
+        }
+        for i in range(n)
+    ]
+    # у части героев есть картинка — _with_image_guess найдёт её по slug
+    for i in range(0, n, 3):
+        (data / "images" / f"hero-{i}.png").write_bytes(b"")
+    skills = [
+        {"slug": f"skill-{i}", "name": f"Skill {i}", "type": rnd.choice(["Active", "Passive"]),
+         "season": f"S{i % 4 + 1}", "effect": _text(rnd, 30)}
+        for i in range(n)
+    ]
+    (data / "events.json").write_text(json.dumps({"events": events}), encoding="utf-8")
+    (data / "heroes.json").write_text(json.dumps(heroes), encoding="utf-8")
+    (data / "skills.json").write_text(json.dumps(skills), encoding="utf-8")
+    stat_keys = [*equipment_repo.STATS, *(f"{t}_{s}" for t in equipment_repo.TROOPS for s in equipment_repo.STATS)]
+    n_sets = max(2, n // 50)
+    sets = [
+        {"slug": f"set-{k}", "name": f"Set {k}", "bonuses": [
+            {"pieces": p, "stats": {rnd.choice(stat_keys): round(rnd.uniform(2, 15), 1)}} for p in (2, 4, 6)
+        ]}
+        for k in range(n_sets)
+    ]
+    equipment = [
+        {"slug": f"gear-{i}", "name": f"Gear {i}", "slot": rnd.choice(equipment_repo.SLOTS),
+         "set": f"set-{rnd.randrange(n_sets)}" if rnd.random() < 0.6 else None,
+         "stats": {rnd.choice(stat_keys): round(rnd.uniform(0, 10), 1) for _ in range(3)}}
+        for i in range(n)
+    ]
+    (data / "equipment.json").write_text(json.dumps({"equipment": equipment, "sets": sets}), encoding="utf-8")
+
+
+def _reload_all() -> None:
+    events_repo.reload()
+    heroes_repo.reload()
+    skills_repo.reload()
+    equipment_repo.reload()
+
+
+def cases(n: int):
+    """(name, fn) pairs for a catalog of n items; data/ must already be generated in the cwd."""
+    _reload_all()
+    raw_event = json.loads(Path("data/events.json").read_text(encoding="utf-8"))["events"][n // 2]
+    ev = events_repo.list_events()[n // 2]
+    hero = heroes_repo.list_heroes()[n // 2]
+    skill = skills_repo.list_skills()[n // 2]
+    long_card = render.hero_card(hero) * 3
+    names = [f"Skill {i}" for i in range(min(n, 40))]
+    page = (n // 10) // 2
+
+    def load(repo, list_fn):
+        def run():
+            repo.reload()
+            list_fn()
+        return run
+
+    yield "events._norm_event", lambda: events_repo._norm_event(raw_event)
+    yield "events._load", load(events_repo, events_repo._load)
+    yield "events.search", lambda: events_repo.search("gathering rally")
+    yield "events.get_by_name", lambda: events_repo.get_by_name(ev.name)
+    yield "events.get_by_id", lambda: events_repo.get_by_id(ev.id)
+    yield "heroes._load", load(heroes_repo, heroes_repo._load)
+    yield "heroes._with_image_guess", lambda: heroes_repo._with_image_guess({"name": hero.name, "slug": hero.slug})
+    yield "heroes.search", lambda: heroes_repo.search("cavalry march")
+    yield "skills.search", lambda: skills_repo.search("shield")
+    yield "render.event_card", lambda: render.event_card(ev)
+    yield "render.hero_card", lambda: render.hero_card(hero)
+    yield "render.skill_card", lambda: render.skill_card(skill)
+    yield "render.clamp_for_caption", lambda: render.clamp_for_caption(long_card)
+    yield "kb.mount_skills.list_kb", lambda: list_kb("spears", 1, names)
+    yield "kb.mount_skills.item_kb", lambda: item_kb("spears", 1, 5, 4, 6)
+    ev_names = [e.name for e in events_repo.list_events()]
+    yield "kb._kb_events", lambda: ev_handlers._kb_events(ev_names, page=page)
+    yield "kb._kb_heroes", lambda: hr_handlers._kb_heroes(hr_handlers._pairs_all(), page=page)
+    yield "kb._kb_skills", lambda: sk_handlers._kb_skills(sk_handlers._pairs_all(), page=page)
+    yield "kb._kb_heroes_page", lambda: hr_handlers._kb_heroes_page(page, "en")
+    gear = equipment_opt.prepare(equipment_repo.list_equipment(), equipment_repo.sets())
+    weights = equipment_opt.projection("cavalry") @ np.array([1.0, 0.25, 0.25])
+    yield "equipment.prepare", lambda: equipment_opt.prepare(equipment_repo.list_equipment(), equipment_repo.sets())
+    yield "equipment.search", lambda: equipment_opt.search(gear, weights, (), 3)
+
+
+def measure(fn) -> float:
+    """Best-of-REPEAT µs per call."""
+    t = timeit.Timer(fn)
+    number = 1
+    while t.timeit(number) < MIN_TIME and number < 1_000_000:
+        number *= 2
+    return min(t.repeat(REPEAT, number)) / number * 1e6
+
+
+def run(sizes, only: str = "") -> dict:
+    results = {}
+    cwd = os.getcwd()
+    for n in sizes:
+        with tempfile.TemporaryDirectory(prefix="bench-suite-") as tmp:
+            generate(Path(tmp), n)
+            os.chdir(tmp)
+            try:
+                for name, fn in cases(n):
+                    if only and only not in name:
+                        continue
+                    key = f"{name}[{n}]"
+                    results[key] = round(measure(fn), 3)
+                    print(f"{key:<36} {results[key]:>12.2f} µs", flush=True)
+            finally:
+                os.chdir(cwd)
+                _reload_all()
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> int:
+    failed = 0
+    print(f"\n{'case':<36} {'base µs':>10} {'now µs':>10} {'ratio':>7}")
+    for key, now in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"{key:<36} {'—':>10} {now:>10.2f}    new")
+            continue
+        ratio = now / base if base else float("inf")
+        bad = ratio > 1 + threshold
+        failed += bad
+        print(f"{key:<36} {base:>10.2f} {now:>10.2f} {ratio:>6.2f}x{'  REGRESSION' if bad else ''}")
+    return failed
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(prog="python -m bench.suite")
+    ap.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)))
+    ap.add_argument("--filter", default="", help="run only cases containing this substring")
+    ap.add_argument("--save", metavar="PATH", help="write results as a baseline")
+    ap.add_argument("--compare", metavar="PATH", help="compare with a baseline, exit 1 on regression")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = +25%%")
+    args = ap.parse_args(argv[1:])
+
+    sizes = [int(x) for x in args.sizes.split(",") if x]
+    results = run(sizes, args.filter)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        }, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"\nbaseline saved to {args.save}")
+    if args.compare:
+        base = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if base.get("python") != platform.python_version():
+            print(f"note: baseline is from Python {base.get('python')}, running {platform.python_version()}")
+        failed = compare(results, base["results"], args.threshold)
+        if failed:
+            print(f"\n{failed} case(s) slower than +{args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,75 @@
+"""
+Team search benchmark: branch-and-bound in one process vs split across the
+worker pool, on synthetic catalogs.
+
+Usage:
+    python -m bench.teams [n_heroes ...]
+
+For each catalog size and team size 2..4 prints wall time, searched nodes
+and whether the time budget was hit. The first pool run includes the
+per-worker pair matrix; the pool only pays off with more than one core.
+"""
+import random
+import sys
+import time
+
+from app.utils import team_builder as tb
+
+SPECS = ["infantry", "cavalry", "archer", "siege", "defense", "attack", "support", "gathering", "peacekeeping"]
+TYPES = ["active", "passive", "command", "counterattack", "support"]
+
+
+def synthetic(n: int, seed: int = 1):
+    rnd = random.Random(seed)
+    return [
+        tb.Feat(
+            slug=f"h{i}",
+            specs=frozenset(rnd.sample(SPECS, rnd.randint(1, 3))),
+            types=frozenset(rnd.sample(TYPES, rnd.randint(1, 4))),
+            rage=rnd.choice([None, 500, 700, 1000, 1200]),
+        )
+        for i in range(n)
+    ]
+
+
+def main(argv):
+    sizes = [int(x) for x in argv[1:]] or [100, 300, 600]
+    workers = 2
+    tb.configure(workers)
+    pool = tb._get_pool()
+    model = tb.SynergyModel()
+    wanted = frozenset({"infantry"})
+    print(f"{'heroes':>6} {'team':>4} {'single s':>9} {'nodes':>7} {'pool s':>7} {'nodes':>7}  timed out")
+    # одно ядро: пул честно проигрывает на величину пересылки и дублирования работы
+    try:
+        for n in sizes:
+            feats = synthetic(n)
+            sc = tb.Scorer(feats, model)
+            for size in (2, 3, 4):
+                t0 = time.perf_counter()
+                best, nodes, to1 = tb.search(feats, model, size, wanted, scorer=sc, deadline=time.time() + 60)
+                t_single = time.perf_counter() - t0
+
+                # как в best_teams: короткий проход на месте → порог для воркеров
+                t0 = time.perf_counter()
+                deadline = time.time() + 60
+                seed, pnodes, _ = tb.search(feats, model, size, wanted, scorer=sc, deadline=time.time() + tb.SEED_S)
+                floor = seed[-1][0] if len(seed) >= 5 else float("-inf")
+                futs = [
+                    pool.submit(tb._search_chunk, ("bench", n), feats, model, size, wanted, (), 5, deadline,
+                                (k, workers), floor)
+                    for k in range(workers)
+                ]
+                parts = [f.result() for f in futs]
+                t_pool = time.perf_counter() - t0
+                pnodes += sum(p[1] for p in parts)
+                to2 = any(p[2] for p in parts)
+                merged = tb.merge([seed] + [p[0] for p in parts], 5)
+                assert round(merged[0][0], 6) == round(best[0][0], 6)
+                print(f"{n:>6} {size:>4} {t_single:>9.2f} {nodes:>7} {t_pool:>7.2f} {pnodes:>7}  {to1 or to2}")
+    finally:
+        tb.shutdown()
+
+
+if __name__ == "__main__":
+    main(sys.argv)